@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory footprint of many issuers which share a JWKS URL, as is the case for the
+per-tenant issuers of a multi-tenant provider. Issuers created individually with
+Issuer.from_discovery are compared with issuers created from a shared KeyStore.
+
+HTTP requests are served from memory so no network access is required. For example:
+
+    $ ./benchmarks/keystore-memory.py --issuers 1000
+    Issuer.from_discovery:     1000 issuers,  1000 key sets,     4.75 MiB,   2.38s
+    KeyStore.from_discovery:   1000 issuers,     1 key sets,     0.15 MiB,   0.24s
+
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections.abc import Mapping
+from typing import Optional
+
+from jwcrypto.jwk import JWK, JWKSet
+
+from federatedidentity import Issuer, KeyStore
+from federatedidentity.transport import RequestBase, Response
+
+JWKS_URI = "https://login.example.com/common/discovery/v2.0/keys"
+
+
+class InMemoryRequest(RequestBase):
+    "Serve per-tenant discovery documents which all point to the same key set."
+
+    def __init__(self, n_keys: int):
+        key_set = JWKSet()
+        for i in range(n_keys):
+            key_set.add(JWK.generate(kty="RSA", size=2048, kid=f"key-{i}"))
+        self.jwks = key_set.export(private_keys=False).encode("utf8")
+        self.headers = {"Content-Type": "application/json", "Cache-Control": "max-age=3600"}
+
+    def __call__(
+        self,
+        url: str,
+        body: Optional[bytes] = None,
+        method: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        if url == JWKS_URI:
+            return Response(content=self.jwks, status_code=200, headers=self.headers)
+        issuer = url.removesuffix("/.well-known/openid-configuration")
+        content = json.dumps({"issuer": issuer, "jwks_uri": JWKS_URI}).encode("utf8")
+        return Response(content=content, status_code=200, headers=self.headers)
+
+
+def measure(label: str, create_issuers) -> None:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    issuers = create_issuers()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_key_sets = len({id(issuer.key_set) for issuer in issuers})
+    print(
+        f"{label:<25} {len(issuers):>5} issuers, {n_key_sets:>5} key sets, "
+        f"{current / (1024 * 1024):8.2f} MiB, {elapsed:6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--issuers", type=int, default=3000, help="number of tenant issuers")
+    parser.add_argument("--keys", type=int, default=4, help="number of keys in the key set")
+    args = parser.parse_args()
+
+    request = InMemoryRequest(args.keys)
+    names = [f"https://login.example.com/tenant-{i:05d}/v2.0" for i in range(args.issuers)]
+
+    measure("Issuer.from_discovery:", lambda: [Issuer.from_discovery(n, request) for n in names])
+
+    def from_store():
+        store = KeyStore(request)
+        return [store.from_discovery(n) for n in names]
+
+    measure("KeyStore.from_discovery:", from_store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark how token verification throughput scales with the number of threads. On interpreters
+with the GIL, throughput is expected to stay roughly flat. On free-threaded builds of CPython
+3.13 or later, throughput is expected to scale with the number of cores. For example:
+
+    $ ./benchmarks/thread-scaling.py --tokens 4000 --threads 1 2 4
+    Python 3.11.7, GIL enabled, ES256
+     threads    tokens/s   speedup
+           1        ...      1.00
+
+Keys are generated locally so no network access is required.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from federatedidentity import Issuer, verify_id_token
+from federatedidentity.testing import TokenMinter
+
+AUDIENCE = "benchmark-audience"
+
+
+def gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def run(n_threads: int, tokens: list[str], issuer: Issuer) -> float:
+    "Verify all tokens using n_threads threads returning the throughput in tokens per second."
+    chunks = [tokens[i::n_threads] for i in range(n_threads)]
+
+    def verify_chunk(chunk: list[str]) -> None:
+        for token in chunk:
+            verify_id_token(token, [issuer], [AUDIENCE])
+
+    with ThreadPoolExecutor(n_threads) as executor:
+        start = time.perf_counter()
+        list(executor.map(verify_chunk, chunks))
+        elapsed = time.perf_counter() - start
+    return len(tokens) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=4000, help="number of tokens to verify")
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="thread counts to measure"
+    )
+    parser.add_argument("--alg", choices=["ES256", "RS256"], default="ES256")
+    args = parser.parse_args()
+
+    minter = TokenMinter("https://issuer.example.com", alg=args.alg)
+    issuer = Issuer(name=minter.issuer, key_set=minter.key_set)
+    tokens = [minter.mint({"n": i}, audience=AUDIENCE) for i in range(args.tokens)]
+
+    # Warm up any lazily-initialised state such as imported public keys.
+    run(1, tokens[:100], issuer)
+
+    version = ".".join(str(v) for v in sys.version_info[:3])
+    print(f"Python {version}, GIL {'enabled' if gil_enabled() else 'disabled'}, {args.alg}")
+    print(f"{'threads':>8} {'tokens/s':>11} {'speedup':>9}")
+    baseline = None
+    for n_threads in args.threads:
+        rate = run(n_threads, tokens, issuer)
+        baseline = baseline if baseline is not None else rate
+        print(f"{n_threads:>8} {rate:>11.0f} {rate / baseline:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
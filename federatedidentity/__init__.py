@@ -1,9 +1,44 @@
-from ._oidc import Issuer
-from ._verify import ANY_AUDIENCE, ClaimVerifier, verify_id_token
+from ._claims import Claims
+from ._config import (
+    DEFAULT_POLICY,
+    ReloadingConfig,
+    VerificationConfig,
+    VerificationPolicy,
+)
+from ._keystore import KeyStore, KeyStoreUsage
+from ._oidc import Issuer, TimePolicy
+from ._readiness import issuer_status, wait_until_ready
+from ._refresh import KeySetCache, KeySetStatus, RefreshingIssuer, RefreshPolicy
+from ._templated import TENANT_ID_PLACEHOLDER, TemplatedIssuer
+from ._verify import (
+    ANY_AUDIENCE,
+    ClaimVerifier,
+    VerificationResult,
+    try_verify_id_token,
+    verify_id_token,
+)
 
 __all__ = [
     "ANY_AUDIENCE",
+    "DEFAULT_POLICY",
+    "TENANT_ID_PLACEHOLDER",
     "ClaimVerifier",
+    "Claims",
     "Issuer",
+    "KeySetCache",
+    "KeySetStatus",
+    "KeyStore",
+    "KeyStoreUsage",
+    "RefreshPolicy",
+    "RefreshingIssuer",
+    "ReloadingConfig",
+    "TemplatedIssuer",
+    "TimePolicy",
+    "VerificationConfig",
+    "VerificationPolicy",
+    "VerificationResult",
+    "issuer_status",
+    "try_verify_id_token",
     "verify_id_token",
+    "wait_until_ready",
 ]
@@ -0,0 +1,63 @@
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+_STANDARD_CLAIMS = ("iss", "sub", "aud", "exp", "iat", "nbf")
+
+
+class Claims(Mapping[str, Any]):
+    """
+    Read-only mapping of verified token claims.
+
+    The claims are not copied. The standard OIDC claims are additionally available as attributes
+    which are `None` if the claim is not present in the token. Use [dict][] to obtain a mutable
+    copy.
+    """
+
+    __slots__ = _STANDARD_CLAIMS + ("_claims",)
+
+    iss: Any
+    "The `iss` claim."
+    sub: Any
+    "The `sub` claim."
+    aud: Any
+    "The `aud` claim."
+    exp: Any
+    "The `exp` claim."
+    iat: Any
+    "The `iat` claim."
+    nbf: Any
+    "The `nbf` claim."
+    _claims: dict[str, Any]
+
+    def __init__(self, claims: dict[str, Any]):
+        object.__setattr__(self, "_claims", claims)
+        for name in _STANDARD_CLAIMS:
+            object.__setattr__(self, name, claims.get(name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__!r} object is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__!r} object is read-only")
+
+    def __getitem__(self, key: str) -> Any:
+        return self._claims[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._claims)
+
+    def __len__(self) -> int:
+        return len(self._claims)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._claims
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Claims):
+            return self._claims == other._claims
+        return self._claims == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._claims!r})"
@@ -0,0 +1,330 @@
+"""
+Command line interface.
+"""
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Optional, Union
+
+from . import push, sidecar
+from ._config import (
+    ReloadingConfig,
+    audiences_from_config,
+    claim_verifiers_from_config,
+    issuer_names_from_config,
+    jwks_uris_from_config,
+    load_config_file,
+    time_policy_from_config,
+)
+from ._oidc import DEFAULT_TIME_POLICY, Issuer, TimePolicy
+from ._verify import AnyAudienceType, ClaimVerifier, try_verify_id_token
+from .exceptions import FederatedIdentityError, InvalidConfigError
+
+# State of each worker process set up by _init_worker().
+_worker_issuers: list[Issuer] = []
+_worker_audiences: list[Union[str, AnyAudienceType]] = []
+_worker_required_claims: list[ClaimVerifier] = []
+_worker_time_policy = DEFAULT_TIME_POLICY
+
+
+def _init_worker(config: dict[str, Any], serialized_issuers: list[bytes]) -> None:
+    global _worker_issuers, _worker_audiences, _worker_required_claims, _worker_time_policy
+    _worker_issuers = [Issuer.from_bytes(issuer) for issuer in serialized_issuers]
+    _worker_audiences = audiences_from_config(config)
+    _worker_required_claims = claim_verifiers_from_config(config)
+    _worker_time_policy = time_policy_from_config(config)
+
+
+def _verify_line(line_number: int, token: bytes, time_policy: TimePolicy) -> tuple[bool, str]:
+    record: dict[str, Any] = {"line": line_number}
+    result = try_verify_id_token(
+        token,
+        _worker_issuers,
+        _worker_audiences,
+        required_claims=_worker_required_claims,
+        time_policy=time_policy,
+    )
+    if result.error is None:
+        record["claims"] = result.claims
+        record["valid"] = True
+    else:
+        record["valid"] = False
+        record["error"] = result.error.__class__.__name__
+        record["code"] = result.error.code.value
+        record["reason"] = str(result.error)
+    return record["valid"], json.dumps(record, separators=(",", ":"))
+
+
+def _verify_chunk(chunk: list[tuple[int, bytes]]) -> list[tuple[bool, str]]:
+    # The clock is read once per chunk rather than once per token.
+    now = _worker_time_policy.clock()
+    time_policy = dataclasses.replace(_worker_time_policy, clock=lambda: now)
+    return [_verify_line(line_number, token, time_policy) for line_number, token in chunk]
+
+
+def _read_tokens(inputs: Iterable[IO[bytes]]) -> Iterator[tuple[int, bytes]]:
+    "Yield line numbers and tokens from each input in turn skipping blank lines."
+    lines = itertools.chain.from_iterable(inputs)
+    for line_number, line in enumerate(lines, start=1):
+        token = line.strip()
+        if token != b"":
+            yield line_number, token
+
+
+def _chunked(
+    iterable: Iterator[tuple[int, bytes]], size: int
+) -> Iterator[list[tuple[int, bytes]]]:
+    while True:
+        chunk = list(itertools.islice(iterable, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def _verify_stream(
+    tokens: Iterator[tuple[int, bytes]],
+    output: IO[str],
+    *,
+    config: dict[str, Any],
+    serialized_issuers: list[bytes],
+    jobs: int,
+    chunk_size: int,
+) -> tuple[int, int]:
+    """
+    Verify tokens writing results in input order. At most a bounded number of chunks are in flight
+    at any time so that memory use does not depend on the size of the input.
+
+    Returns:
+        The number of valid and total tokens.
+    """
+    n_valid, n_total = 0, 0
+
+    def write(results: list[tuple[bool, str]]):
+        nonlocal n_valid, n_total
+        for valid, result in results:
+            output.write(result)
+            output.write("\n")
+            n_valid += 1 if valid else 0
+        n_total += len(results)
+
+    if jobs == 1:
+        _init_worker(config, serialized_issuers)
+        for chunk in _chunked(tokens, chunk_size):
+            write(_verify_chunk(chunk))
+        return n_valid, n_total
+
+    with multiprocessing.Pool(
+        jobs, initializer=_init_worker, initargs=(config, serialized_issuers)
+    ) as pool:
+        in_flight: collections.deque = collections.deque()
+        for chunk in _chunked(tokens, chunk_size):
+            in_flight.append(pool.apply_async(_verify_chunk, (chunk,)))
+            if len(in_flight) >= 4 * jobs:
+                write(in_flight.popleft().get())
+        while len(in_flight) > 0:
+            write(in_flight.popleft().get())
+    return n_valid, n_total
+
+
+def _verify_command(args: argparse.Namespace) -> int:
+    try:
+        config = load_config_file(args.config)
+        issuer_names = issuer_names_from_config(config)
+        jwks_uris = jwks_uris_from_config(config)
+        # Validate the remainder of the configuration before any discovery is performed.
+        audiences_from_config(config)
+        claim_verifiers_from_config(config)
+        time_policy_from_config(config)
+    except InvalidConfigError as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        serialized_issuers = [
+            (
+                Issuer.from_jwks_uri(name, jwks_uris[name])
+                if name in jwks_uris
+                else Issuer.from_discovery(name)
+            ).to_bytes()
+            for name in issuer_names
+        ]
+    except FederatedIdentityError as e:
+        print(f"Could not discover issuer keys: {e}", file=sys.stderr)
+        return 1
+
+    inputs: list[IO[bytes]] = []
+    try:
+        for path in args.inputs if len(args.inputs) > 0 else ["-"]:
+            inputs.append(sys.stdin.buffer if path == "-" else open(path, "rb"))
+        start = time.monotonic()
+        n_valid, n_total = _verify_stream(
+            _read_tokens(inputs),
+            sys.stdout,
+            config=config,
+            serialized_issuers=serialized_issuers,
+            jobs=args.jobs,
+            chunk_size=args.chunk_size,
+        )
+        elapsed = time.monotonic() - start
+    finally:
+        for f in inputs:
+            if f is not sys.stdin.buffer:
+                f.close()
+    sys.stdout.flush()
+
+    rate = n_total / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Verified {n_total} token(s): {n_valid} valid, {n_total - n_valid} invalid "
+        f"in {elapsed:.2f}s ({rate:.0f} tokens/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _serve_command(args: argparse.Namespace) -> int:
+    try:
+        config = ReloadingConfig(args.config)
+    except InvalidConfigError as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+    except FederatedIdentityError as e:
+        print(f"Could not discover issuer keys: {e}", file=sys.stderr)
+        return 1
+
+    config.install_signal_handler()
+    if args.reload_interval is not None:
+        config.watch(args.reload_interval)
+    key_listener = None
+    if args.key_socket is not None:
+        key_listener = push.KeyUpdateListener(config)
+        key_listener.serve(args.key_socket)
+
+    with ThreadPoolExecutor(args.workers) as executor:
+        server = sidecar.SidecarServer(config, executor=executor, max_pipeline=args.max_pipeline)
+
+        async def serve():
+            async with await server.start(args.socket) as unix_server:
+                print(f"Listening on {args.socket}", file=sys.stderr)
+                await unix_server.serve_forever()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            config.close()
+            if key_listener is not None:
+                key_listener.close()
+            for path in [args.socket, args.key_socket]:
+                if path is not None and os.path.exists(path):
+                    os.unlink(path)
+    return 0
+
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive integer")
+    return n
+
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="federatedidentity", description="Verify OIDC identity tokens."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = subparsers.add_parser(
+        "verify",
+        help="verify newline-delimited tokens",
+        description=(
+            "Verify newline-delimited tokens read from files or standard input, writing one JSON "
+            "result per token to standard output in input order."
+        ),
+    )
+    verify_parser.add_argument(
+        "--config",
+        "-c",
+        required=True,
+        help="JSON or TOML file specifying issuers, audiences and required claims",
+    )
+    verify_parser.add_argument(
+        "--jobs",
+        "-j",
+        type=_positive_int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    verify_parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=256,
+        help="number of tokens sent to a worker at a time (default: %(default)s)",
+    )
+    verify_parser.add_argument(
+        "inputs", nargs="*", help="input files; '-' or no files reads standard input"
+    )
+    verify_parser.set_defaults(func=_verify_command)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="serve verification requests over a UNIX domain socket",
+        description=(
+            "Serve verification requests over a UNIX domain socket sharing issuer keys between "
+            "all clients. See the federatedidentity.sidecar module for the protocol."
+        ),
+    )
+    serve_parser.add_argument(
+        "--config",
+        "-c",
+        required=True,
+        help="JSON or TOML file specifying issuers, audiences, required claims and policies",
+    )
+    serve_parser.add_argument(
+        "--socket", "-s", required=True, help="path of the UNIX domain socket to listen on"
+    )
+    serve_parser.add_argument(
+        "--workers",
+        "-w",
+        type=_positive_int,
+        default=os.cpu_count() or 1,
+        help="number of verification threads (default: number of CPUs)",
+    )
+    serve_parser.add_argument(
+        "--max-pipeline",
+        type=_positive_int,
+        default=sidecar.DEFAULT_MAX_PIPELINE,
+        help="maximum unanswered requests per connection (default: %(default)s)",
+    )
+    serve_parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=None,
+        help=(
+            "reload the configuration if it changes, checking every this many seconds; the "
+            "configuration is always reloaded on SIGHUP"
+        ),
+    )
+    serve_parser.add_argument(
+        "--key-socket",
+        default=None,
+        help="path of a UNIX domain socket on which to accept pushed key set updates",
+    )
+    serve_parser.set_defaults(func=_serve_command)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    "Entry point for the federatedidentity command."
+    args = _make_parser().parse_args(argv)
+    return args.func(args)
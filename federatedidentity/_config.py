@@ -0,0 +1,638 @@
+import dataclasses
+import json
+import os
+import signal
+import threading
+import types
+from collections.abc import Mapping
+from typing import Any, Literal, Optional, Union, overload
+
+from . import verifiers
+from ._claims import Claims
+from ._keystore import KeyStore
+from ._oidc import DEFAULT_TIME_POLICY, AnyToken, TimePolicy
+from ._readiness import issuer_status, wait_until_ready
+from ._refresh import KeySetStatus
+from ._verify import (
+    ANY_AUDIENCE,
+    AnyAudienceType,
+    AnyIssuer,
+    ClaimVerifier,
+    VerificationResult,
+    try_verify_id_token,
+    verify_id_token,
+)
+from .exceptions import InvalidConfigError, UnknownPolicyError
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    tomllib = None  # type: ignore[assignment]
+
+DEFAULT_POLICY = "default"
+"Name of the policy formed from the top-level keys of a configuration document."
+
+
+def load_config_file(path: str) -> dict[str, Any]:
+    """
+    Load a configuration document from a JSON or TOML file. The format is determined by the file
+    extension.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The file could not be parsed.
+    """
+    try:
+        with open(path, "rb") as f:
+            if path.endswith(".toml"):
+                if tomllib is None:
+                    raise InvalidConfigError(
+                        "TOML configuration files require Python 3.11 or later."
+                    )
+                config = tomllib.load(f)
+            else:
+                config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise InvalidConfigError(f"Could not load configuration from {path!r}: {e}")
+    if not isinstance(config, dict):
+        raise InvalidConfigError("Configuration must be a mapping.")
+    return config
+
+
+def _str_list(config: dict[str, Any], key: str) -> list[str]:
+    value = config.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise InvalidConfigError(f"{key!r} must be a list of strings.")
+    return value
+
+
+def _claim_dicts(value: Any, key: str) -> list[ClaimVerifier]:
+    if not isinstance(value, list) or not all(isinstance(v, dict) for v in value):
+        raise InvalidConfigError(f"{key!r} must be a list of tables of required claim values.")
+    return list(value)
+
+
+def issuer_names_from_config(config: dict[str, Any]) -> list[str]:
+    """
+    Return the list of issuer names from a configuration document.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    issuer_names = _str_list(config, "issuers")
+    if len(issuer_names) == 0:
+        raise InvalidConfigError("At least one issuer must be configured.")
+    return issuer_names
+
+
+def jwks_uris_from_config(config: dict[str, Any]) -> dict[str, str]:
+    """
+    Return the mapping from issuer name to known JWKS URL from a configuration document. Issuers
+    with a known JWKS URL are not discovered.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    jwks_uris = config.get("jwks_uris", {})
+    if not isinstance(jwks_uris, dict) or not all(isinstance(v, str) for v in jwks_uris.values()):
+        raise InvalidConfigError("'jwks_uris' must be a table of strings.")
+    return jwks_uris
+
+
+def audiences_from_config(config: dict[str, Any]) -> list[Union[str, AnyAudienceType]]:
+    """
+    Construct the list of valid audiences from a configuration document.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    if config.get("any_audience", False):
+        return [ANY_AUDIENCE]
+    audiences: list[Union[str, AnyAudienceType]] = list(_str_list(config, "audiences"))
+    if len(audiences) == 0:
+        raise InvalidConfigError("At least one audience must be configured or any_audience set.")
+    return audiences
+
+
+def time_policy_from_config(config: dict[str, Any]) -> TimePolicy:
+    """
+    Construct the time policy from the optional `leeway` and `max_token_age` keys of a
+    configuration document, both in seconds.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    leeway = _optional_duration(config, "leeway")
+    max_age = _optional_duration(config, "max_token_age")
+    if leeway is None and max_age is None:
+        return DEFAULT_TIME_POLICY
+    return TimePolicy(
+        leeway=leeway if leeway is not None else DEFAULT_TIME_POLICY.leeway, max_age=max_age
+    )
+
+
+def _optional_duration(config: dict[str, Any], key: str) -> Optional[float]:
+    value = config.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise InvalidConfigError(f"{key!r} must be a non-negative number.")
+    return float(value)
+
+
+def claim_verifiers_from_config(config: dict[str, Any]) -> list[ClaimVerifier]:
+    """
+    Construct claim verifiers from a configuration document. The following keys are used:
+
+    * `required_claims`: list of tables of required claim values
+    * `required_claims_present`: list of claim names which must be present
+    * `issuer_required_claims`: table mapping issuer names to lists of tables of required claim
+      values which apply only to tokens from that issuer
+    * `adaptive_claim_order`: if `true`, the verifiers are applied in an order learned at
+      runtime by [adaptive][federatedidentity.verifiers.adaptive]
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    required_claims = _claim_dicts(config.get("required_claims", []), "required_claims")
+    claims_present = _str_list(config, "required_claims_present")
+    if len(claims_present) > 0:
+        required_claims.append(verifiers.all_claims_present(claims_present))
+    issuer_required_claims = config.get("issuer_required_claims", {})
+    if not isinstance(issuer_required_claims, dict):
+        raise InvalidConfigError("'issuer_required_claims' must be a table.")
+    if len(issuer_required_claims) > 0:
+        required_claims.append(
+            verifiers.by_issuer(
+                {
+                    issuer_name: _claim_dicts(issuer_claims, "issuer_required_claims")
+                    for issuer_name, issuer_claims in issuer_required_claims.items()
+                }
+            )
+        )
+    adaptive_claim_order = config.get("adaptive_claim_order", False)
+    if not isinstance(adaptive_claim_order, bool):
+        raise InvalidConfigError("'adaptive_claim_order' must be a boolean.")
+    if adaptive_claim_order and len(required_claims) > 1:
+        return [verifiers.adaptive(required_claims)]
+    return required_claims
+
+
+def policy_configs(config: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """
+    Split a configuration document into one configuration per named policy. The top-level keys
+    form the policy named [DEFAULT_POLICY][federatedidentity.DEFAULT_POLICY]. Keys in each entry
+    of the `policies` table override the top-level keys.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+    """
+    base = {k: v for k, v in config.items() if k != "policies"}
+    policies = config.get("policies", {})
+    if not isinstance(policies, dict) or not all(isinstance(v, dict) for v in policies.values()):
+        raise InvalidConfigError("'policies' must be a table of tables.")
+    configs = {DEFAULT_POLICY: base}
+    configs.update({name: {**base, **overrides} for name, overrides in policies.items()})
+    for name, policy_config in configs.items():
+        try:
+            issuer_names_from_config(policy_config)
+            audiences_from_config(policy_config)
+            claim_verifiers_from_config(policy_config)
+            time_policy_from_config(policy_config)
+        except InvalidConfigError as e:
+            raise InvalidConfigError(f"Policy {name!r}: {e}") from e
+    return configs
+
+
+@dataclasses.dataclass(frozen=True)
+class VerificationPolicy:
+    """
+    Immutable set of issuers, audiences and claim verifiers which tokens are verified against.
+    """
+
+    issuers: tuple[AnyIssuer, ...]
+    "Valid issuers."
+    audiences: tuple[Union[str, AnyAudienceType], ...]
+    "Valid audiences."
+    required_claims: tuple[ClaimVerifier, ...] = ()
+    "Required claim verifiers."
+    time_policy: TimePolicy = DEFAULT_TIME_POLICY
+    "Policy for checking the token's time claims."
+
+    @overload
+    def verify(
+        self, token: AnyToken, *, read_only_claims: Literal[False] = False
+    ) -> dict[str, Any]: ...
+
+    @overload
+    def verify(self, token: AnyToken, *, read_only_claims: Literal[True]) -> Claims: ...
+
+    def verify(
+        self, token: AnyToken, *, read_only_claims: bool = False
+    ) -> Union[dict[str, Any], Claims]:
+        """
+        Verify a token against this policy. See
+        [verify_id_token][federatedidentity.verify_id_token].
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The token failed verification.
+        """
+        return verify_id_token(
+            token,
+            self.issuers,
+            self.audiences,
+            required_claims=self.required_claims,
+            read_only_claims=read_only_claims,  # type: ignore[call-overload]
+            time_policy=self.time_policy,
+        )
+
+    def try_verify(self, token: AnyToken) -> VerificationResult:
+        """
+        Verify a token against this policy without raising an exception if it is rejected. See
+        [try_verify_id_token][federatedidentity.try_verify_id_token].
+        """
+        return try_verify_id_token(
+            token,
+            self.issuers,
+            self.audiences,
+            required_claims=self.required_claims,
+            time_policy=self.time_policy,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class VerificationConfig:
+    """
+    Immutable verification configuration holding one or more named policies.
+
+    Configurations are usually loaded from a JSON or TOML configuration document using
+    [from_document][federatedidentity.VerificationConfig.from_document] or
+    [from_file][federatedidentity.VerificationConfig.from_file]:
+
+    ```toml
+    issuers = ["https://gitlab.com", "https://token.actions.githubusercontent.com"]
+    audiences = ["https://my-service.example.com"]
+
+    [policies.deploy]
+    issuers = ["https://gitlab.com"]
+    required_claims = [{ project_path = "my-group/my-project" }]
+    ```
+
+    The top-level keys form the policy named [DEFAULT_POLICY][federatedidentity.DEFAULT_POLICY]
+    and entries in the `policies` table override them. As well as `required_claims`, a
+    `required_claims_present` list of claim names and an `issuer_required_claims` table mapping
+    issuer names to required claim values may be given. Set `any_audience = true` instead of
+    listing `audiences` to accept any audience. A top-level `jwks_uris` table mapping issuer names
+    to JWKS URLs may be given for issuers whose key set should be fetched without discovery.
+    """
+
+    policies: Mapping[str, VerificationPolicy]
+    "Mapping from policy name to policy."
+    issuers: Mapping[str, AnyIssuer]
+    "Mapping from issuer name to issuer for all issuers used by any policy."
+
+    def policy(self, name: str = DEFAULT_POLICY) -> VerificationPolicy:
+        """
+        Return a named policy.
+
+        Raises:
+            federatedidentity.exceptions.UnknownPolicyError: The policy is not configured.
+        """
+        try:
+            return self.policies[name]
+        except KeyError:
+            raise UnknownPolicyError(f"Unknown policy {name!r}.")
+
+    @overload
+    def verify(
+        self,
+        token: AnyToken,
+        policy: str = DEFAULT_POLICY,
+        *,
+        read_only_claims: Literal[False] = False,
+    ) -> dict[str, Any]: ...
+
+    @overload
+    def verify(
+        self,
+        token: AnyToken,
+        policy: str = DEFAULT_POLICY,
+        *,
+        read_only_claims: Literal[True],
+    ) -> Claims: ...
+
+    def verify(
+        self,
+        token: AnyToken,
+        policy: str = DEFAULT_POLICY,
+        *,
+        read_only_claims: bool = False,
+    ) -> Union[dict[str, Any], Claims]:
+        """
+        Verify a token against a named policy.
+
+        Returns:
+            the token's claims dictionary or, if `read_only_claims` is `True`, a read-only
+            [Claims][federatedidentity.Claims] mapping.
+
+        Raises:
+            federatedidentity.exceptions.UnknownPolicyError: The policy is not configured.
+            federatedidentity.exceptions.FederatedIdentityError: The token failed verification.
+        """
+        return self.policy(policy).verify(
+            token, read_only_claims=read_only_claims  # type: ignore[call-overload]
+        )
+
+    def try_verify(self, token: AnyToken, policy: str = DEFAULT_POLICY) -> VerificationResult:
+        """
+        Verify a token against a named policy without raising an exception if it is rejected.
+        An unknown policy results in an
+        [UnknownPolicyError][federatedidentity.exceptions.UnknownPolicyError]. See
+        [try_verify_id_token][federatedidentity.try_verify_id_token].
+        """
+        selected = self.policies.get(policy)
+        if selected is None:
+            return VerificationResult(error=UnknownPolicyError("Unknown policy %r.", policy))
+        return selected.try_verify(token)
+
+    def status(self) -> dict[str, KeySetStatus]:
+        "Return a snapshot of the state of each issuer's key set keyed by issuer name."
+        return {name: issuer_status(issuer) for name, issuer in self.issuers.items()}
+
+    async def wait_until_ready(self, *, timeout: Optional[float] = None) -> bool:
+        """
+        Fetch the key set of each issuer which does not have a usable one. See
+        [wait_until_ready][federatedidentity.wait_until_ready].
+
+        Returns:
+            `True` if every issuer has a usable key set.
+        """
+        return await wait_until_ready(self.issuers.values(), timeout=timeout)
+
+    @classmethod
+    def from_document(
+        cls,
+        config: dict[str, Any],
+        *,
+        issuers: Optional[Mapping[str, AnyIssuer]] = None,
+        key_store: Optional[KeyStore] = None,
+    ) -> "VerificationConfig":
+        """
+        Create a configuration from a configuration document.
+
+        Arguments:
+            config: Configuration document.
+            issuers: Issuers which may be used without discovery, for example those of a previous
+                configuration.
+            key_store: Store holding the key sets of issuers which are discovered. If omitted a
+                new store is created.
+
+        Raises:
+            federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+            federatedidentity.exceptions.FederatedIdentityError: An issuer could not be
+                discovered.
+        """
+        configs = policy_configs(config)
+        jwks_uris = jwks_uris_from_config(config)
+        known_issuers = issuers if issuers is not None else {}
+        all_issuers: dict[str, AnyIssuer] = {}
+        for policy_config in configs.values():
+            for name in issuer_names_from_config(policy_config):
+                if name in all_issuers:
+                    continue
+                if name in known_issuers:
+                    all_issuers[name] = known_issuers[name]
+                    continue
+                if key_store is None:
+                    key_store = KeyStore()
+                if name in jwks_uris:
+                    all_issuers[name] = key_store.from_jwks_uri(name, jwks_uris[name])
+                else:
+                    all_issuers[name] = key_store.from_discovery(name)
+        policies = {
+            name: VerificationPolicy(
+                issuers=tuple(all_issuers[n] for n in issuer_names_from_config(policy_config)),
+                audiences=tuple(audiences_from_config(policy_config)),
+                required_claims=tuple(claim_verifiers_from_config(policy_config)),
+                time_policy=time_policy_from_config(policy_config),
+            )
+            for name, policy_config in configs.items()
+        }
+        return cls(
+            policies=types.MappingProxyType(policies),
+            issuers=types.MappingProxyType(all_issuers),
+        )
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        *,
+        issuers: Optional[Mapping[str, AnyIssuer]] = None,
+        key_store: Optional[KeyStore] = None,
+    ) -> "VerificationConfig":
+        """
+        Create a configuration from a JSON or TOML configuration file. The format is determined
+        by the file extension. See
+        [from_document][federatedidentity.VerificationConfig.from_document] for the arguments.
+
+        Raises:
+            federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+            federatedidentity.exceptions.FederatedIdentityError: An issuer could not be
+                discovered.
+        """
+        return cls.from_document(load_config_file(path), issuers=issuers, key_store=key_store)
+
+
+def _file_signature(path: str) -> Optional[tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class ReloadingConfig:
+    """
+    A [VerificationConfig][federatedidentity.VerificationConfig] loaded from a file which may be
+    reloaded while in use.
+
+    Reading the current configuration takes no lock. A reload builds a complete new configuration,
+    discovering any new issuers, before replacing the current one in a single assignment.
+    Verifications which are in progress finish using the configuration they started with. Issuers
+    present in both the old and new configuration are re-used along with their cached key sets.
+    If a reload fails, the current configuration continues to be used and the error is recorded
+    in [last_error][federatedidentity.ReloadingConfig.last_error].
+
+    ```py
+    from federatedidentity import ReloadingConfig
+
+    config = ReloadingConfig("/etc/my-service/verification.toml")
+    config.install_signal_handler()  # reload on SIGHUP
+    config.watch(interval=10)  # reload if the file changes
+
+    claims = config.verify(token, "deploy")
+    ```
+
+    Args:
+        path: Path to a JSON or TOML configuration file.
+        key_store: Store holding the key sets of discovered issuers. If omitted a new store is
+            created.
+
+    Raises:
+        federatedidentity.exceptions.InvalidConfigError: The initial configuration was malformed.
+        federatedidentity.exceptions.FederatedIdentityError: An issuer in the initial
+            configuration could not be discovered.
+    """
+
+    path: str
+    "Path to the configuration file."
+
+    def __init__(self, path: str, *, key_store: Optional[KeyStore] = None):
+        self.path = path
+        self._key_store = key_store if key_store is not None else KeyStore()
+        self._reload_lock = threading.Lock()
+        self._last_error: Optional[Exception] = None
+        self._watch_stop: Optional[threading.Event] = None
+        self._file_signature = _file_signature(path)
+        self._current = VerificationConfig.from_file(path, key_store=self._key_store)
+
+    @property
+    def current(self) -> VerificationConfig:
+        "The current configuration."
+        return self._current
+
+    @property
+    def last_error(self) -> Optional[Exception]:
+        "The exception raised by the most recent reload or `None` if it succeeded."
+        return self._last_error
+
+    def policy(self, name: str = DEFAULT_POLICY) -> VerificationPolicy:
+        """
+        Return a named policy from the current configuration.
+
+        Raises:
+            federatedidentity.exceptions.UnknownPolicyError: The policy is not configured.
+        """
+        return self._current.policy(name)
+
+    def verify(
+        self,
+        token: AnyToken,
+        policy: str = DEFAULT_POLICY,
+        *,
+        read_only_claims: bool = False,
+    ) -> Union[dict[str, Any], Claims]:
+        """
+        Verify a token against a named policy of the current configuration. See
+        [VerificationConfig.verify][federatedidentity.VerificationConfig.verify].
+        """
+        return self._current.verify(
+            token, policy, read_only_claims=read_only_claims  # type: ignore[call-overload]
+        )
+
+    def try_verify(self, token: AnyToken, policy: str = DEFAULT_POLICY) -> VerificationResult:
+        """
+        Verify a token against a named policy of the current configuration without raising an
+        exception if it is rejected. See
+        [VerificationConfig.try_verify][federatedidentity.VerificationConfig.try_verify].
+        """
+        return self._current.try_verify(token, policy)
+
+    def status(self) -> dict[str, KeySetStatus]:
+        "Return a snapshot of the state of each issuer's key set in the current configuration."
+        return self._current.status()
+
+    async def wait_until_ready(self, *, timeout: Optional[float] = None) -> bool:
+        """
+        Fetch the key set of each issuer in the current configuration which does not have a
+        usable one. See [wait_until_ready][federatedidentity.wait_until_ready].
+
+        Returns:
+            `True` if every issuer has a usable key set.
+        """
+        return await self._current.wait_until_ready(timeout=timeout)
+
+    def reload(self) -> VerificationConfig:
+        """
+        Reload the configuration file, discovering any new issuers, and replace the current
+        configuration. Concurrent reloads are serialised.
+
+        Returns:
+            the new configuration
+
+        Raises:
+            federatedidentity.exceptions.InvalidConfigError: The configuration was malformed.
+            federatedidentity.exceptions.FederatedIdentityError: An issuer could not be
+                discovered.
+        """
+        with self._reload_lock:
+            # A failed reload is not retried by watch() until the file changes again.
+            self._file_signature = _file_signature(self.path)
+            try:
+                config = VerificationConfig.from_file(
+                    self.path, issuers=self._current.issuers, key_store=self._key_store
+                )
+            except Exception as e:
+                self._last_error = e
+                raise
+            self._last_error = None
+            self._current = config
+            return config
+
+    def reload_in_background(self) -> threading.Thread:
+        """
+        Reload the configuration in a background thread. The current configuration continues to
+        be used until the reload is complete.
+
+        Returns:
+            the thread performing the reload
+        """
+        thread = threading.Thread(
+            target=self._background_reload, name="federatedidentity-reload", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def install_signal_handler(self, signum: int = signal.SIGHUP) -> None:
+        """
+        Reload the configuration in the background when the process receives a signal. This must
+        be called from the main thread.
+
+        Arguments:
+            signum: Signal number. Defaults to `SIGHUP`.
+        """
+        signal.signal(signum, lambda *_: self.reload_in_background())
+
+    def watch(self, interval: float = 5.0) -> None:
+        """
+        Start a background thread which reloads the configuration if the file changes. The file
+        is checked for changes to its modification time, size or inode every `interval` seconds.
+        Call [close][federatedidentity.ReloadingConfig.close] to stop watching.
+        """
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+        threading.Thread(
+            target=self._watch,
+            args=(self._watch_stop, interval),
+            name="federatedidentity-watch",
+            daemon=True,
+        ).start()
+
+    def close(self) -> None:
+        "Stop watching the configuration file."
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def _background_reload(self) -> None:
+        try:
+            self.reload()
+        except Exception:
+            # The failure has been recorded and the current configuration continues to be used.
+            pass
+
+    def _watch(self, stop: threading.Event, interval: float) -> None:
+        while not stop.wait(interval):
+            if _file_signature(self.path) != self._file_signature:
+                self._background_reload()
@@ -0,0 +1,293 @@
+import dataclasses
+import hashlib
+import threading
+import time
+import weakref
+from collections.abc import Callable, Mapping
+from typing import Optional
+
+from jwcrypto.jwk import JWKSet
+
+from . import _oidc
+from ._refresh import KeySetCache, RefreshingIssuer, RefreshPolicy, key_set_size
+from .transport import AsyncRequestBase, RequestBase, Response
+from .transport import requests as requests_transport
+
+
+@dataclasses.dataclass(frozen=True)
+class KeyStoreUsage:
+    "Snapshot of the memory used by the key sets held in a [KeyStore][federatedidentity.KeyStore]."
+
+    jwks_uris: int
+    "Number of distinct JWKS URLs in the store."
+    key_sets: int
+    "Number of key sets currently held."
+    size: int
+    "Estimated memory used by the key sets in bytes."
+    max_size: Optional[int] = None
+    "The store's memory budget in bytes or `None` if it has none."
+    evictions: int = 0
+    "Number of key sets evicted since the store was created."
+
+
+class KeyStore:
+    """
+    A store of key sets shared between issuers.
+
+    Issuers created by the store which share a `jwks_uri`, such as the per-tenant issuers of a
+    multi-tenant provider, share a single [KeySetCache][federatedidentity.KeySetCache] and hence
+    one fetch and one parsed key set. Key sets fetched from different URLs with identical
+    content are additionally deduplicated by content digest so that they share imported key
+    objects.
+
+    The memory used by key sets may be bounded. When a key set is fetched, key sets which have
+    not been used for `idle_ttl` seconds are evicted, followed by the least recently used key
+    sets until the estimated size of all key sets is within `max_size`. Eviction only happens
+    when a key set is fetched or [trim][federatedidentity.KeyStore.trim] is called and so a store
+    which fetches nothing may hold idle key sets until it is trimmed. Memory use is reported by
+    [usage][federatedidentity.KeyStore.usage].
+
+    An evicted key set's cache is removed from the store. Issuers holding the cache continue to
+    work and fetch the key set again when next needed, returning the cache to the store if no
+    other cache has since been created for its JWKS URL.
+
+    Args:
+        request: An optional HTTP request callable. If omitted a default implementation based
+            on the [requests][] module is used.
+        async_request: An optional asynchronous HTTP request callable. If omitted a default
+            implementation based on the [requests][] module is used.
+        policy: Refresh policy for key set caches created by the store. If omitted, a default
+            policy is used.
+        timeout: An optional time budget in seconds for each request for a discovery document
+            or key set made by the store, including background refreshes.
+        max_size: Optional budget in bytes for the estimated memory used by key sets. Key sets
+            shared by several JWKS URLs are counted once per URL.
+        idle_ttl: Optional time in seconds after which an unused key set may be evicted.
+        clock: Callable returning a monotonic time in seconds. Defaults to [time.monotonic][].
+    """
+
+    policy: Optional[RefreshPolicy]
+    "Refresh policy for key set caches created by the store."
+    timeout: Optional[float]
+    "Time budget in seconds for each request made by the store."
+    max_size: Optional[int]
+    "Budget in bytes for the estimated memory used by key sets."
+    idle_ttl: Optional[float]
+    "Time in seconds after which an unused key set may be evicted."
+
+    def __init__(
+        self,
+        request: Optional[RequestBase] = None,
+        async_request: Optional[AsyncRequestBase] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+        max_size: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.policy = policy
+        self.timeout = timeout
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._evictions = 0
+        self._request = request if request is not None else requests_transport.request
+        self._async_request = (
+            async_request if async_request is not None else requests_transport.async_request
+        )
+        self._lock = threading.Lock()
+        self._caches: dict[str, KeySetCache] = {}
+        self._key_sets_by_digest: weakref.WeakValueDictionary[bytes, JWKSet] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def __len__(self) -> int:
+        "Number of distinct JWKS URLs in the store."
+        return len(self._caches)
+
+    def usage(self) -> KeyStoreUsage:
+        "Return a snapshot of the memory used by the store's key sets."
+        with self._lock:
+            caches = list(self._caches.values())
+        return KeyStoreUsage(
+            jwks_uris=len(caches),
+            key_sets=sum(1 for cache in caches if cache.has_key_set),
+            size=sum(cache.size for cache in caches),
+            max_size=self.max_size,
+            evictions=self._evictions,
+        )
+
+    def trim(self) -> None:
+        "Evict idle key sets and, if the store is over budget, the least recently used."
+        self._make_room(None, 0)
+
+    def key_cache(self, jwks_uri: str) -> KeySetCache:
+        """
+        Return the key set cache for a JWKS URL, creating it if necessary. The key set is not
+        fetched by this method.
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+        """
+        cache = self._caches.get(jwks_uri)
+        if cache is not None:
+            return cache
+        validated_jwks_uri = _oidc.validate_jwks_uri(jwks_uri)
+        with self._lock:
+            cache = self._caches.get(jwks_uri)
+            if cache is None:
+                cache = self._caches[jwks_uri] = self._new_cache(validated_jwks_uri)
+        return cache
+
+    def from_discovery(self, name: str) -> RefreshingIssuer:
+        """
+        Initialise an issuer as per [OpenID Connect Discovery][oidc-discovery] whose key set is
+        held in this store. The key set is only fetched if no other issuer in the store shares
+        the issuer's `jwks_uri`.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                discovered.
+        """
+        cache = self.key_cache(
+            _oidc.fetch_jwks_uri(name, self._request, _oidc.deadline_after(self.timeout))
+        )
+        if not cache.has_key_set:
+            cache.refresh()
+        return RefreshingIssuer(name=name, key_cache=cache)
+
+    async def async_from_discovery(self, name: str) -> RefreshingIssuer:
+        """
+        Initialise an issuer as per [OpenID Connect Discovery][oidc-discovery] whose key set is
+        held in this store. The key set is only fetched if no other issuer in the store shares
+        the issuer's `jwks_uri`.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                discovered.
+        """
+        cache = self.key_cache(
+            await _oidc.async_fetch_jwks_uri(
+                name, self._async_request, _oidc.deadline_after(self.timeout)
+            )
+        )
+        if not cache.has_key_set:
+            await cache.async_refresh()
+        return RefreshingIssuer(name=name, key_cache=cache)
+
+    def from_jwks_uri(self, name: str, jwks_uri: str) -> RefreshingIssuer:
+        """
+        Initialise an issuer whose key set is fetched from a known JWKS URL and held in this
+        store. The discovery document is not fetched. The key set is only fetched if no other
+        issuer in the store shares the JWKS URL.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            jwks_uri: URL of the issuer's key set.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched.
+        """
+        cache = self.key_cache(jwks_uri)
+        if not cache.has_key_set:
+            cache.refresh()
+        return RefreshingIssuer(name=name, key_cache=cache)
+
+    def _new_cache(self, jwks_uri: _oidc.ValidatedJWKSUrl) -> KeySetCache:
+        cache = KeySetCache(
+            lambda: self._fetch(jwks_uri, cache),
+            lambda: self._async_fetch(jwks_uri, cache),
+            policy=self.policy,
+            clock=self._clock,
+        )
+        return cache
+
+    def _fetch(
+        self, jwks_uri: _oidc.ValidatedJWKSUrl, cache: KeySetCache
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        r = _oidc._request_json(jwks_uri, self._request, _oidc.deadline_after(self.timeout))
+        key_set = self._key_set_from_response(r)
+        self._fetched(jwks_uri, cache, key_set)
+        return key_set, r.headers
+
+    async def _async_fetch(
+        self, jwks_uri: _oidc.ValidatedJWKSUrl, cache: KeySetCache
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        r = await _oidc._async_request_json(
+            jwks_uri, self._async_request, _oidc.deadline_after(self.timeout)
+        )
+        key_set = self._key_set_from_response(r)
+        self._fetched(jwks_uri, cache, key_set)
+        return key_set, r.headers
+
+    def _fetched(self, jwks_uri: str, cache: KeySetCache, key_set: JWKSet) -> None:
+        "Return an evicted cache to the store and make room for its newly fetched key set."
+        with self._lock:
+            self._caches.setdefault(jwks_uri, cache)
+        self._make_room(cache, key_set_size(key_set))
+
+    def _make_room(self, fetching: Optional[KeySetCache], size: int) -> None:
+        """
+        Evict key sets so that one of `size` bytes fetched for the cache `fetching` fits within
+        the budget. The key set being replaced in `fetching` is not counted.
+        """
+        if self.max_size is None and self.idle_ttl is None:
+            return
+        with self._lock:
+            caches = [
+                (jwks_uri, cache)
+                for jwks_uri, cache in self._caches.items()
+                if cache is not fetching and cache.has_key_set
+            ]
+        # Least recently used first.
+        caches.sort(key=lambda item: item[1].last_used or 0.0)
+        now = self._clock()
+        total = size + sum(cache.size for _, cache in caches)
+        for jwks_uri, cache in caches:
+            idle = self.idle_ttl is not None and now - (cache.last_used or 0.0) >= self.idle_ttl
+            over_budget = self.max_size is not None and total > self.max_size
+            if not (idle or over_budget):
+                continue
+            total -= cache.size
+            cache.invalidate()
+            with self._lock:
+                # Remove the cache so that the store does not grow with every JWKS URL seen.
+                if self._caches.get(jwks_uri) is cache:
+                    del self._caches[jwks_uri]
+                self._evictions += 1
+
+    def _key_set_from_response(self, r: Response) -> JWKSet:
+        "Parse a key set re-using an existing key set with identical content if there is one."
+        digest = hashlib.sha256(r.content).digest()
+        # WeakValueDictionary is not safe for concurrent use without the GIL.
+        with self._lock:
+            key_set = self._key_sets_by_digest.get(digest)
+        if key_set is not None:
+            return key_set
+        key_set = _oidc.key_set_from_json(r.content)
+        with self._lock:
+            return self._key_sets_by_digest.setdefault(digest, key_set)
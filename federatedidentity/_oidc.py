@@ -1,27 +1,97 @@
+import asyncio
+import base64
+import binascii
 import dataclasses
 import json
-from typing import Any, NewType, Optional, cast
+import math
+import re
+import threading
+import time
+import weakref
+from collections.abc import Callable, Mapping
+from typing import Any, NewType, Optional, Union, cast
 from urllib.parse import urlparse
 
 from jwcrypto.common import JWException
-from jwcrypto.jwk import JWKSet
-from jwcrypto.jwt import JWT
+from jwcrypto.jwa import JWA
+from jwcrypto.jwk import JWK, InvalidJWKType, InvalidJWKValue, JWKSet
 from validators.url import url as validate_url
 
 from .exceptions import (
+    DeadlineExceededError,
+    ErrorCode,
     InvalidIssuerError,
     InvalidJWKSUrlError,
     InvalidOIDCDiscoveryDocumentError,
     InvalidTokenError,
     TransportError,
 )
-from .transport import AsyncRequestBase, RequestBase
+from .transport import AsyncRequestBase, RequestBase, Response
 from .transport import requests as requests_transport
 
 ValidatedIssuer = NewType("ValidatedIssuer", str)
 ValidatedJWKSUrl = NewType("ValidatedJWKSUrl", str)
 UnvalidatedClaims = NewType("UnvalidatedClaims", dict[str, Any])
 
+AnyToken = Union[str, bytes, bytearray, memoryview]
+
+# Leading byte of serialized issuers. Increment if the serialization format changes.
+_SERIALIZATION_VERSION = b"\x01"
+
+# Signature algorithms accepted in tokens.
+_ALLOWED_ALGS = frozenset(["RS256", "ES256"])
+
+# Default allowed clock skew in seconds when checking "exp" and "nbf" claims.
+_LEEWAY = 60
+
+# JWS compact serialization: three base64url segments separated by dots. The signature segment
+# may be empty in general but any token with an empty signature fails verification.
+_COMPACT_JWS_PATTERN = re.compile(rb"([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]*)")
+
+# Imported keys indexed by their canonical JSON form so that keys which are unchanged when a key
+# set is fetched again are not imported again. Keys are dropped once no key set refers to them.
+_imported_keys: weakref.WeakValueDictionary[str, JWK] = weakref.WeakValueDictionary()
+_imported_keys_lock = threading.Lock()
+
+
+@dataclasses.dataclass(frozen=True)
+class ParsedToken:
+    "A JWS compact serialization split into its decoded parts. The token is not verified."
+
+    header: dict[str, Any]
+    claims: UnvalidatedClaims
+    signing_input: memoryview
+    signature: bytes
+
+
+@dataclasses.dataclass(frozen=True)
+class TimePolicy:
+    """
+    Policy for checking a token's `exp`, `nbf` and `iat` claims. The checks are made on the
+    unverified claims before any key is looked up or signature verified so that expired tokens
+    are rejected cheaply. All times are in seconds.
+
+    The clock may be replaced, for example to read the time once per batch of tokens rather than
+    once per token:
+
+    ```py
+    now = time.time()
+    policy = TimePolicy(clock=lambda: now)
+    results = [try_verify_id_token(t, issuers, audiences, time_policy=policy) for t in batch]
+    ```
+    """
+
+    leeway: float = _LEEWAY
+    "Allowed clock skew when checking the `exp`, `nbf` and `iat` claims."
+    max_age: Optional[float] = None
+    "If not `None`, tokens issued longer ago than this according to `iat` are rejected."
+    clock: Callable[[], float] = time.time
+    "Callable returning the current time in seconds since the epoch."
+
+
+DEFAULT_TIME_POLICY = TimePolicy()
+"Time policy used if none is specified."
+
 
 @dataclasses.dataclass(frozen=True)
 class Issuer:
@@ -34,8 +104,55 @@ class Issuer:
     key_set: JWKSet
     "JWK key set associated with the issuer used to verify JWT signatures."
 
+    def matches(self, unvalidated_claims: Mapping[str, Any]) -> bool:
+        "Return `True` if the `iss` claim of a token matches this issuer."
+        return unvalidated_claims.get("iss") == self.name
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the issuer into a compact, versioned form which may be passed to
+        [from_bytes][federatedidentity.Issuer.from_bytes]. Only public key parameters are
+        included.
+
+        Issuers are pickled using this form and so may be cheaply sent to worker processes.
+        """
+        keys = [key.export_public(as_dict=True) for key in self.key_set["keys"]]
+        return _SERIALIZATION_VERSION + json.dumps(
+            {"iss": self.name, "keys": keys}, separators=(",", ":")
+        ).encode("utf-8")
+
     @classmethod
-    def from_discovery(cls, name: str, request: Optional[RequestBase] = None) -> "Issuer":
+    def from_bytes(cls, data: bytes) -> "Issuer":
+        """
+        Create an issuer from the serialized form returned by
+        [to_bytes][federatedidentity.Issuer.to_bytes].
+
+        Raises:
+            ValueError: The serialized form is malformed or has an unsupported version.
+        """
+        if data[:1] != _SERIALIZATION_VERSION:
+            raise ValueError("Unsupported issuer serialization version.")
+        try:
+            serialized = json.loads(data[1:])
+            key_set = JWKSet()
+            for key in serialized["keys"]:
+                key_set.add(JWK(**key))
+            return cls(name=serialized["iss"], key_set=key_set)
+        except (ValueError, TypeError, KeyError, JWException) as e:
+            raise ValueError(f"Malformed serialized issuer: {e}") from e
+
+    def __reduce__(self):
+        # JWK objects cache imported keys which cannot be pickled and so the compact form is used.
+        return (type(self).from_bytes, (self.to_bytes(),))
+
+    @classmethod
+    def from_discovery(
+        cls,
+        name: str,
+        request: Optional[RequestBase] = None,
+        *,
+        timeout: Optional[float] = None,
+    ) -> "Issuer":
         """
         Initialise an issuer fetching key sets as per [OpenID Connect Discovery][oidc-discovery].
 
@@ -45,20 +162,27 @@ class Issuer:
             name: The name of the issuer as it would appear in the "iss" claim of a token
             request: An optional HTTP request callable. If omitted a default implementation based
                 on the [requests][] module is used.
+            timeout: An optional time budget in seconds shared by the discovery document and key
+                set requests. Each request is passed the remaining budget as its timeout.
 
         Returns:
             a newly-created issuer
 
         Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
             federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
                 discovered.
         """
         request = request if request is not None else requests_transport.request
-        return Issuer(name=name, key_set=fetch_jwks(name, request))
+        return Issuer(name=name, key_set=fetch_jwks(name, request, deadline_after(timeout)))
 
     @classmethod
     async def async_from_discovery(
-        cls, name: str, request: Optional[AsyncRequestBase] = None
+        cls,
+        name: str,
+        request: Optional[AsyncRequestBase] = None,
+        *,
+        timeout: Optional[float] = None,
     ) -> "Issuer":
         """
         Initialise an issuer fetching key sets as per [OpenID Connect Discovery][oidc-discovery].
@@ -69,16 +193,96 @@ class Issuer:
             name: The name of the issuer as it would appear in the "iss" claim of a token
             request: An optional asynchronous HTTP request callable. If omitted a default
                 implementation based on the [requests][] module is used.
+            timeout: An optional time budget in seconds shared by the discovery document and key
+                set requests. A request still in progress when the budget is exhausted is
+                cancelled.
 
         Returns:
             a newly-created issuer
 
         Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
             federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
                 discovered.
         """
         request = request if request is not None else requests_transport.async_request
-        return Issuer(name=name, key_set=await async_fetch_jwks(name, request))
+        return Issuer(
+            name=name, key_set=await async_fetch_jwks(name, request, deadline_after(timeout))
+        )
+
+    @classmethod
+    def from_jwks_uri(
+        cls,
+        name: str,
+        jwks_uri: str,
+        request: Optional[RequestBase] = None,
+        *,
+        timeout: Optional[float] = None,
+    ) -> "Issuer":
+        """
+        Initialise an issuer fetching its key set from a known JWKS URL. The OIDC discovery
+        document is not fetched which saves a round-trip for providers whose `jwks_uri` is
+        stable.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            jwks_uri: URL of the issuer's key set.
+            request: An optional HTTP request callable. If omitted a default implementation based
+                on the [requests][] module is used.
+            timeout: An optional time budget in seconds for the key set request.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched.
+        """
+        request = request if request is not None else requests_transport.request
+        key_set, _ = fetch_jwks_from_uri(
+            validate_jwks_uri(jwks_uri), request, deadline_after(timeout)
+        )
+        return Issuer(name=name, key_set=key_set)
+
+    @classmethod
+    async def async_from_jwks_uri(
+        cls,
+        name: str,
+        jwks_uri: str,
+        request: Optional[AsyncRequestBase] = None,
+        *,
+        timeout: Optional[float] = None,
+    ) -> "Issuer":
+        """
+        Initialise an issuer fetching its key set from a known JWKS URL. The OIDC discovery
+        document is not fetched which saves a round-trip for providers whose `jwks_uri` is
+        stable.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            jwks_uri: URL of the issuer's key set.
+            request: An optional asynchronous HTTP request callable. If omitted a default
+                implementation based on the [requests][] module is used.
+            timeout: An optional time budget in seconds for the key set request.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched.
+        """
+        request = request if request is not None else requests_transport.async_request
+        key_set, _ = await async_fetch_jwks_from_uri(
+            validate_jwks_uri(jwks_uri), request, deadline_after(timeout)
+        )
+        return Issuer(name=name, key_set=key_set)
 
 
 def validate_issuer(unvalidated_issuer: str) -> ValidatedIssuer:
@@ -126,111 +330,529 @@ def oidc_discovery_document_url(issuer: ValidatedIssuer) -> str:
     return "".join([issuer.rstrip("/"), "/.well-known/openid-configuration"])
 
 
-def _jwks_uri_from_oidc_discovery_document(
-    expected_issuer: str, oidc_discovery_doc_content: bytes
-) -> ValidatedJWKSUrl:
+def _decode_oidc_discovery_document(oidc_discovery_doc_content: bytes) -> dict[str, Any]:
     try:
         oidc_discovery_doc = json.loads(oidc_discovery_doc_content)
     except json.JSONDecodeError as e:
         raise InvalidOIDCDiscoveryDocumentError(f"Error decoding OIDC discovery document: {e}")
+    if not isinstance(oidc_discovery_doc, dict):
+        raise InvalidOIDCDiscoveryDocumentError("OIDC discovery document is not a JSON object.")
+    return oidc_discovery_doc
+
 
+def _issuer_from_oidc_discovery_document(oidc_discovery_doc: dict[str, Any]) -> str:
     try:
-        issuer = oidc_discovery_doc["issuer"]
+        return oidc_discovery_doc["issuer"]
     except KeyError:
         raise InvalidOIDCDiscoveryDocumentError(
             "'issuer' key not present in OIDC discovery document."
         )
+
+
+def _validated_jwks_uri_from_oidc_discovery_document(
+    oidc_discovery_doc: dict[str, Any],
+) -> ValidatedJWKSUrl:
+    try:
+        return validate_jwks_uri(oidc_discovery_doc["jwks_uri"])
+    except KeyError:
+        raise InvalidOIDCDiscoveryDocumentError(
+            "'jwks_uri' key not present in OIDC discovery document."
+        )
+
+
+def _jwks_uri_from_oidc_discovery_document(
+    expected_issuer: str, oidc_discovery_doc_content: bytes
+) -> ValidatedJWKSUrl:
+    oidc_discovery_doc = _decode_oidc_discovery_document(oidc_discovery_doc_content)
+    issuer = _issuer_from_oidc_discovery_document(oidc_discovery_doc)
     if issuer != expected_issuer:
         raise InvalidOIDCDiscoveryDocumentError(
             f"Issuer {issuer!r} in OIDC discovery document does not "
             f"match expected issuer {expected_issuer!r}."
         )
+    return _validated_jwks_uri_from_oidc_discovery_document(oidc_discovery_doc)
+
 
+def _issuer_template_from_oidc_discovery_document(
+    discovery_issuer: str, placeholder: str, oidc_discovery_doc_content: bytes
+) -> tuple[str, ValidatedJWKSUrl]:
+    """
+    Extract a templated issuer and JWKS URL from a discovery document fetched from a multi-tenant
+    endpoint. The template must contain the placeholder exactly once and have the same origin as
+    the discovery issuer.
+    """
+    oidc_discovery_doc = _decode_oidc_discovery_document(oidc_discovery_doc_content)
+    issuer_template = _issuer_from_oidc_discovery_document(oidc_discovery_doc)
+    if not isinstance(issuer_template, str) or issuer_template.count(placeholder) != 1:
+        raise InvalidOIDCDiscoveryDocumentError(
+            f"Issuer {issuer_template!r} in OIDC discovery document does not contain "
+            f"{placeholder!r} exactly once."
+        )
     try:
-        jwks_uri = validate_jwks_uri(oidc_discovery_doc["jwks_uri"])
-    except KeyError:
+        example_issuer = validate_issuer(issuer_template.replace(placeholder, "tenant"))
+    except InvalidIssuerError as e:
         raise InvalidOIDCDiscoveryDocumentError(
-            "'jwks_uri' key not present in OIDC discovery document."
+            f"Issuer {issuer_template!r} in OIDC discovery document is not valid: {e}"
+        )
+    if urlparse(example_issuer).netloc != urlparse(discovery_issuer).netloc:
+        raise InvalidOIDCDiscoveryDocumentError(
+            f"Issuer {issuer_template!r} in OIDC discovery document does not have the same "
+            f"host as discovery issuer {discovery_issuer!r}."
         )
-    return jwks_uri
+    return issuer_template, _validated_jwks_uri_from_oidc_discovery_document(oidc_discovery_doc)
+
+
+def deadline_after(timeout: Optional[float]) -> Optional[float]:
+    "Convert an optional timeout in seconds into an optional deadline on the monotonic clock."
+    return time.monotonic() + timeout if timeout is not None else None
+
+
+def _remaining_time(url: str, deadline: Optional[float]) -> Optional[float]:
+    "Time remaining before an optional deadline. Raises DeadlineExceededError if it has passed."
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError(f"Deadline exceeded before requesting {url!r}.")
+    return remaining
+
 
+def _check_deadline(url: str, deadline: Optional[float]) -> None:
+    """
+    Raise DeadlineExceededError if an optional deadline passed while requesting a URL. Transports
+    need not bound the time taken to read a response and so a response which arrives late is
+    discarded.
+    """
+    if deadline is not None and time.monotonic() > deadline:
+        raise DeadlineExceededError(f"Deadline exceeded requesting {url!r}.")
 
-def _request_json(url: str, request: RequestBase) -> bytes:
+
+def _request_json(url: str, request: RequestBase, deadline: Optional[float] = None) -> Response:
     """
     Wrapper arround RequestBase which requests a JSON document and raises TransportError on an
-    error status code. The requested JSON document is not parsed.
+    error status code. The requested JSON document is not parsed. If a deadline is given, the
+    time remaining is passed to the transport as a timeout and DeadlineExceededError is raised if
+    the deadline has passed once the transport returns.
 
     Returns:
-        The response contents.
+        The response.
     """
-    r = request(url, headers={"Accept": "application/json"})
+    headers = {"Accept": "application/json"}
+    timeout = _remaining_time(url, deadline)
+    # The timeout is only passed if there is a deadline so that transports which do not support
+    # timeouts continue to work.
+    r = (
+        request(url, headers=headers)
+        if timeout is None
+        else request(url, headers=headers, timeout=timeout)
+    )
+    _check_deadline(url, deadline)
     if r.status_code >= 400:
         raise TransportError(
             f"Error status when requesting {url!r}: {r.status_code}",
         )
-    return r.content
+    return r
 
 
-async def _async_request_json(url: str, request: AsyncRequestBase) -> bytes:
+async def _async_request_json(
+    url: str, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> Response:
     """
     Wrapper arround RequestBase which requests a JSON document and raises TransportError on an
-    error status code. The requested JSON document is not parsed.
+    error status code. The requested JSON document is not parsed. If a deadline is given, the
+    request is cancelled if it has not completed by the deadline. Cancelling the request only
+    stops waiting for it: a transport which runs requests in a worker thread, such as the default
+    [requests][] based transport, leaves the thread running until its own timeout expires.
 
     Returns:
-        The response contents.
+        The response.
     """
-    r = await request(url, headers={"Accept": "application/json"})
+    headers = {"Accept": "application/json"}
+    timeout = _remaining_time(url, deadline)
+    if timeout is None:
+        r = await request(url, headers=headers)
+    else:
+        try:
+            r = await asyncio.wait_for(request(url, headers=headers, timeout=timeout), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(f"Deadline exceeded requesting {url!r}.")
+        _check_deadline(url, deadline)
     if r.status_code >= 400:
         raise TransportError(
             f"Error status when requesting {url!r}: {r.status_code}",
         )
-    return r.content
+    return r
 
 
-def fetch_jwks(unvalidated_issuer: str, request: RequestBase) -> JWKSet:
+def fetch_jwks(
+    unvalidated_issuer: str, request: RequestBase, deadline: Optional[float] = None
+) -> JWKSet:
     "Fetch a JWK set from an unvalidated issuer."
+    return fetch_jwks_and_headers(unvalidated_issuer, request, deadline)[0]
+
+
+async def async_fetch_jwks(
+    unvalidated_issuer: str, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> JWKSet:
+    "Fetch a JWK set from an unvalidated issuer using an asynchronous fetcher."
+    return (await async_fetch_jwks_and_headers(unvalidated_issuer, request, deadline))[0]
+
+
+def fetch_jwks_and_headers(
+    unvalidated_issuer: str, request: RequestBase, deadline: Optional[float] = None
+) -> tuple[JWKSet, Mapping[str, str]]:
+    "Fetch a JWK set from an unvalidated issuer along with the headers of the JWKS response."
+    return fetch_jwks_from_uri(
+        fetch_jwks_uri(unvalidated_issuer, request, deadline), request, deadline
+    )
+
+
+async def async_fetch_jwks_and_headers(
+    unvalidated_issuer: str, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> tuple[JWKSet, Mapping[str, str]]:
+    """
+    Fetch a JWK set from an unvalidated issuer along with the headers of the JWKS response using
+    an asynchronous fetcher.
+    """
+    return await async_fetch_jwks_from_uri(
+        await async_fetch_jwks_uri(unvalidated_issuer, request, deadline), request, deadline
+    )
+
+
+def key_set_from_json(content: Union[str, bytes]) -> JWKSet:
+    """
+    Parse a JSON Web Key Set as [JWKSet.from_json][jwcrypto.jwk.JWKSet.from_json] does but re-use
+    previously imported key objects for keys whose members are unchanged, and so which have the
+    same key id and thumbprint. Only new keys are imported. Keys of unsupported types are
+    ignored.
+
+    Raises:
+        jwcrypto.jwk.InvalidJWKValue: The key set is malformed.
+    """
+    try:
+        document = json.loads(content)
+        if "keys" not in document:
+            raise ValueError("'keys' not in set")
+        key_set = JWKSet()
+        for name, value in document.items():
+            if name != "keys":
+                key_set[name] = value
+                continue
+            for key_members in value:
+                key = _imported_key(key_members)
+                if key is not None:
+                    key_set.add(key)
+    except Exception as e:
+        raise InvalidJWKValue from e
+    return key_set
+
+
+def _imported_key(key_members: dict[str, Any]) -> Optional[JWK]:
+    "Return an imported key for a key's members or None if the key type is not supported."
+    canonical_form = json.dumps(key_members, sort_keys=True, separators=(",", ":"))
+    # WeakValueDictionary is not safe for concurrent use without the GIL.
+    with _imported_keys_lock:
+        key = _imported_keys.get(canonical_form)
+    if key is not None:
+        return key
+    try:
+        key = JWK(**key_members)
+    except InvalidJWKType:
+        return None
+    with _imported_keys_lock:
+        return _imported_keys.setdefault(canonical_form, key)
+
+
+def fetch_jwks_from_uri(
+    jwks_uri: ValidatedJWKSUrl, request: RequestBase, deadline: Optional[float] = None
+) -> tuple[JWKSet, Mapping[str, str]]:
+    "Fetch a JWK set from a validated JWKS URL along with the headers of the response."
+    r = _request_json(jwks_uri, request, deadline)
+    return key_set_from_json(r.content), r.headers
+
+
+async def async_fetch_jwks_from_uri(
+    jwks_uri: ValidatedJWKSUrl, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> tuple[JWKSet, Mapping[str, str]]:
+    """
+    Fetch a JWK set from a validated JWKS URL along with the headers of the response using an
+    asynchronous fetcher.
+    """
+    r = await _async_request_json(jwks_uri, request, deadline)
+    return key_set_from_json(r.content), r.headers
+
+
+def fetch_jwks_uri(
+    unvalidated_issuer: str, request: RequestBase, deadline: Optional[float] = None
+) -> ValidatedJWKSUrl:
+    "Fetch the JWKS URL for an unvalidated issuer from its OIDC discovery document."
     oidc_discovery_doc = _request_json(
-        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request
+        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request, deadline
     )
-    jwks_uri = _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc)
-    return JWKSet.from_json(_request_json(jwks_uri, request))
+    return _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc.content)
 
 
-async def async_fetch_jwks(unvalidated_issuer: str, request: AsyncRequestBase) -> JWKSet:
-    "Fetch a JWK set from an unvalidated issuer using an asynchronous fetcher."
+async def async_fetch_jwks_uri(
+    unvalidated_issuer: str, request: AsyncRequestBase, deadline: Optional[float] = None
+) -> ValidatedJWKSUrl:
+    """
+    Fetch the JWKS URL for an unvalidated issuer from its OIDC discovery document using an
+    asynchronous fetcher.
+    """
     oidc_discovery_doc = await _async_request_json(
-        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request
+        oidc_discovery_document_url(validate_issuer(unvalidated_issuer)), request, deadline
     )
-    jwks_uri = _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc)
-    return JWKSet.from_json(await _async_request_json(jwks_uri, request))
+    return _jwks_uri_from_oidc_discovery_document(unvalidated_issuer, oidc_discovery_doc.content)
 
 
-def unvalidated_claims_from_token(unvalidated_token: str) -> UnvalidatedClaims:
-    "Parse and extract unverified claims from the token."
+def fetch_issuer_template(
+    unvalidated_discovery_issuer: str,
+    placeholder: str,
+    request: RequestBase,
+    deadline: Optional[float] = None,
+) -> tuple[str, ValidatedJWKSUrl]:
+    """
+    Fetch the templated issuer and JWKS URL from the OIDC discovery document of a multi-tenant
+    endpoint.
+    """
+    oidc_discovery_doc = _request_json(
+        oidc_discovery_document_url(validate_issuer(unvalidated_discovery_issuer)),
+        request,
+        deadline,
+    )
+    return _issuer_template_from_oidc_discovery_document(
+        unvalidated_discovery_issuer, placeholder, oidc_discovery_doc.content
+    )
+
+
+async def async_fetch_issuer_template(
+    unvalidated_discovery_issuer: str,
+    placeholder: str,
+    request: AsyncRequestBase,
+    deadline: Optional[float] = None,
+) -> tuple[str, ValidatedJWKSUrl]:
+    """
+    Fetch the templated issuer and JWKS URL from the OIDC discovery document of a multi-tenant
+    endpoint using an asynchronous fetcher.
+    """
+    oidc_discovery_doc = await _async_request_json(
+        oidc_discovery_document_url(validate_issuer(unvalidated_discovery_issuer)),
+        request,
+        deadline,
+    )
+    return _issuer_template_from_oidc_discovery_document(
+        unvalidated_discovery_issuer, placeholder, oidc_discovery_doc.content
+    )
+
+
+def parse_token(unvalidated_token: AnyToken) -> ParsedToken:
+    """
+    Parse a JWS compact serialization without verifying it. Bytes-like tokens are not copied
+    before being split into segments.
+
+    Raises:
+        InvalidTokenError: The token is not a JWS compact serialization with a JSON object header
+            and payload.
+        UnicodeDecodeError: A bytes-like token is not ASCII.
+    """
+    if isinstance(unvalidated_token, str):
+        try:
+            data = memoryview(unvalidated_token.encode("ascii"))
+        except UnicodeEncodeError:
+            raise InvalidTokenError("Could not parse token as JWT", code=ErrorCode.MALFORMED_TOKEN)
+    else:
+        data = memoryview(unvalidated_token).cast("B")
+
+    # A single match both checks that the token is ASCII and finds the segment boundaries.
+    match = _COMPACT_JWS_PATTERN.fullmatch(data)
+    if match is None:
+        if not data.tobytes().isascii():
+            data.tobytes().decode("ascii")  # raises UnicodeDecodeError
+        raise InvalidTokenError("Could not parse token as JWT", code=ErrorCode.MALFORMED_TOKEN)
+
     try:
-        jwt = JWT.from_jose_token(unvalidated_token)
-    except Exception:
-        raise InvalidTokenError("Could not parse token as JWT")
+        header = json.loads(_base64url_decode(data[match.start(1) : match.end(1)]))
+        signature = _base64url_decode(data[match.start(3) : match.end(3)])
+    except (ValueError, binascii.Error):
+        raise InvalidTokenError("Could not parse token as JWT", code=ErrorCode.MALFORMED_TOKEN)
     try:
-        payload = json.loads(jwt.token.objects["payload"])
-    except (json.JSONDecodeError, KeyError):
-        raise InvalidTokenError("Could not decode token payload as JSON.")
-    return cast(UnvalidatedClaims, payload)
+        claims = json.loads(_base64url_decode(data[match.start(2) : match.end(2)]))
+    except (ValueError, binascii.Error):
+        raise InvalidTokenError(
+            "Could not decode token payload as JSON.", code=ErrorCode.MALFORMED_TOKEN
+        )
+    if not isinstance(header, dict):
+        raise InvalidTokenError("Could not parse token as JWT", code=ErrorCode.MALFORMED_TOKEN)
+    if not isinstance(claims, dict):
+        raise InvalidTokenError(
+            "Could not decode token payload as JSON object.", code=ErrorCode.MALFORMED_TOKEN
+        )
+    return ParsedToken(
+        header=header,
+        claims=cast(UnvalidatedClaims, claims),
+        signing_input=data[: match.end(2)],
+        signature=signature,
+    )
 
 
-def unvalidated_claim_from_token(unvalidated_token: str, claim: str) -> str:
+def _base64url_decode(segment: memoryview) -> bytes:
+    return base64.urlsafe_b64decode(segment.tobytes() + b"=" * (-len(segment) % 4))
+
+
+def unvalidated_claims_from_token(unvalidated_token: AnyToken) -> UnvalidatedClaims:
+    "Parse and extract unverified claims from the token."
+    return parse_token(unvalidated_token).claims
+
+
+def unvalidated_claim_from_token(unvalidated_token: AnyToken, claim: str) -> str:
     "Parse and extract an unvalidated claim from an unvalidated token."
     claims = unvalidated_claims_from_token(unvalidated_token)
     try:
         return claims[claim]
     except KeyError:
-        raise InvalidTokenError(f"Claim '{claim}' not present in token paylaod.")
+        raise InvalidTokenError(
+            "Claim %r not present in token paylaod.", claim, code=ErrorCode.MISSING_CLAIM
+        )
 
 
-def validate_token(unvalidated_token: str, jwk_set: JWKSet) -> JWT:
-    try:
-        jwt = JWT(algs=["RS256", "ES256"], expected_type="JWS")
-        jwt.deserialize(unvalidated_token, jwk_set)
-    except JWException as e:
-        raise InvalidTokenError(f"Invalid token: {e}")
-    return jwt
+def validate_token(
+    parsed_token: ParsedToken, jwk_set: JWKSet, time_policy: TimePolicy = DEFAULT_TIME_POLICY
+) -> None:
+    """
+    Verify the signature of a parsed token against a key set and validate the format of its
+    registered claims and its "exp" and "nbf" claims. With the default time policy, the checks
+    match those made by jwcrypto's JWT class with the default leeway of 60 seconds.
+
+    Raises:
+        InvalidTokenError: The token is not valid.
+    """
+    error = token_error(parsed_token, jwk_set, time_policy)
+    if error is not None:
+        raise error
+
+
+def token_error(
+    parsed_token: ParsedToken, jwk_set: JWKSet, time_policy: TimePolicy = DEFAULT_TIME_POLICY
+) -> Optional[InvalidTokenError]:
+    """
+    As [validate_token][federatedidentity._oidc.validate_token] but return the error rather than
+    raising it so that rejected tokens do not pay for raising an exception. Time claims are
+    checked before the signature.
+
+    Returns:
+        the reason the token is not valid or `None` if it is valid
+    """
+    error = time_claims_error(parsed_token.claims, time_policy)
+    if error is not None:
+        return error
+    return signature_error(parsed_token, jwk_set)
+
+
+def time_claims_error(
+    claims: Mapping[str, Any], time_policy: TimePolicy = DEFAULT_TIME_POLICY
+) -> Optional[InvalidTokenError]:
+    """
+    Check the format of a token's "exp", "nbf" and "iat" claims and that the token is valid at
+    the current time. This needs no cryptography and so is made before the signature is
+    verified.
+
+    Returns:
+        the reason the token is not valid or `None` if it is valid
+    """
+    for name in ("exp", "nbf", "iat"):
+        value = claims.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return InvalidTokenError(
+                "Invalid token: Claim %s is not a number", name, code=ErrorCode.MALFORMED_CLAIM
+            )
+        # JSON parsing accepts NaN and Infinity, and overlarge numbers such as 1e400 parse as
+        # infinite. Comparisons with NaN are always false and so would never expire a token.
+        if isinstance(value, float) and not math.isfinite(value):
+            return InvalidTokenError(
+                "Invalid token: Claim %s is not finite", name, code=ErrorCode.MALFORMED_CLAIM
+            )
+    now = time_policy.clock()
+    leeway = time_policy.leeway
+    exp = claims.get("exp")
+    if exp is not None and exp < now - leeway:
+        return InvalidTokenError(
+            "Invalid token: Expired at %.0f, time: %.0f", exp, now, code=ErrorCode.EXPIRED
+        )
+    nbf = claims.get("nbf")
+    if nbf is not None and nbf > now + leeway:
+        return InvalidTokenError(
+            "Invalid token: Valid from %.0f, time: %.0f", nbf, now, code=ErrorCode.NOT_YET_VALID
+        )
+    max_age = time_policy.max_age
+    iat = claims.get("iat")
+    if max_age is not None and iat is not None and iat < now - max_age - leeway:
+        return InvalidTokenError(
+            "Invalid token: Issued at %.0f, more than %.0f seconds before time: %.0f",
+            iat,
+            max_age,
+            now,
+            code=ErrorCode.EXPIRED,
+        )
+    return None
+
+
+def signature_error(parsed_token: ParsedToken, jwk_set: JWKSet) -> Optional[InvalidTokenError]:
+    """
+    Verify the signature of a parsed token against a key set and validate the format of its
+    registered claims other than time claims.
+
+    Returns:
+        the reason the token is not valid or `None` if it is valid
+    """
+    header = parsed_token.header
+    alg = header.get("alg")
+    # The header is untrusted JSON and so "alg" may be an unhashable list or object.
+    if not isinstance(alg, str) or alg not in _ALLOWED_ALGS:
+        return InvalidTokenError(
+            "Invalid token: algorithm %r is not allowed", alg, code=ErrorCode.DISALLOWED_ALGORITHM
+        )
+    if "crit" in header or "b64" in header:
+        return InvalidTokenError(
+            "Invalid token: unsupported critical header", code=ErrorCode.UNSUPPORTED_HEADER
+        )
+
+    # As with jwcrypto, the key id selects the candidate keys if present and otherwise all keys
+    # are tried.
+    kid = header.get("kid")
+    keys = jwk_set.get_keys(kid) if kid is not None else jwk_set["keys"]
+    if not keys:
+        return InvalidTokenError(
+            "Invalid token: no key matches the token's key id", code=ErrorCode.UNKNOWN_KEY
+        )
+    engine = JWA.signing_alg(alg)
+    for key in keys:
+        try:
+            engine.verify(key, parsed_token.signing_input, parsed_token.signature)
+            break
+        except Exception:
+            # Keys of the wrong type or for which verification fails are skipped.
+            continue
+    else:
+        return InvalidTokenError(
+            "Invalid token: signature verification failed", code=ErrorCode.INVALID_SIGNATURE
+        )
+
+    return _claim_format_error(parsed_token.claims)
+
+
+def _claim_format_error(claims: Mapping[str, Any]) -> Optional[InvalidTokenError]:
+    for name in ("iss", "sub", "jti", "typ"):
+        if claims.get(name) is not None and not isinstance(claims[name], str):
+            return InvalidTokenError(
+                "Invalid token: Claim %s is not a StringOrURI type",
+                name,
+                code=ErrorCode.MALFORMED_CLAIM,
+            )
+    aud = claims.get("aud")
+    if aud is not None and not (
+        isinstance(aud, str) or (isinstance(aud, list) and all(isinstance(a, str) for a in aud))
+    ):
+        return InvalidTokenError(
+            "Invalid token: Claim aud is not a StringOrURI type", code=ErrorCode.MALFORMED_CLAIM
+        )
+    return None
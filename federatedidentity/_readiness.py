@@ -0,0 +1,60 @@
+import asyncio
+from collections.abc import Iterable
+from typing import Optional
+
+from ._refresh import KeySetCache, KeySetStatus, RefreshingIssuer
+from ._templated import TemplatedIssuer
+from ._verify import AnyIssuer
+
+
+def issuer_status(issuer: AnyIssuer) -> KeySetStatus:
+    """
+    Return a snapshot of the state of an issuer's key set. The key set of an
+    [Issuer][federatedidentity.Issuer] is never refreshed and so is always usable.
+    """
+    if isinstance(issuer, (RefreshingIssuer, TemplatedIssuer)):
+        return issuer.key_cache.status()
+    return KeySetStatus(key_count=len(issuer.key_set["keys"]), usable=True, fresh=True)
+
+
+async def wait_until_ready(
+    issuers: Iterable[AnyIssuer], *, timeout: Optional[float] = None
+) -> bool:
+    """
+    Fetch the key set of each issuer which does not have a usable one, waiting for the fetches
+    to complete. Use this to delay reporting readiness until verification will not need to fetch
+    keys. Fetches are made concurrently and issuers which share a key set cache are fetched once.
+
+    ```py
+    issuers = [await KeyStore().async_from_discovery(name) for name in issuer_names]
+    ...
+    if not await wait_until_ready(issuers, timeout=5):
+        report_not_ready()
+    ```
+
+    Arguments:
+        issuers: Issuers whose key sets should be usable.
+        timeout: Optional time in seconds to wait for the fetches. Fetches still in progress when
+            it is exhausted are cancelled.
+
+    Returns:
+        `True` if every issuer has a usable key set. Failures may be inspected using
+        [issuer_status][federatedidentity.issuer_status].
+    """
+    issuers = list(issuers)
+    caches: dict[int, KeySetCache] = {}
+    for issuer in issuers:
+        if isinstance(issuer, (RefreshingIssuer, TemplatedIssuer)):
+            if not issuer.key_cache.status().usable:
+                caches[id(issuer.key_cache)] = issuer.key_cache
+    if len(caches) > 0:
+        refreshes = asyncio.gather(
+            *(cache._async_refresh_in_flight() for cache in caches.values()),
+            return_exceptions=True,
+        )
+        try:
+            # Errors are recorded by each cache and reported by its status.
+            await asyncio.wait_for(refreshes, timeout)
+        except asyncio.TimeoutError:
+            pass
+    return all(issuer_status(issuer).usable for issuer in issuers)
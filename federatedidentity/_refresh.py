@@ -0,0 +1,886 @@
+import asyncio
+import dataclasses
+import threading
+import time
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from typing import Any, Optional
+
+from jwcrypto.jwk import JWK, JWKSet
+
+from . import _oidc, sources
+from .exceptions import StaleKeySetError
+from .transport import AsyncRequestBase, RequestBase
+from .transport import requests as requests_transport
+
+KeySetFetcher = Callable[[], tuple[JWKSet, Mapping[str, str]]]
+"""
+Type representing a callable which fetches a key set. The callable should return the key set and
+the headers of the HTTP response it was fetched from.
+"""
+
+AsyncKeySetFetcher = Callable[[], Awaitable[tuple[JWKSet, Mapping[str, str]]]]
+"""
+Type representing an asynchronous callable which fetches a key set. The callable should return the
+key set and the headers of the HTTP response it was fetched from.
+"""
+
+# Rough memory used by an imported key in addition to its members, for example by the dictionary
+# itself and the cryptography key object.
+_KEY_OVERHEAD = 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class RefreshPolicy:
+    """
+    Policy controlling how often a key set is refreshed and for how long stale keys may be used.
+    All durations are in seconds.
+    """
+
+    default_max_age: float = 300.0
+    "Freshness lifetime used if the key set response does not specify one via `Cache-Control`."
+    min_max_age: float = 60.0
+    """
+    Lower bound on the freshness lifetime. This is also the minimum interval between retries after
+    a failed refresh.
+    """
+    max_max_age: float = 86400.0
+    "Upper bound on the freshness lifetime."
+    max_stale: float = 86400.0
+    """
+    How long after the key set ceases to be fresh it may continue to be used if it could not be
+    refreshed.
+    """
+    retire_after: float = 0.0
+    """
+    How long a key which has been removed from the issuer's key set continues to be accepted. This
+    allows tokens signed shortly before a key was rotated out to be verified. Retired keys are
+    dropped at the first refresh once this time has passed. Keys are removed immediately if zero.
+    """
+
+
+def max_age_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Determine the remaining freshness lifetime of a HTTP response from its `Cache-Control` and
+    `Age` headers.
+
+    Returns:
+        The remaining freshness lifetime in seconds or `None` if the headers do not specify one.
+    """
+    cache_control = _get_header(headers, "Cache-Control")
+    if cache_control is None:
+        return None
+
+    max_age = None
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.strip().lower()
+        if name in ("no-cache", "no-store"):
+            return 0.0
+        if name == "max-age":
+            try:
+                max_age = float(int(value.strip().strip('"')))
+            except ValueError:
+                return None
+    if max_age is None:
+        return None
+
+    age = _get_header(headers, "Age")
+    if age is not None:
+        try:
+            max_age -= float(int(age.strip()))
+        except ValueError:
+            pass
+    return max(0.0, max_age)
+
+
+def key_set_size(key_set: JWKSet) -> int:
+    "Estimate the memory used by a key set in bytes."
+    return sum(
+        _KEY_OVERHEAD + sum(len(name) + len(str(value)) for name, value in key.items())
+        for key in key_set["keys"]
+    )
+
+
+def _get_header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    "Case-insensitive header lookup which works with any mapping."
+    value = headers.get(name)
+    if value is not None:
+        return value
+    lower_name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lower_name:
+            return value
+    return None
+
+
+@dataclasses.dataclass(frozen=True)
+class KeySetStatus:
+    """
+    Snapshot of the state of an issuer's key set used, for example, to report readiness. All
+    durations are in seconds.
+    """
+
+    key_count: int
+    "Number of keys in the key set. Zero if no key set has been fetched."
+    usable: bool
+    "`True` if the key set may be used without a fetch on the verification path."
+    fresh: bool
+    "`True` if the key set is within its freshness lifetime."
+    age: Optional[float] = None
+    "Time since the key set was fetched or `None` if it never has been or is never refreshed."
+    max_age: Optional[float] = None
+    "Freshness lifetime of the key set or `None` if it never has been fetched or refreshed."
+    refreshing: bool = False
+    "`True` if a refresh is in flight."
+    last_error: Optional[BaseException] = None
+    "The error raised by the most recent refresh or `None` if it succeeded."
+
+
+@dataclasses.dataclass(frozen=True)
+class _CacheEntry:
+    key_set: JWKSet
+    fetched_at: float
+    max_age: float
+    size: int
+    # Keys removed from the issuer's key set which are still accepted and the time they stop
+    # being accepted. These are included in key_set.
+    retired: tuple[tuple[JWK, float], ...] = ()
+
+
+class KeySetCache:
+    """
+    A cache for a JWK key set with stale-while-revalidate and stale-if-error semantics.
+
+    The freshness lifetime of the key set is taken from the `Cache-Control` header of the response
+    it was fetched from. Once the key set is no longer fresh, it continues to be served while a
+    refresh happens in the background. If the refresh fails, the stale key set continues to be
+    served for up to [max_stale][federatedidentity.RefreshPolicy.max_stale] seconds.
+
+    A HTTP request is only made on the verification path if there is no usable key set. In that
+    case a synchronous fetch is attempted if `fetch` is provided.
+
+    Caches are safe for concurrent use from many threads, including on free-threaded Python
+    builds. Reading the key set takes no lock and at most one refresh is in flight at a time.
+
+    Args:
+        fetch: Callable used to fetch the key set synchronously.
+        async_fetch: Callable used to fetch the key set asynchronously. If a cache has both
+            `fetch` and `async_fetch`, `async_fetch` is preferred for background refreshes started
+            from within a running event loop.
+        policy: Refresh policy. If omitted, a default policy is used.
+        clock: Callable returning a monotonic time in seconds. Defaults to [time.monotonic][].
+    """
+
+    policy: RefreshPolicy
+
+    def __init__(
+        self,
+        fetch: Optional[KeySetFetcher] = None,
+        async_fetch: Optional[AsyncKeySetFetcher] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if fetch is None and async_fetch is None:
+            raise ValueError("At least one of fetch or async_fetch must be provided.")
+        self.policy = policy if policy is not None else RefreshPolicy()
+        self._fetch = fetch
+        self._async_fetch = async_fetch
+        self._clock = clock
+        self._entry: Optional[_CacheEntry] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_failure_at: Optional[float] = None
+        self._last_error: Optional[BaseException] = None
+        self._background_task: Optional[asyncio.Task] = None
+        # Fetches started before this time are discarded as the key set has since been replaced
+        # or invalidated.
+        self._superseded_at: Optional[float] = None
+        self._last_used: Optional[float] = None
+
+    @property
+    def has_key_set(self) -> bool:
+        "`True` if a key set has been fetched, regardless of whether it is still usable."
+        return self._entry is not None
+
+    @property
+    def size(self) -> int:
+        "Estimated memory used by the cached key set in bytes. Zero if there is no key set."
+        entry = self._entry
+        return entry.size if entry is not None else 0
+
+    @property
+    def last_used(self) -> Optional[float]:
+        """
+        Time on the cache's clock at which the key set was last read or stored or `None` if it
+        never has been.
+        """
+        return self._last_used
+
+    @property
+    def last_error(self) -> Optional[BaseException]:
+        "The error raised by the most recent refresh or `None` if it succeeded."
+        return self._last_error
+
+    def status(self) -> KeySetStatus:
+        "Return a snapshot of the state of the cached key set."
+        entry = self._entry
+        if entry is None:
+            return KeySetStatus(
+                key_count=0,
+                usable=False,
+                fresh=False,
+                refreshing=self._refreshing,
+                last_error=self._last_error,
+            )
+        age = self._clock() - entry.fetched_at
+        return KeySetStatus(
+            key_count=len(entry.key_set["keys"]),
+            usable=age < entry.max_age + self.policy.max_stale,
+            fresh=age < entry.max_age,
+            age=age,
+            max_age=entry.max_age,
+            refreshing=self._refreshing,
+            last_error=self._last_error,
+        )
+
+    def get(self) -> JWKSet:
+        """
+        Return the cached key set, starting a background refresh if it is no longer fresh.
+
+        Raises:
+            federatedidentity.exceptions.StaleKeySetError: There is no key set which is fresh
+                enough to be used and one could not be fetched.
+        """
+        # Reading self._entry is atomic and entries are immutable so no lock is needed here.
+        entry = self._entry
+        now = self._clock()
+        self._last_used = now
+        if entry is not None:
+            expires_at = entry.fetched_at + entry.max_age
+            if now < expires_at:
+                return entry.key_set
+            if now < expires_at + self.policy.max_stale:
+                self._start_background_refresh(now)
+                return entry.key_set
+
+        # There is no usable key set. Fetch one synchronously if we can, otherwise start a
+        # background refresh so that a later call may succeed.
+        if self._fetch is not None and self._begin_refresh(now):
+            try:
+                self._refresh()
+            except Exception as e:
+                raise StaleKeySetError(f"Could not refresh key set: {e}") from e
+            finally:
+                self._end_refresh()
+            entry = self._entry
+            if entry is not None:
+                return entry.key_set
+            raise StaleKeySetError("Key set was invalidated while it was being fetched.")
+
+        self._start_background_refresh(now)
+        raise StaleKeySetError("No key set is available which is fresh enough to be used.")
+
+    def refresh(self) -> None:
+        """
+        Fetch the key set synchronously, replacing the cached key set.
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The key set could not be
+                fetched.
+            ValueError: The cache has no synchronous fetcher.
+        """
+        if self._fetch is None:
+            raise ValueError("Key set cache has no synchronous fetcher.")
+        self._refresh()
+
+    def set_key_set(self, key_set: JWKSet, max_age: Optional[float] = None) -> None:
+        """
+        Replace the cached key set, for example when keys have been rotated and the new key set
+        is pushed to the service. The key set is treated as if it had just been fetched.
+        Verifications in progress complete using the key set they started with and refreshes in
+        flight are discarded.
+
+        Args:
+            key_set: The new key set.
+            max_age: Freshness lifetime in seconds. If omitted, the policy's default is used.
+        """
+        now = self._clock()
+        with self._lock:
+            self._superseded_at = now
+            self._last_failure_at = None
+            self._last_error = None
+            self._last_used = now
+            self._entry = _CacheEntry(
+                key_set=key_set,
+                fetched_at=now,
+                max_age=self._clamp_max_age(max_age),
+                size=key_set_size(key_set),
+            )
+
+    def invalidate(self) -> None:
+        """
+        Discard the cached key set, for example when a key has been compromised. The next
+        verification fetches the key set synchronously if the cache has a synchronous fetcher
+        and otherwise fails with [StaleKeySetError][federatedidentity.exceptions.StaleKeySetError]
+        until a background refresh completes. Refreshes in flight are discarded.
+        """
+        now = self._clock()
+        with self._lock:
+            self._superseded_at = now
+            self._last_failure_at = None
+            self._entry = None
+
+    def request_refresh(self) -> None:
+        """
+        Start a background refresh unless the key set was fetched less than
+        [min_max_age][federatedidentity.RefreshPolicy.min_max_age] seconds ago. This is called
+        when a token is signed by a key which is not in the key set, which may mean that the
+        issuer has rotated its keys. The rate limit stops tokens with unknown key ids from causing
+        a fetch each.
+        """
+        now = self._clock()
+        entry = self._entry
+        if entry is not None and now < entry.fetched_at + self.policy.min_max_age:
+            return
+        self._start_background_refresh(now)
+
+    async def async_refresh(self) -> None:
+        """
+        Fetch the key set asynchronously, replacing the cached key set. If the cache has no
+        asynchronous fetcher, the synchronous fetcher is run in a separate thread.
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The key set could not be
+                fetched.
+        """
+        if self._async_fetch is None:
+            await asyncio.to_thread(self._refresh)
+            return
+        started_at = self._clock()
+        try:
+            key_set, headers = await self._async_fetch()
+        except Exception as e:
+            self._record_failure(started_at, e)
+            raise
+        self._store(key_set, headers, started_at)
+
+    async def _async_refresh_in_flight(self) -> None:
+        """
+        As async_refresh() but marking a refresh as in flight, as background refreshes are, so
+        that it is reported by status() and no background refresh starts meanwhile. Unlike a
+        background refresh, the fetch is made even when backing off after a failure.
+        """
+        with self._lock:
+            # If a background refresh is already in flight, it clears the flag when it ends.
+            owner = not self._refreshing
+            self._refreshing = True
+        try:
+            await self.async_refresh()
+        finally:
+            if owner:
+                self._end_refresh()
+
+    def _refresh(self) -> None:
+        assert self._fetch is not None
+        started_at = self._clock()
+        try:
+            key_set, headers = self._fetch()
+        except Exception as e:
+            self._record_failure(started_at, e)
+            raise
+        self._store(key_set, headers, started_at)
+
+    def _store(self, key_set: JWKSet, headers: Mapping[str, str], fetched_at: float) -> None:
+        max_age = self._clamp_max_age(max_age_from_headers(headers))
+        with self._lock:
+            if self._superseded_at is not None and fetched_at < self._superseded_at:
+                return
+            retired = self._retired_keys(key_set, fetched_at)
+            if len(retired) > 0:
+                key_set = _with_keys(key_set, [key for key, _ in retired])
+                # Refresh once the first retired key expires so that it is dropped promptly.
+                first_expiry = min(retire_at for _, retire_at in retired)
+                max_age = min(max_age, max(first_expiry - fetched_at, self.policy.min_max_age))
+            self._entry = _CacheEntry(
+                key_set=key_set,
+                fetched_at=fetched_at,
+                max_age=max_age,
+                size=key_set_size(key_set),
+                retired=retired,
+            )
+            self._last_error = None
+            self._last_used = max(fetched_at, self._last_used or fetched_at)
+
+    def _retired_keys(self, key_set: JWKSet, now: float) -> tuple[tuple[JWK, float], ...]:
+        "Keys in the cached key set but not in a newly fetched one which are still accepted."
+        entry = self._entry
+        if entry is None or self.policy.retire_after <= 0:
+            return ()
+        new_keys = key_set["keys"]
+        retired = [(key, at) for key, at in entry.retired if at > now and key not in new_keys]
+        already_retired = {id(key) for key, _ in entry.retired}
+        retire_at = now + self.policy.retire_after
+        retired.extend(
+            (key, retire_at)
+            for key in entry.key_set["keys"]
+            if id(key) not in already_retired and key not in new_keys
+        )
+        return tuple(retired)
+
+    def _clamp_max_age(self, max_age: Optional[float]) -> float:
+        if max_age is None:
+            max_age = self.policy.default_max_age
+        return min(max(max_age, self.policy.min_max_age), self.policy.max_max_age)
+
+    def _record_failure(self, failed_at: float, error: BaseException) -> None:
+        with self._lock:
+            self._last_failure_at = failed_at
+            self._last_error = error
+
+    def _begin_refresh(self, now: float) -> bool:
+        "Mark a refresh as in flight. Returns False if one is already in flight or backing off."
+        with self._lock:
+            if self._refreshing:
+                return False
+            if (
+                self._last_failure_at is not None
+                and now < self._last_failure_at + self.policy.min_max_age
+            ):
+                return False
+            self._refreshing = True
+            return True
+
+    def _end_refresh(self) -> None:
+        with self._lock:
+            self._refreshing = False
+
+    def _start_background_refresh(self, now: float) -> None:
+        if not self._begin_refresh(now):
+            return
+
+        if self._async_fetch is not None:
+            try:
+                loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                # Keep a reference to the task so that it is not garbage collected while running.
+                self._background_task = loop.create_task(self._background_async_refresh())
+                return
+
+        target = (
+            self._background_refresh if self._fetch is not None else self._background_run_async
+        )
+        threading.Thread(target=target, name="federatedidentity-refresh", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self._refresh()
+        except Exception:
+            # Failure has been recorded and the stale key set continues to be served.
+            pass
+        finally:
+            self._end_refresh()
+
+    def _background_run_async(self) -> None:
+        asyncio.run(self._background_async_refresh())
+
+    async def _background_async_refresh(self) -> None:
+        try:
+            await self.async_refresh()
+        except Exception:
+            # Failure has been recorded and the stale key set continues to be served.
+            pass
+        finally:
+            self._end_refresh()
+
+
+def _with_keys(key_set: JWKSet, keys: Sequence[JWK]) -> JWKSet:
+    "Return a copy of a key set with additional keys. The key set itself may be shared."
+    merged = JWKSet()
+    for name, value in key_set.items():
+        if name != "keys":
+            merged[name] = value
+    for key in key_set["keys"]:
+        merged.add(key)
+    for key in keys:
+        merged.add(key)
+    return merged
+
+
+class _JWKSUriFetcher:
+    """
+    Fetches a key set from a known JWKS URL. If a rediscovery interval is given, the issuer's
+    discovery document is fetched at most once per interval, and after a key miss, to pick up a
+    change of JWKS URL.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        jwks_uri: _oidc.ValidatedJWKSUrl,
+        rediscover_interval: Optional[float],
+        timeout: Optional[float],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.jwks_uri = jwks_uri
+        self.rediscover_interval = rediscover_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._rediscover_at = (
+            clock() + rediscover_interval if rediscover_interval is not None else None
+        )
+
+    def rediscover_soon(self) -> None:
+        "Fetch the discovery document before the next key set fetch if rediscovery is enabled."
+        if self._rediscover_at is not None:
+            self._rediscover_at = min(self._rediscover_at, self._clock())
+
+    def fetch(self, request: RequestBase) -> tuple[JWKSet, Mapping[str, str]]:
+        deadline = _oidc.deadline_after(self.timeout)
+        if self._rediscovery_due():
+            self._rediscovered(_oidc.fetch_jwks_uri(self.name, request, deadline))
+        return _oidc.fetch_jwks_from_uri(self.jwks_uri, request, deadline)
+
+    async def async_fetch(self, request: AsyncRequestBase) -> tuple[JWKSet, Mapping[str, str]]:
+        deadline = _oidc.deadline_after(self.timeout)
+        if self._rediscovery_due():
+            self._rediscovered(await _oidc.async_fetch_jwks_uri(self.name, request, deadline))
+        return await _oidc.async_fetch_jwks_from_uri(self.jwks_uri, request, deadline)
+
+    def _rediscovery_due(self) -> bool:
+        return self._rediscover_at is not None and self._clock() >= self._rediscover_at
+
+    def _rediscovered(self, jwks_uri: _oidc.ValidatedJWKSUrl) -> None:
+        assert self.rediscover_interval is not None
+        self.jwks_uri = jwks_uri
+        self._rediscover_at = self._clock() + self.rediscover_interval
+
+
+class RefreshingIssuer:
+    """
+    Represents an issuer of OIDC id tokens whose key set is refreshed as it expires.
+
+    Refreshes happen in the background so that verification does not wait on the issuer. See
+    [KeySetCache][federatedidentity.KeySetCache] for details.
+
+    Args:
+        name: Name of the issuer as it appears in `iss` claims.
+        key_cache: Cache holding the issuer's key set.
+        on_key_miss: Optional callable called by
+            [notify_key_miss][federatedidentity.RefreshingIssuer.notify_key_miss] before a refresh
+            is requested.
+    """
+
+    name: str
+    "Name of the issuer as it appears in `iss` claims."
+    key_cache: KeySetCache
+    "Cache holding the issuer's key set."
+
+    def __init__(
+        self,
+        name: str,
+        key_cache: KeySetCache,
+        *,
+        on_key_miss: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.key_cache = key_cache
+        self._on_key_miss = on_key_miss
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r})"
+
+    @property
+    def key_set(self) -> JWKSet:
+        """
+        JWK key set associated with the issuer used to verify JWT signatures.
+
+        Raises:
+            federatedidentity.exceptions.StaleKeySetError: There is no key set which is fresh
+                enough to be used and one could not be fetched.
+        """
+        return self.key_cache.get()
+
+    def matches(self, unvalidated_claims: Mapping[str, Any]) -> bool:
+        "Return `True` if the `iss` claim of a token matches this issuer."
+        return unvalidated_claims.get("iss") == self.name
+
+    def notify_key_miss(self) -> None:
+        """
+        Notify the issuer that a token named a key id which is not in its key set. A rate-limited
+        background refresh is requested so that rotated keys are picked up without waiting for
+        the key set to expire. The token itself is still rejected.
+        [verify_id_token][federatedidentity.verify_id_token] calls this automatically.
+        """
+        if self._on_key_miss is not None:
+            self._on_key_miss()
+        self.key_cache.request_refresh()
+
+    @classmethod
+    def from_discovery(
+        cls,
+        name: str,
+        request: Optional[RequestBase] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets as per [OpenID Connect Discovery][oidc-discovery].
+        The initial key set is fetched before returning.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            request: An optional HTTP request callable. If omitted a default implementation based
+                on the [requests][] module is used.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch of the discovery document
+                and key set, including background refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                discovered.
+        """
+        sync_request = request if request is not None else requests_transport.request
+        key_cache = KeySetCache(
+            lambda: _oidc.fetch_jwks_and_headers(
+                name, sync_request, _oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        key_cache.refresh()
+        return cls(name=name, key_cache=key_cache)
+
+    @classmethod
+    async def async_from_discovery(
+        cls,
+        name: str,
+        request: Optional[AsyncRequestBase] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets as per [OpenID Connect Discovery][oidc-discovery].
+        The initial key set is fetched before returning.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            request: An optional asynchronous HTTP request callable. If omitted a default
+                implementation based on the [requests][] module is used.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch of the discovery document
+                and key set, including background refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                discovered.
+        """
+        async_request = request if request is not None else requests_transport.async_request
+        key_cache = KeySetCache(
+            async_fetch=lambda: _oidc.async_fetch_jwks_and_headers(
+                name, async_request, _oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        await key_cache.async_refresh()
+        return cls(name=name, key_cache=key_cache)
+
+    @classmethod
+    def from_jwks_uri(
+        cls,
+        name: str,
+        jwks_uri: str,
+        request: Optional[RequestBase] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+        rediscover_interval: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets from a known JWKS URL. The OIDC discovery document
+        is not fetched on start up or on refresh which halves the number of requests for
+        providers whose `jwks_uri` is stable. The initial key set is fetched before returning.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            jwks_uri: URL of the issuer's key set.
+            request: An optional HTTP request callable. If omitted a default implementation based
+                on the [requests][] module is used.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch, including background
+                refreshes.
+            rediscover_interval: If given, the discovery document is fetched before a refresh at
+                most once per this many seconds, and after a key miss, and its `jwks_uri` is used
+                from then on.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched.
+        """
+        sync_request = request if request is not None else requests_transport.request
+        fetcher = _JWKSUriFetcher(
+            name, _oidc.validate_jwks_uri(jwks_uri), rediscover_interval, timeout
+        )
+        key_cache = KeySetCache(lambda: fetcher.fetch(sync_request), policy=policy)
+        key_cache.refresh()
+        return cls(name=name, key_cache=key_cache, on_key_miss=fetcher.rediscover_soon)
+
+    @classmethod
+    async def async_from_jwks_uri(
+        cls,
+        name: str,
+        jwks_uri: str,
+        request: Optional[AsyncRequestBase] = None,
+        *,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+        rediscover_interval: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets from a known JWKS URL. The OIDC discovery document
+        is not fetched on start up or on refresh which halves the number of requests for
+        providers whose `jwks_uri` is stable. The initial key set is fetched before returning.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            jwks_uri: URL of the issuer's key set.
+            request: An optional asynchronous HTTP request callable. If omitted a default
+                implementation based on the [requests][] module is used.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch, including background
+                refreshes.
+            rediscover_interval: If given, the discovery document is fetched before a refresh at
+                most once per this many seconds, and after a key miss, and its `jwks_uri` is used
+                from then on.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.InvalidJWKSUrlError: The JWKS URL is not correctly
+                formed.
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched.
+        """
+        async_request = request if request is not None else requests_transport.async_request
+        fetcher = _JWKSUriFetcher(
+            name, _oidc.validate_jwks_uri(jwks_uri), rediscover_interval, timeout
+        )
+        key_cache = KeySetCache(
+            async_fetch=lambda: fetcher.async_fetch(async_request), policy=policy
+        )
+        await key_cache.async_refresh()
+        return cls(name=name, key_cache=key_cache, on_key_miss=fetcher.rediscover_soon)
+
+    @classmethod
+    def from_sources(
+        cls,
+        name: str,
+        key_sources: Sequence[sources.KeySource],
+        *,
+        hedge_delay: float = sources.DEFAULT_HEDGE_DELAY,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets from the first of several sources to respond. See
+        [fetch_first][federatedidentity.sources.fetch_first]. The initial key set is fetched
+        before returning.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            key_sources: Ordered sources of the issuer's key set.
+            hedge_delay: Time in seconds to wait for a source before also requesting the next
+                one.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch, including background
+                refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched from any source.
+        """
+        key_sources = list(key_sources)
+        key_cache = KeySetCache(
+            lambda: sources.fetch_first(
+                key_sources, hedge_delay=hedge_delay, deadline=_oidc.deadline_after(timeout)
+            ),
+            lambda: sources.async_fetch_first(
+                key_sources, hedge_delay=hedge_delay, deadline=_oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        key_cache.refresh()
+        return cls(name=name, key_cache=key_cache)
+
+    @classmethod
+    async def async_from_sources(
+        cls,
+        name: str,
+        key_sources: Sequence[sources.KeySource],
+        *,
+        hedge_delay: float = sources.DEFAULT_HEDGE_DELAY,
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "RefreshingIssuer":
+        """
+        Initialise an issuer fetching key sets from the first of several sources to respond. See
+        [async_fetch_first][federatedidentity.sources.async_fetch_first]. The initial key set is
+        fetched before returning.
+
+        Arguments:
+            name: The name of the issuer as it would appear in the "iss" claim of a token
+            key_sources: Ordered sources of the issuer's key set.
+            hedge_delay: Time in seconds to wait for a source before also requesting the next
+                one.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each fetch, including background
+                refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer's keys could not be
+                fetched from any source.
+        """
+        key_sources = list(key_sources)
+        key_cache = KeySetCache(
+            lambda: sources.fetch_first(
+                key_sources, hedge_delay=hedge_delay, deadline=_oidc.deadline_after(timeout)
+            ),
+            lambda: sources.async_fetch_first(
+                key_sources, hedge_delay=hedge_delay, deadline=_oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        await key_cache.async_refresh()
+        return cls(name=name, key_cache=key_cache)
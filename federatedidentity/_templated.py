@@ -0,0 +1,191 @@
+import re
+from collections.abc import Iterable, Mapping
+from typing import Any, Optional
+
+from jwcrypto.jwk import JWKSet
+
+from . import _oidc
+from ._refresh import KeySetCache, RefreshPolicy
+from .transport import AsyncRequestBase, RequestBase
+from .transport import requests as requests_transport
+
+TENANT_ID_PLACEHOLDER = "{tenantid}"
+"Placeholder for the tenant id in the templated issuer of a multi-tenant provider."
+
+# Tenant ids are substituted into an issuer URL and so are restricted to characters which cannot
+# change the structure of that URL.
+_TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]+")
+
+
+class TemplatedIssuer:
+    """
+    Represents a multi-tenant issuer of OIDC id tokens such as Azure AD whose `iss` claim depends
+    on the tenant, for example `https://login.microsoftonline.com/{tenantid}/v2.0`.
+
+    A token matches the issuer if its `iss` claim is equal to the template with the placeholder
+    replaced by the token's tenant claim. All tenants share the issuer's key set.
+
+    Args:
+        name: Issuer template containing
+            [TENANT_ID_PLACEHOLDER][federatedidentity.TENANT_ID_PLACEHOLDER] exactly once.
+        key_cache: Cache holding the key set shared by all tenants.
+        tenant_ids: If not `None`, only tokens from these tenants match the issuer.
+        tenant_claim: Claim holding the token's tenant id.
+    """
+
+    name: str
+    "Issuer template as it appears in the multi-tenant OIDC discovery document."
+    key_cache: KeySetCache
+    "Cache holding the key set shared by all tenants."
+    tenant_ids: Optional[frozenset[str]]
+    "If not `None`, only tokens from these tenants match the issuer."
+    tenant_claim: str
+    "Claim holding the token's tenant id."
+
+    def __init__(
+        self,
+        name: str,
+        key_cache: KeySetCache,
+        *,
+        tenant_ids: Optional[Iterable[str]] = None,
+        tenant_claim: str = "tid",
+    ):
+        if name.count(TENANT_ID_PLACEHOLDER) != 1:
+            raise ValueError(f"Issuer template must contain {TENANT_ID_PLACEHOLDER!r} once.")
+        self.name = name
+        self.key_cache = key_cache
+        self.tenant_ids = frozenset(tenant_ids) if tenant_ids is not None else None
+        self.tenant_claim = tenant_claim
+        self._prefix, _, self._suffix = name.partition(TENANT_ID_PLACEHOLDER)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r})"
+
+    @property
+    def key_set(self) -> JWKSet:
+        """
+        JWK key set shared by all tenants used to verify JWT signatures.
+
+        Raises:
+            federatedidentity.exceptions.StaleKeySetError: There is no key set which is fresh
+                enough to be used and one could not be fetched.
+        """
+        return self.key_cache.get()
+
+    def issuer_for_tenant(self, tenant_id: str) -> str:
+        "Return the issuer name for a given tenant id."
+        return f"{self._prefix}{tenant_id}{self._suffix}"
+
+    def matches(self, unvalidated_claims: Mapping[str, Any]) -> bool:
+        """
+        Return `True` if the `iss` claim of a token matches the template with the placeholder
+        replaced by the token's tenant claim.
+        """
+        tenant_id = unvalidated_claims.get(self.tenant_claim)
+        if not isinstance(tenant_id, str) or _TENANT_ID_PATTERN.fullmatch(tenant_id) is None:
+            return False
+        if self.tenant_ids is not None and tenant_id not in self.tenant_ids:
+            return False
+        return unvalidated_claims.get("iss") == self.issuer_for_tenant(tenant_id)
+
+    @classmethod
+    def from_discovery(
+        cls,
+        discovery_issuer: str,
+        request: Optional[RequestBase] = None,
+        *,
+        tenant_ids: Optional[Iterable[str]] = None,
+        tenant_claim: str = "tid",
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "TemplatedIssuer":
+        """
+        Initialise a templated issuer from the [OpenID Connect Discovery][oidc-discovery]
+        document of a multi-tenant endpoint such as
+        `https://login.microsoftonline.com/common/v2.0`. Discovery is performed once for all
+        tenants and the initial key set is fetched before returning.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            discovery_issuer: The multi-tenant endpoint whose discovery document contains the
+                issuer template.
+            request: An optional HTTP request callable. If omitted a default implementation based
+                on the [requests][] module is used.
+            tenant_ids: If not `None`, only tokens from these tenants match the issuer.
+            tenant_claim: Claim holding the token's tenant id.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each request for the discovery
+                document or key set, including background refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer template or keys
+                could not be discovered.
+        """
+        sync_request = request if request is not None else requests_transport.request
+        name, jwks_uri = _oidc.fetch_issuer_template(
+            discovery_issuer, TENANT_ID_PLACEHOLDER, sync_request, _oidc.deadline_after(timeout)
+        )
+        key_cache = KeySetCache(
+            lambda: _oidc.fetch_jwks_from_uri(
+                jwks_uri, sync_request, _oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        key_cache.refresh()
+        return cls(name, key_cache, tenant_ids=tenant_ids, tenant_claim=tenant_claim)
+
+    @classmethod
+    async def async_from_discovery(
+        cls,
+        discovery_issuer: str,
+        request: Optional[AsyncRequestBase] = None,
+        *,
+        tenant_ids: Optional[Iterable[str]] = None,
+        tenant_claim: str = "tid",
+        policy: Optional[RefreshPolicy] = None,
+        timeout: Optional[float] = None,
+    ) -> "TemplatedIssuer":
+        """
+        Initialise a templated issuer from the [OpenID Connect Discovery][oidc-discovery]
+        document of a multi-tenant endpoint such as
+        `https://login.microsoftonline.com/common/v2.0`. Discovery is performed once for all
+        tenants and the initial key set is fetched before returning.
+
+        [oidc-discovery]: https://openid.net/specs/openid-connect-discovery-1_0.html
+
+        Arguments:
+            discovery_issuer: The multi-tenant endpoint whose discovery document contains the
+                issuer template.
+            request: An optional asynchronous HTTP request callable. If omitted a default
+                implementation based on the [requests][] module is used.
+            tenant_ids: If not `None`, only tokens from these tenants match the issuer.
+            tenant_claim: Claim holding the token's tenant id.
+            policy: An optional refresh policy. If omitted, a default policy is used.
+            timeout: An optional time budget in seconds for each request for the discovery
+                document or key set, including background refreshes.
+
+        Returns:
+            a newly-created issuer
+
+        Raises:
+            federatedidentity.exceptions.DeadlineExceededError: The time budget was exhausted.
+            federatedidentity.exceptions.FederatedIdentityError: The issuer template or keys
+                could not be discovered.
+        """
+        async_request = request if request is not None else requests_transport.async_request
+        name, jwks_uri = await _oidc.async_fetch_issuer_template(
+            discovery_issuer, TENANT_ID_PLACEHOLDER, async_request, _oidc.deadline_after(timeout)
+        )
+        key_cache = KeySetCache(
+            async_fetch=lambda: _oidc.async_fetch_jwks_from_uri(
+                jwks_uri, async_request, _oidc.deadline_after(timeout)
+            ),
+            policy=policy,
+        )
+        await key_cache.async_refresh()
+        return cls(name, key_cache, tenant_ids=tenant_ids, tenant_claim=tenant_claim)
@@ -1,9 +1,16 @@
-import json
+import dataclasses
 from collections.abc import Callable, Iterable
-from typing import Any, NewType, Optional, Union, cast
+from typing import Any, Literal, NewType, Optional, Union, cast, overload
 
-from . import _oidc
-from .exceptions import InvalidClaimsError
+from . import _oidc, _refresh, _templated
+from ._claims import Claims
+from .audit import AuditSink
+from .exceptions import (
+    ErrorCode,
+    FederatedIdentityError,
+    InvalidClaimsError,
+    InvalidTokenError,
+)
 
 ClaimVerifier = Union[dict[str, Any], Callable[[dict[str, Any]], None]]
 """
@@ -13,6 +20,10 @@ or a callable which takes the claims dictionary. A claims verifier callable shou
 the expected values.
 """
 
+AnyIssuer = Union[_oidc.Issuer, _refresh.RefreshingIssuer, _templated.TemplatedIssuer]
+
+_OIDC_REQUIRED_CLAIMS = ("iss", "sub", "aud", "exp", "iat")
+
 AnyAudienceType = NewType("AnyAudienceType", object)
 
 ANY_AUDIENCE = cast(AnyAudienceType, object())
@@ -22,22 +33,53 @@ Special value which can be passed as the `valid_audiences` parameter to
 """
 
 
+@overload
 def verify_id_token(
-    token: Union[str, bytes],
-    valid_issuers: Iterable[_oidc.Issuer],
+    token: _oidc.AnyToken,
+    valid_issuers: Iterable[AnyIssuer],
     valid_audiences: Iterable[Union[str, AnyAudienceType]],
     *,
     required_claims: Optional[Iterable[ClaimVerifier]] = None,
-) -> dict[str, Any]:
+    read_only_claims: Literal[False] = False,
+    time_policy: _oidc.TimePolicy = _oidc.DEFAULT_TIME_POLICY,
+    audit: Optional[AuditSink] = None,
+) -> dict[str, Any]: ...
+
+
+@overload
+def verify_id_token(
+    token: _oidc.AnyToken,
+    valid_issuers: Iterable[AnyIssuer],
+    valid_audiences: Iterable[Union[str, AnyAudienceType]],
+    *,
+    required_claims: Optional[Iterable[ClaimVerifier]] = None,
+    read_only_claims: Literal[True],
+    time_policy: _oidc.TimePolicy = _oidc.DEFAULT_TIME_POLICY,
+    audit: Optional[AuditSink] = None,
+) -> Claims: ...
+
+
+def verify_id_token(
+    token: _oidc.AnyToken,
+    valid_issuers: Iterable[AnyIssuer],
+    valid_audiences: Iterable[Union[str, AnyAudienceType]],
+    *,
+    required_claims: Optional[Iterable[ClaimVerifier]] = None,
+    read_only_claims: bool = False,
+    time_policy: _oidc.TimePolicy = _oidc.DEFAULT_TIME_POLICY,
+    audit: Optional[AuditSink] = None,
+) -> Union[dict[str, Any], Claims]:
     """
     Verify an OIDC identity token.
 
     Returns:
-        the token's claims dictionary.
+        the token's claims dictionary or, if `read_only_claims` is `True`, a read-only
+        [Claims][federatedidentity.Claims] mapping.
 
     Parameters:
-        token: OIDC token to verify. If a [bytes][] object is passed it is decoded using the ASCII
-            codec before verification.
+        token: OIDC token to verify. This may be a [str][] or any bytes-like object such as
+            [bytes][] or a [memoryview][] of a receive buffer. Bytes-like tokens are verified
+            without being copied into a string.
         valid_issuers: Iterable of valid issuers. At least one Issuer must match the token issuer
             for verification to succeed.
         valid_audiences: Iterable of valid audiences. At least one audience must match the `aud`
@@ -46,51 +88,204 @@ def verify_id_token(
         required_claims: Iterable of required claim verifiers. Claims are passed to verifiers after
             the token's signature has been verified. Claims required by OIDC are always
             validated. All claim verifiers must pass for verification to succeed.
+        read_only_claims: If `True`, return a read-only [Claims][federatedidentity.Claims] mapping
+            which wraps the parsed claims without copying them.
+        time_policy: Leeway, maximum token age and clock used to check the `exp`, `nbf` and
+            `iat` claims. These are checked before any key is looked up or signature verified.
+        audit: Optional [AuditSink][federatedidentity.audit.AuditSink] to which the outcome is
+            recorded.
 
     Raises:
         federatedidentity.exceptions.FederatedIdentityError: The token failed verification.
-        UnicodeDecodeError: The token could not be decoded into an ASCII string.
+        UnicodeDecodeError: A bytes-like token was not ASCII.
+    """
+    result = _verify(token, valid_issuers, valid_audiences, required_claims, time_policy, audit)
+    if isinstance(result, FederatedIdentityError):
+        raise result
+    return Claims(result) if read_only_claims else result
+
+
+@dataclasses.dataclass(frozen=True)
+class VerificationResult:
+    """
+    Result of verifying a token with [try_verify_id_token][federatedidentity.try_verify_id_token].
+    A result is truthy if and only if the token was verified.
+    """
+
+    claims: Optional[dict[str, Any]] = None
+    "The token's claims if it was verified."
+    error: Optional[FederatedIdentityError] = None
+    "The reason the token was rejected if it was not verified."
+
+    @property
+    def code(self) -> Optional[ErrorCode]:
+        "Machine-readable reason the token was rejected or `None` if it was verified."
+        return self.error.code if self.error is not None else None
+
+    def __bool__(self) -> bool:
+        return self.error is None
+
+
+def try_verify_id_token(
+    token: _oidc.AnyToken,
+    valid_issuers: Iterable[AnyIssuer],
+    valid_audiences: Iterable[Union[str, AnyAudienceType]],
+    *,
+    required_claims: Optional[Iterable[ClaimVerifier]] = None,
+    time_policy: _oidc.TimePolicy = _oidc.DEFAULT_TIME_POLICY,
+    audit: Optional[AuditSink] = None,
+) -> VerificationResult:
     """
-    if isinstance(token, bytes):
-        token = token.decode("ascii")
+    Verify an OIDC identity token without raising an exception if it is rejected. Tokens are
+    verified as by [verify_id_token][federatedidentity.verify_id_token] but rejection is cheap:
+    the reason is returned rather than raised and its message is only formatted if it is read.
 
-    unvalidated_claims = _oidc.unvalidated_claims_from_token(token)
+    ```py
+    result = try_verify_id_token(token, issuers, audiences)
+    if not result:
+        rejections[result.code] += 1
+    ```
+
+    Returns:
+        a result holding either the token's claims or the reason it was rejected. A bytes-like
+        token which is not ASCII is rejected with the
+        [MALFORMED_TOKEN][federatedidentity.exceptions.ErrorCode.MALFORMED_TOKEN] code.
+        Any [FederatedIdentityError][federatedidentity.exceptions.FederatedIdentityError] raised
+        by a callable claim verifier is returned as the reason.
+
+    Raises:
+        Exception: A callable claim verifier raised an exception which is not a
+            [FederatedIdentityError][federatedidentity.exceptions.FederatedIdentityError]. It is
+            propagated unchanged and the outcome is not recorded to `audit`.
+    """
+    try:
+        result = _verify(
+            token, valid_issuers, valid_audiences, required_claims, time_policy, audit
+        )
+    except UnicodeDecodeError:
+        result = InvalidTokenError("Token is not ASCII.", code=ErrorCode.MALFORMED_TOKEN)
+    if isinstance(result, FederatedIdentityError):
+        return VerificationResult(error=result)
+    return VerificationResult(claims=result)
+
+
+def _verify(
+    token: _oidc.AnyToken,
+    valid_issuers: Iterable[AnyIssuer],
+    valid_audiences: Iterable[Union[str, AnyAudienceType]],
+    required_claims: Optional[Iterable[ClaimVerifier]],
+    time_policy: _oidc.TimePolicy = _oidc.DEFAULT_TIME_POLICY,
+    audit: Optional[AuditSink] = None,
+) -> Union[dict[str, Any], FederatedIdentityError]:
+    """
+    Verify a token returning either its claims or the reason it was rejected. If `audit` is not
+    `None` the outcome is recorded to it.
+    """
+    try:
+        parsed_token = _oidc.parse_token(token)
+    except InvalidTokenError as e:
+        if audit is not None:
+            audit.record(None, e)
+        return e
+    except UnicodeDecodeError:
+        if audit is not None:
+            audit.record(
+                None, InvalidTokenError("Token is not ASCII.", code=ErrorCode.MALFORMED_TOKEN)
+            )
+        raise
+    result = _verify_parsed(
+        parsed_token, valid_issuers, valid_audiences, required_claims, time_policy
+    )
+    if audit is not None:
+        audit.record(
+            parsed_token.claims, result if isinstance(result, FederatedIdentityError) else None
+        )
+    return result
+
+
+def _verify_parsed(
+    parsed_token: _oidc.ParsedToken,
+    valid_issuers: Iterable[AnyIssuer],
+    valid_audiences: Iterable[Union[str, AnyAudienceType]],
+    required_claims: Optional[Iterable[ClaimVerifier]],
+    time_policy: _oidc.TimePolicy,
+) -> Union[dict[str, Any], FederatedIdentityError]:
+    unvalidated_claims = parsed_token.claims
 
     # For required claims, see: https://openid.net/specs/openid-connect-core-1_0.html#IDToken
-    for claim in ["iss", "sub", "aud", "exp", "iat"]:
+    for claim in _OIDC_REQUIRED_CLAIMS:
         if claim not in unvalidated_claims:
-            raise InvalidClaimsError(f"'{claim}' claim not present in token")
+            return InvalidClaimsError(
+                "%r claim not present in token", claim, code=ErrorCode.MISSING_CLAIM
+            )
 
     # Check that the token "aud" claim matches at least one of our expected audiences.
     if not any(
         (audience == unvalidated_claims["aud"]) or (audience is ANY_AUDIENCE)
         for audience in valid_audiences
     ):
-        raise InvalidClaimsError(
-            f"Token audience '{unvalidated_claims['aud']}' did not match any valid audience"
+        return InvalidClaimsError(
+            "Token audience %r did not match any valid audience",
+            unvalidated_claims["aud"],
+            code=ErrorCode.AUDIENCE_MISMATCH,
         )
 
-    # Determine which issuer matches the token.
-    for issuer in valid_issuers:
-        if issuer.name == unvalidated_claims["iss"]:
-            break
-    else:
-        # No issuer matched the token if the for loop exited without "break".
-        raise InvalidClaimsError(
-            f"Token issuer '{unvalidated_claims['iss']}' did not match any valid issuer"
-        )
+    # Expired tokens are rejected before any key lookup or signature verification.
+    time_error = _oidc.time_claims_error(unvalidated_claims, time_policy)
+    if time_error is not None:
+        return time_error
+
+    try:
+        # Determine which issuer matches the token.
+        for issuer in valid_issuers:
+            if issuer.matches(unvalidated_claims):
+                break
+        else:
+            # No issuer matched the token if the for loop exited without "break".
+            return InvalidClaimsError(
+                "Token issuer %r did not match any valid issuer",
+                unvalidated_claims["iss"],
+                code=ErrorCode.ISSUER_MISMATCH,
+            )
+        key_set = issuer.key_set
+    except FederatedIdentityError as e:
+        # Fetching a refreshing issuer's key set may fail.
+        return e
 
-    # Note: validate_token() validates "exp", "iat" and "nbf" claims and that the "alg" header has
-    # an appropriate value.
-    verified_claims = json.loads(_oidc.validate_token(token, issuer.key_set).claims)
+    # Note: signature_error() validates the format of registered claims and that the "alg" header
+    # has an appropriate value.
+    token_error = _oidc.signature_error(parsed_token, key_set)
+    if token_error is not None:
+        if token_error.code == ErrorCode.UNKNOWN_KEY and isinstance(
+            issuer, _refresh.RefreshingIssuer
+        ):
+            # The issuer may have rotated its keys.
+            issuer.notify_key_miss()
+        return token_error
 
-    # Verify claims against any ClaimVerifier-s passed.
-    _verify_claims(verified_claims, required_claims)
+    # The signature covers the payload which the unvalidated claims were parsed from and so,
+    # having verified it, those claims are verified. There is no need to parse the payload again.
+    verified_claims = cast(dict[str, Any], unvalidated_claims)
 
-    return verified_claims
+    # Verify claims against any ClaimVerifier-s passed.
+    try:
+        claims_error = _claims_error(verified_claims, required_claims)
+    except FederatedIdentityError as e:
+        # Raised by a callable claim verifier, for example one which looks up state which may be
+        # unavailable.
+        return e
+    return claims_error if claims_error is not None else verified_claims
 
 
 def _verify_claims(claims: dict[str, Any], required_claims: Optional[Iterable[ClaimVerifier]]):
+    error = _claims_error(claims, required_claims)
+    if error is not None:
+        raise error
+
+
+def _claims_error(
+    claims: dict[str, Any], required_claims: Optional[Iterable[ClaimVerifier]]
+) -> Optional[InvalidClaimsError]:
     required_claims = required_claims if required_claims is not None else []
     for claims_verifier in required_claims:
         if callable(claims_verifier):
@@ -98,9 +293,17 @@ def _verify_claims(claims: dict[str, Any], required_claims: Optional[Iterable[Cl
         else:
             for claim, value in claims_verifier.items():
                 if claim not in claims:
-                    raise InvalidClaimsError(f"Required claim '{claim}' not present in token")
+                    return InvalidClaimsError(
+                        "Required claim %r not present in token",
+                        claim,
+                        code=ErrorCode.MISSING_CLAIM,
+                    )
                 if claims[claim] != value:
-                    raise InvalidClaimsError(
-                        f"Required claim '{claim}' has invalid value {claims[claim]!r}. "
-                        f"Expected {value!r}."
+                    return InvalidClaimsError(
+                        "Required claim %r has invalid value %r. Expected %r.",
+                        claim,
+                        claims[claim],
+                        value,
+                        code=ErrorCode.CLAIM_MISMATCH,
                     )
+    return None
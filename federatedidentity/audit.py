@@ -0,0 +1,268 @@
+"""
+Buffered audit logging of verification outcomes.
+
+An [AuditSink][federatedidentity.audit.AuditSink] records the outcome of each verification
+without performing any I/O on the caller's thread. Records are appended to a bounded in-memory
+buffer which a background thread drains, writing batches of newline-delimited JSON to a file or
+UNIX domain socket. If records are produced faster than they can be written, the oldest buffered
+records are discarded and counted in [dropped][federatedidentity.audit.AuditSink.dropped] rather
+than slowing verification.
+
+```py
+from federatedidentity import try_verify_id_token
+from federatedidentity.audit import AuditSink
+
+audit = AuditSink.to_file("/var/log/federatedidentity/audit.ndjson")
+result = try_verify_id_token(token, issuers, audiences, audit=audit)
+```
+
+Each line written is a JSON object such as:
+
+```json
+{"time": 1718000000.0, "iss": "https://gitlab.com", "sub": "project_path:my-group/my-project",
+ "aud": "https://my-service.example.com", "jti": "...", "result": "rejected", "reason": "expired"}
+```
+
+The `iss`, `sub`, `aud` and `jti` values of a rejected token are those claimed by the token and
+have not been verified. They are `null` if the token could not be parsed or lacks the claim.
+"""
+
+import collections
+import dataclasses
+import json
+import socket
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+from .exceptions import FederatedIdentityError
+
+DEFAULT_CAPACITY = 10000
+"Default maximum number of records buffered before the oldest are dropped."
+
+
+@dataclasses.dataclass(frozen=True)
+class AuditRecord:
+    "Outcome of a single verification."
+
+    time: float
+    "Time of the verification in seconds since the epoch."
+    iss: Any = None
+    "The token's `iss` claim."
+    sub: Any = None
+    "The token's `sub` claim."
+    aud: Any = None
+    "The token's `aud` claim."
+    jti: Any = None
+    "The token's `jti` claim."
+    reason: Optional[str] = None
+    "Machine-readable reason the token was rejected or `None` if it was verified."
+
+    @property
+    def result(self) -> str:
+        "Either `verified` or `rejected`."
+        return "verified" if self.reason is None else "rejected"
+
+    def to_json(self) -> dict[str, Any]:
+        "Return the record as a JSON-serialisable dictionary."
+        return {
+            "time": self.time,
+            "iss": self.iss,
+            "sub": self.sub,
+            "aud": self.aud,
+            "jti": self.jti,
+            "result": self.result,
+            "reason": self.reason,
+        }
+
+
+class AuditSink:
+    """
+    Bounded buffer of audit records drained by a background thread.
+
+    [record][federatedidentity.audit.AuditSink.record] never blocks on I/O and may be called
+    from any thread or from an event loop. Usually a sink is created with
+    [to_file][federatedidentity.audit.AuditSink.to_file] or
+    [to_socket][federatedidentity.audit.AuditSink.to_socket].
+
+    Args:
+        write: Callable which writes a batch of newline-delimited JSON records. Calls are never
+            concurrent. A batch for which `write` raises [OSError][] is counted as dropped.
+        capacity: Maximum number of records buffered. Once full, the oldest records are dropped.
+        batch_size: Maximum number of records written per call to `write`.
+        flush_interval: Maximum time in seconds a record is buffered before being written.
+        close: Optional callable which releases resources used by `write`.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[bytes], None],
+        *,
+        capacity: int = DEFAULT_CAPACITY,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        close: Optional[Callable[[], None]] = None,
+    ):
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("Capacity and batch size must be positive.")
+        self._write = write
+        self._close = close
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        # Appending to a full deque discards its oldest item. Appends and pops are atomic and so
+        # recording a verification does not take a lock.
+        self._buffer: collections.deque[AuditRecord] = collections.deque(maxlen=capacity)
+        self._dropped_lock = threading.Lock()
+        self._dropped = 0
+        self._written = 0
+        self._last_error: Optional[Exception] = None
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._drain_forever, name="federatedidentity-audit", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def to_file(cls, path: str, **kwargs: Any) -> "AuditSink":
+        """
+        Create a sink which appends records to a file. Other keyword arguments are passed to the
+        constructor.
+        """
+        f = open(path, "ab")
+
+        def write(data: bytes) -> None:
+            f.write(data)
+            f.flush()
+
+        return cls(write, close=f.close, **kwargs)
+
+    @classmethod
+    def to_socket(cls, path: str, **kwargs: Any) -> "AuditSink":
+        """
+        Create a sink which writes records to a UNIX domain stream socket. The socket is
+        connected when the first batch is written and reconnected after an error. Other keyword
+        arguments are passed to the constructor.
+        """
+        connection: list[socket.socket] = []
+
+        def write(data: bytes) -> None:
+            if not connection:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(path)
+                except OSError:
+                    sock.close()
+                    raise
+                connection.append(sock)
+            try:
+                connection[0].sendall(data)
+            except OSError:
+                connection.pop().close()
+                raise
+
+        def close() -> None:
+            if connection:
+                connection.pop().close()
+
+        return cls(write, close=close, **kwargs)
+
+    @property
+    def dropped(self) -> int:
+        "Number of records discarded because the buffer was full or a batch failed to be written."
+        return self._dropped
+
+    @property
+    def written(self) -> int:
+        "Number of records written."
+        return self._written
+
+    @property
+    def last_error(self) -> Optional[Exception]:
+        "The error raised by the most recent failed write or `None`."
+        return self._last_error
+
+    def record(
+        self,
+        claims: Optional[Mapping[str, Any]],
+        error: Optional[FederatedIdentityError] = None,
+    ) -> None:
+        """
+        Record the outcome of a verification. Records are discarded once the sink is closed.
+
+        Args:
+            claims: The token's claims, which need not be verified, or `None` if the token could
+                not be parsed.
+            error: The reason the token was rejected or `None` if it was verified.
+        """
+        if self._closed:
+            return
+        if claims is None:
+            claims = {}
+        audit_record = AuditRecord(
+            time.time(),
+            claims.get("iss"),
+            claims.get("sub"),
+            claims.get("aud"),
+            claims.get("jti"),
+            error.code.value if error is not None else None,
+        )
+        buffered = len(self._buffer)
+        if buffered >= self._capacity:
+            self._add_dropped(1)
+        self._buffer.append(audit_record)
+        if buffered + 1 == self._batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        "Write all buffered records from the calling thread."
+        self._drain()
+
+    def close(self) -> None:
+        "Write all buffered records and stop the background thread."
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self._drain()
+        if self._close is not None:
+            self._close()
+
+    def _add_dropped(self, count: int) -> None:
+        with self._dropped_lock:
+            self._dropped += count
+
+    def _drain_forever(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._write_lock:
+            self._drain_locked()
+
+    def _drain_locked(self) -> None:
+        while self._buffer:
+            batch: list[AuditRecord] = []
+            try:
+                while len(batch) < self._batch_size:
+                    batch.append(self._buffer.popleft())
+            except IndexError:
+                pass
+            data = b"".join(
+                json.dumps(record.to_json(), separators=(",", ":"), default=str).encode("utf-8")
+                + b"\n"
+                for record in batch
+            )
+            try:
+                self._write(data)
+            except OSError as e:
+                self._last_error = e
+                self._add_dropped(len(batch))
+                return
+            self._written += len(batch)
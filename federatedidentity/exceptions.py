@@ -1,26 +1,165 @@
+import enum
+from typing import Any, Optional
+
+
+class ErrorCode(str, enum.Enum):
+    """
+    Machine-readable reason for an error. Codes are strings so that rejection reasons may be
+    logged and aggregated without parsing messages.
+    """
+
+    ERROR = "error"
+    "An error with no more specific reason."
+
+    INVALID_ISSUER = "invalid_issuer"
+    "An issuer name was not correctly formed."
+
+    INVALID_JWKS_URL = "invalid_jwks_url"
+    "A JWKS URL was not correctly formed."
+
+    INVALID_DISCOVERY_DOCUMENT = "invalid_discovery_document"
+    "An OIDC discovery document was malformed."
+
+    INVALID_TOKEN = "invalid_token"
+    "The token was invalid for a reason with no more specific code."
+
+    MALFORMED_TOKEN = "malformed_token"
+    "The token was not a JWT with a JSON object header and payload."
+
+    DISALLOWED_ALGORITHM = "disallowed_algorithm"
+    "The token's signing algorithm is not allowed."
+
+    UNSUPPORTED_HEADER = "unsupported_header"
+    "The token has a critical header which is not supported."
+
+    UNKNOWN_KEY = "unknown_key"
+    "No key in the issuer's key set matches the token's key id."
+
+    INVALID_SIGNATURE = "invalid_signature"
+    "The token's signature could not be verified."
+
+    MALFORMED_CLAIM = "malformed_claim"
+    "A registered claim in the token has the wrong type."
+
+    EXPIRED = "expired"
+    "The token has expired."
+
+    NOT_YET_VALID = "not_yet_valid"
+    "The token is not yet valid."
+
+    INVALID_CLAIMS = "invalid_claims"
+    "The token's claims did not match policy for a reason with no more specific code."
+
+    MISSING_CLAIM = "missing_claim"
+    "A required claim was not present in the token."
+
+    AUDIENCE_MISMATCH = "audience_mismatch"
+    "The token's audience did not match any valid audience."
+
+    ISSUER_MISMATCH = "issuer_mismatch"
+    "The token's issuer did not match any valid issuer."
+
+    CLAIM_MISMATCH = "claim_mismatch"
+    "A required claim had an unexpected value."
+
+    TRANSPORT_ERROR = "transport_error"
+    "There was an error fetching a URL."
+
+    DEADLINE_EXCEEDED = "deadline_exceeded"
+    "A time budget was exhausted."
+
+    STALE_KEY_SET = "stale_key_set"
+    "An issuer's key set was too stale to be used."
+
+    INVALID_CONFIG = "invalid_config"
+    "A configuration file was malformed."
+
+    UNKNOWN_POLICY = "unknown_policy"
+    "The requested verification policy is not configured."
+
+
 class FederatedIdentityError(RuntimeError):
-    "Base class for all errors raised by the federatedidentity module."
+    """
+    Base class for all errors raised by the federatedidentity module.
+
+    As with the [logging][] module, the message may be a %-style format string followed by its
+    arguments. The message is then only formatted when the exception is converted to a string so
+    that rejecting a token does not pay for formatting a message which is never read.
+
+    Args:
+        *args: Message, optionally followed by format arguments.
+        code: Machine-readable reason for the error. Defaults to the class's code.
+    """
+
+    code: ErrorCode = ErrorCode.ERROR
+    "Machine-readable reason for the error."
+
+    def __init__(self, *args: Any, code: Optional[ErrorCode] = None):
+        super().__init__(*args)
+        if code is not None:
+            self.code = code
+
+    def __str__(self) -> str:
+        if len(self.args) > 1 and isinstance(self.args[0], str):
+            return self.args[0] % self.args[1:]
+        return super().__str__()
 
 
 class InvalidIssuerError(FederatedIdentityError):
     "The issuer claim in the JWT was not correctly formed."
 
+    code = ErrorCode.INVALID_ISSUER
+
 
 class InvalidJWKSUrlError(FederatedIdentityError):
     "The JWKS URL in the OIDC discovery document was not correctly formed."
 
+    code = ErrorCode.INVALID_JWKS_URL
+
 
 class InvalidOIDCDiscoveryDocumentError(FederatedIdentityError):
     "The OIDC discovery document was malformed."
 
+    code = ErrorCode.INVALID_DISCOVERY_DOCUMENT
+
 
 class InvalidTokenError(FederatedIdentityError):
     "The token was malformed or could not be validated against the issuer public key."
 
+    code = ErrorCode.INVALID_TOKEN
+
 
 class TransportError(FederatedIdentityError):
     "There was an error fetching a URL."
 
+    code = ErrorCode.TRANSPORT_ERROR
+
+
+class DeadlineExceededError(TransportError):
+    "A time budget was exhausted before discovery or a key set fetch completed."
+
+    code = ErrorCode.DEADLINE_EXCEEDED
+
 
 class InvalidClaimsError(FederatedIdentityError):
     "The claims in the token did not match policy."
+
+    code = ErrorCode.INVALID_CLAIMS
+
+
+class StaleKeySetError(FederatedIdentityError):
+    "The issuer's key set is too stale to be used and could not be refreshed."
+
+    code = ErrorCode.STALE_KEY_SET
+
+
+class InvalidConfigError(FederatedIdentityError):
+    "A configuration file was malformed."
+
+    code = ErrorCode.INVALID_CONFIG
+
+
+class UnknownPolicyError(FederatedIdentityError):
+    "The requested verification policy is not configured."
+
+    code = ErrorCode.UNKNOWN_POLICY
@@ -0,0 +1,273 @@
+"""
+ASGI and WSGI middleware which verifies `Authorization: Bearer` tokens.
+
+Each middleware verifies the token once per request and stores the verified claims in the ASGI
+scope or WSGI environ under [CLAIMS_KEY][federatedidentity.middleware.CLAIMS_KEY]. Downstream
+handlers should use [verified_claims][federatedidentity.middleware.verified_claims] rather than
+verifying the token again. Requests with a missing or invalid token are rejected with a 401
+response. Tokens which are not structurally valid JWTs are rejected without any cryptographic
+work.
+
+```py
+from federatedidentity import Issuer
+from federatedidentity.middleware import ASGIMiddleware, verified_claims
+
+app = ASGIMiddleware(
+    app,
+    valid_issuers=[Issuer.from_discovery("https://gitlab.com")],
+    valid_audiences=["https://my-service.example.com"],
+)
+```
+"""
+
+import asyncio
+import re
+from collections.abc import Awaitable, Callable, Iterable, MutableMapping
+from concurrent.futures import Executor
+from typing import Any, Optional, Union
+
+from ._verify import AnyAudienceType, AnyIssuer, ClaimVerifier, verify_id_token
+from .audit import AuditSink
+from .exceptions import ErrorCode, FederatedIdentityError, InvalidTokenError
+
+CLAIMS_KEY = "federatedidentity.claims"
+"Key in the ASGI scope or WSGI environ under which verified claims are stored."
+
+MAX_TOKEN_LENGTH = 16384
+"Tokens longer than this many bytes are rejected without being verified."
+
+# Three non-empty base64url segments separated by dots.
+_JWT_PATTERN = re.compile(rb"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+")
+
+_UNAUTHORIZED_BODY = b"Unauthorized"
+
+ASGIScope = MutableMapping[str, Any]
+ASGIReceive = Callable[[], Awaitable[MutableMapping[str, Any]]]
+ASGISend = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[ASGIScope, ASGIReceive, ASGISend], Awaitable[None]]
+
+WSGIStartResponse = Callable[..., Any]
+WSGIApp = Callable[[dict[str, Any], WSGIStartResponse], Iterable[bytes]]
+
+
+def verified_claims(scope: MutableMapping[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    Return the claims verified by the middleware for a request.
+
+    Arguments:
+        scope: ASGI scope or WSGI environ for the request.
+
+    Returns:
+        The verified claims or `None` if the request was not authenticated.
+    """
+    return scope.get(CLAIMS_KEY)
+
+
+def _bearer_token(authorization: Optional[bytes]) -> Optional[bytes]:
+    "Extract the token from an Authorization header value or return None if there is none."
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.strip().partition(b" ")
+    if scheme.lower() != b"bearer":
+        return None
+    return token.strip()
+
+
+def _is_well_formed(token: bytes) -> bool:
+    "Cheap structural check performed before any cryptographic verification."
+    return len(token) <= MAX_TOKEN_LENGTH and _JWT_PATTERN.fullmatch(token) is not None
+
+
+class _TokenVerifier:
+    def __init__(
+        self,
+        valid_issuers: Iterable[AnyIssuer],
+        valid_audiences: Iterable[Union[str, AnyAudienceType]],
+        required_claims: Optional[Iterable[ClaimVerifier]],
+        allow_anonymous: bool,
+        audit: Optional[AuditSink],
+    ):
+        self.valid_issuers = list(valid_issuers)
+        self.valid_audiences = list(valid_audiences)
+        self.required_claims = list(required_claims) if required_claims is not None else None
+        self.allow_anonymous = allow_anonymous
+        self.audit = audit
+
+    def is_well_formed(self, token: bytes) -> bool:
+        if _is_well_formed(token):
+            return True
+        if self.audit is not None:
+            self.audit.record(
+                None, InvalidTokenError("Malformed bearer token", code=ErrorCode.MALFORMED_TOKEN)
+            )
+        return False
+
+    def verify(self, token: bytes) -> dict[str, Any]:
+        return verify_id_token(
+            token,
+            self.valid_issuers,
+            self.valid_audiences,
+            required_claims=self.required_claims,
+            audit=self.audit,
+        )
+
+
+def _www_authenticate(token: Optional[bytes]) -> bytes:
+    # See RFC 6750 section 3.1: no error code is included if no credentials were presented.
+    return b"Bearer" if token is None else b'Bearer error="invalid_token"'
+
+
+class ASGIMiddleware:
+    """
+    ASGI middleware which verifies bearer tokens in HTTP and WebSocket requests.
+
+    Verification runs in an executor so that the event loop is not blocked by signature
+    verification or by fetching keys. If the scope already contains verified claims, for example
+    because the middleware is applied more than once, the token is not verified again.
+
+    Args:
+        app: ASGI application to wrap.
+        valid_issuers: Iterable of valid issuers.
+        valid_audiences: Iterable of valid audiences.
+        required_claims: Iterable of required claim verifiers.
+        allow_anonymous: If `True`, requests without an `Authorization` header are passed to the
+            application without claims rather than being rejected.
+        executor: Executor used for verification. Defaults to the event loop's default executor.
+        audit: Optional [AuditSink][federatedidentity.audit.AuditSink] to which the outcome of
+            verifying each bearer token is recorded.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        valid_issuers: Iterable[AnyIssuer],
+        valid_audiences: Iterable[Union[str, AnyAudienceType]],
+        *,
+        required_claims: Optional[Iterable[ClaimVerifier]] = None,
+        allow_anonymous: bool = False,
+        executor: Optional[Executor] = None,
+        audit: Optional[AuditSink] = None,
+    ):
+        self.app = app
+        self.executor = executor
+        self._verifier = _TokenVerifier(
+            valid_issuers, valid_audiences, required_claims, allow_anonymous, audit
+        )
+
+    async def __call__(self, scope: ASGIScope, receive: ASGIReceive, send: ASGISend) -> None:
+        if scope["type"] not in ("http", "websocket") or CLAIMS_KEY in scope:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        for name, value in scope["headers"]:
+            if name.lower() == b"authorization":
+                authorization = value
+                break
+
+        token = _bearer_token(authorization)
+        if token is None:
+            if self._verifier.allow_anonymous:
+                await self.app(scope, receive, send)
+            else:
+                await self._reject(scope, send, token)
+            return
+        if not self._verifier.is_well_formed(token):
+            await self._reject(scope, send, token)
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            claims = await loop.run_in_executor(self.executor, self._verifier.verify, token)
+        except FederatedIdentityError:
+            await self._reject(scope, send, token)
+            return
+
+        await self.app({**scope, CLAIMS_KEY: claims}, receive, send)
+
+    async def _reject(self, scope: ASGIScope, send: ASGISend, token: Optional[bytes]) -> None:
+        if scope["type"] == "websocket":
+            # Closing before the connection is accepted results in a HTTP 403 response.
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 401,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(_UNAUTHORIZED_BODY)).encode("ascii")),
+                    (b"www-authenticate", _www_authenticate(token)),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": _UNAUTHORIZED_BODY})
+
+
+class WSGIMiddleware:
+    """
+    WSGI middleware which verifies bearer tokens in HTTP requests.
+
+    If the environ already contains verified claims, for example because the middleware is
+    applied more than once, the token is not verified again.
+
+    Args:
+        app: WSGI application to wrap.
+        valid_issuers: Iterable of valid issuers.
+        valid_audiences: Iterable of valid audiences.
+        required_claims: Iterable of required claim verifiers.
+        allow_anonymous: If `True`, requests without an `Authorization` header are passed to the
+            application without claims rather than being rejected.
+        audit: Optional [AuditSink][federatedidentity.audit.AuditSink] to which the outcome of
+            verifying each bearer token is recorded.
+    """
+
+    def __init__(
+        self,
+        app: WSGIApp,
+        valid_issuers: Iterable[AnyIssuer],
+        valid_audiences: Iterable[Union[str, AnyAudienceType]],
+        *,
+        required_claims: Optional[Iterable[ClaimVerifier]] = None,
+        allow_anonymous: bool = False,
+        audit: Optional[AuditSink] = None,
+    ):
+        self.app = app
+        self._verifier = _TokenVerifier(
+            valid_issuers, valid_audiences, required_claims, allow_anonymous, audit
+        )
+
+    def __call__(
+        self, environ: dict[str, Any], start_response: WSGIStartResponse
+    ) -> Iterable[bytes]:
+        if CLAIMS_KEY in environ:
+            return self.app(environ, start_response)
+
+        # WSGI headers are "bytes-as-latin-1" native strings.
+        authorization = environ.get("HTTP_AUTHORIZATION")
+        token = _bearer_token(authorization.encode("latin-1") if authorization else None)
+        if token is None:
+            if self._verifier.allow_anonymous:
+                return self.app(environ, start_response)
+            return self._reject(start_response, token)
+        if not self._verifier.is_well_formed(token):
+            return self._reject(start_response, token)
+
+        try:
+            environ[CLAIMS_KEY] = self._verifier.verify(token)
+        except FederatedIdentityError:
+            return self._reject(start_response, token)
+        return self.app(environ, start_response)
+
+    def _reject(
+        self, start_response: WSGIStartResponse, token: Optional[bytes]
+    ) -> Iterable[bytes]:
+        start_response(
+            "401 Unauthorized",
+            [
+                ("Content-Type", "text/plain"),
+                ("Content-Length", str(len(_UNAUTHORIZED_BODY))),
+                ("WWW-Authenticate", _www_authenticate(token).decode("ascii")),
+            ],
+        )
+        return [_UNAUTHORIZED_BODY]
@@ -0,0 +1,208 @@
+"""
+Push-based key set updates for running services.
+
+When an issuer's keys are rotated or a key is compromised, waiting for cached key sets to
+expire may be too slow. A [KeyUpdateListener][federatedidentity.push.KeyUpdateListener]
+applies key set updates pushed to a UNIX domain socket or written to a watched file to the
+[KeySetCache][federatedidentity.KeySetCache] of each issuer. Keys are swapped atomically and
+concurrent verifications are not blocked.
+
+Updates are JSON objects, one per line. An update containing `keys` replaces the issuer's key
+set. An update with `invalidate` set discards the key set so that it is fetched again:
+
+```json
+{"iss": "https://issuer.example.com", "keys": [{"kty": "EC", "kid": "2024-06", ...}]}
+{"iss": "https://issuer.example.com", "invalidate": true}
+```
+
+An optional `max_age` gives the freshness lifetime in seconds of a replaced key set. Over a
+socket, each update is answered with a line containing `ok` or `error: ` followed by the reason.
+
+```py
+from federatedidentity.push import KeyUpdateListener
+
+listener = KeyUpdateListener(config.issuers.values())
+listener.serve("/run/federatedidentity-keys.sock")
+```
+
+A listener created from a [ReloadingConfig][federatedidentity.ReloadingConfig] updates the
+issuers of whichever configuration is current when each update is applied, and so issuers added
+by a reload may be updated.
+"""
+
+import json
+import socketserver
+import threading
+from collections.abc import Iterable, Mapping
+from typing import Any, Optional, Union
+
+from jwcrypto.common import JWException
+from jwcrypto.jwk import JWK, JWKSet
+
+from ._config import ReloadingConfig, _file_signature
+from ._refresh import KeySetCache, RefreshingIssuer
+from ._templated import TemplatedIssuer
+from ._verify import AnyIssuer
+
+MAX_UPDATE_LENGTH = 1024 * 1024
+"Updates longer than this many bytes are rejected."
+
+
+class KeyUpdateListener:
+    """
+    Applies pushed key set updates to issuers. Only issuers with a key set cache, such as a
+    [RefreshingIssuer][federatedidentity.RefreshingIssuer], may be updated.
+
+    Args:
+        issuers: Issuers which may be updated, identified in updates by their name, or a
+            reloading configuration whose current issuers may be updated.
+    """
+
+    def __init__(self, issuers: Union[Iterable[AnyIssuer], ReloadingConfig]):
+        self._config: Optional[ReloadingConfig] = None
+        self._caches: dict[str, KeySetCache] = {}
+        if isinstance(issuers, ReloadingConfig):
+            self._config = issuers
+        else:
+            for issuer in issuers:
+                cache = _key_cache(issuer)
+                if cache is not None:
+                    self._caches[issuer.name] = cache
+        self._server: Optional[socketserver.BaseServer] = None
+        self._watch_stop: Optional[threading.Event] = None
+        self._last_error: Optional[Exception] = None
+
+    @property
+    def last_error(self) -> Optional[Exception]:
+        "The error raised by the most recent update read from a watched file or `None`."
+        return self._last_error
+
+    def apply(self, update: Mapping[str, Any]) -> None:
+        """
+        Apply a single update.
+
+        Raises:
+            ValueError: The update is malformed or names an issuer which cannot be updated.
+        """
+        issuer = update.get("iss")
+        cache = self._key_cache(issuer) if isinstance(issuer, str) else None
+        if cache is None:
+            raise ValueError(f"Unknown issuer {issuer!r}.")
+        if update.get("invalidate", False):
+            cache.invalidate()
+            return
+        keys = update.get("keys")
+        max_age = update.get("max_age")
+        if not isinstance(keys, list):
+            raise ValueError("Update must contain a 'keys' list or set 'invalidate'.")
+        if max_age is not None and not isinstance(max_age, (int, float)):
+            raise ValueError("'max_age' must be a number.")
+        key_set = JWKSet()
+        try:
+            for key in keys:
+                key_set.add(JWK(**key))
+        except (TypeError, JWException) as e:
+            raise ValueError(f"Malformed key: {e}") from e
+        cache.set_key_set(key_set, max_age)
+
+    def apply_json(self, data: bytes) -> None:
+        """
+        Apply updates encoded as newline-delimited JSON objects. Blank lines are ignored.
+
+        Raises:
+            ValueError: An update is malformed. Preceding updates have been applied.
+        """
+        for line in data.splitlines():
+            if line.strip() == b"":
+                continue
+            update = json.loads(line)
+            if not isinstance(update, dict):
+                raise ValueError("Update must be a JSON object.")
+            self.apply(update)
+
+    def serve(self, path: str) -> None:
+        """
+        Start a background thread accepting updates on a UNIX domain socket at `path`. Call
+        [close][federatedidentity.push.KeyUpdateListener.close] to stop serving.
+        """
+        if self._server is not None:
+            return
+        listener = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                while line := self.rfile.readline(MAX_UPDATE_LENGTH + 1):
+                    try:
+                        if len(line) > MAX_UPDATE_LENGTH:
+                            raise ValueError("Update is too long.")
+                        listener.apply_json(line)
+                        self.wfile.write(b"ok\n")
+                    except ValueError as e:
+                        self.wfile.write(f"error: {e}\n".encode("utf-8"))
+
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        self._server = server
+        threading.Thread(
+            target=server.serve_forever, name="federatedidentity-push", daemon=True
+        ).start()
+
+    def watch(self, path: str, interval: float = 1.0) -> None:
+        """
+        Start a background thread which applies the updates in a file each time it changes. The
+        file is checked for changes to its modification time, size or inode every `interval`
+        seconds. Errors are recorded in
+        [last_error][federatedidentity.push.KeyUpdateListener.last_error]. Call
+        [close][federatedidentity.push.KeyUpdateListener.close] to stop watching.
+        """
+        if self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+        threading.Thread(
+            target=self._watch,
+            args=(self._watch_stop, path, interval, _file_signature(path)),
+            name="federatedidentity-push-watch",
+            daemon=True,
+        ).start()
+
+    def close(self) -> None:
+        "Stop serving on the socket and watching the file."
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def _key_cache(self, name: str) -> Optional[KeySetCache]:
+        if self._config is None:
+            return self._caches.get(name)
+        issuer = self._config.current.issuers.get(name)
+        return _key_cache(issuer) if issuer is not None else None
+
+    def _watch(
+        self,
+        stop: threading.Event,
+        path: str,
+        interval: float,
+        signature: Optional[tuple[int, int, int]],
+    ) -> None:
+        while not stop.wait(interval):
+            new_signature = _file_signature(path)
+            if new_signature == signature or new_signature is None:
+                continue
+            signature = new_signature
+            try:
+                with open(path, "rb") as f:
+                    self.apply_json(f.read())
+                self._last_error = None
+            except (OSError, ValueError) as e:
+                self._last_error = e
+
+
+def _key_cache(issuer: AnyIssuer) -> Optional[KeySetCache]:
+    "Return the key set cache of an issuer which has one."
+    if isinstance(issuer, (RefreshingIssuer, TemplatedIssuer)):
+        return issuer.key_cache
+    return None
@@ -0,0 +1,311 @@
+"""
+Local verification sidecar which serves token verification over a UNIX domain socket.
+
+A single sidecar per host holds the issuers' key sets and keeps them fresh so that services,
+whether written in Python or not, need not each discover issuers and cache keys. Start it with
+the `federatedidentity serve` command:
+
+```console
+$ federatedidentity serve --config config.toml --socket /run/federatedidentity.sock
+```
+
+The configuration is loaded as a [VerificationConfig][federatedidentity.VerificationConfig]
+and is reloaded when the sidecar receives `SIGHUP`. Pass `--key-socket` to accept key set updates
+pushed as described in [federatedidentity.push][]. The top-level keys form the policy named
+`default`. Additional named policies may be given in a `policies` table whose entries override
+the top-level keys:
+
+```toml
+issuers = ["https://gitlab.com", "https://token.actions.githubusercontent.com"]
+audiences = ["https://my-service.example.com"]
+
+[policies.deploy]
+issuers = ["https://gitlab.com"]
+required_claims = [{ project_path = "my-group/my-project" }]
+```
+
+## Protocol
+
+Clients send request frames and the sidecar replies with one response frame per request in
+the order the requests were received. Requests may be pipelined: a client need not wait for a
+response before sending the next request. Each frame is a 4 byte big-endian length followed by
+that many bytes of body.
+
+A request body is a single byte giving the length of the policy name, the UTF-8 encoded policy
+name and then the token. An empty policy name selects the `default` policy.
+
+A response body is a single status byte followed by a payload. If the status is
+[STATUS_OK][federatedidentity.sidecar.STATUS_OK] the payload is the verified claims encoded as
+JSON. Otherwise the payload is a UTF-8 encoded human-readable reason.
+
+[SidecarClient][federatedidentity.sidecar.SidecarClient] implements the client side of the
+protocol.
+"""
+
+import asyncio
+import json
+import socket
+import struct
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from typing import Any, Optional, Union
+
+from ._config import DEFAULT_POLICY, ReloadingConfig, VerificationConfig
+from .exceptions import (
+    FederatedIdentityError,
+    InvalidClaimsError,
+    InvalidTokenError,
+    StaleKeySetError,
+    TransportError,
+    UnknownPolicyError,
+)
+
+STATUS_OK = 0
+"The token was verified. The payload is the token's claims encoded as JSON."
+
+STATUS_INVALID_TOKEN = 1
+"The token was malformed or its signature could not be verified."
+
+STATUS_INVALID_CLAIMS = 2
+"The token's claims did not match the policy."
+
+STATUS_UNKNOWN_POLICY = 3
+"The requested policy is not configured."
+
+STATUS_MALFORMED_REQUEST = 4
+"""
+The request frame could not be parsed. If the frame was too long, the sidecar closes the connection
+after replying.
+"""
+
+STATUS_UNAVAILABLE = 5
+"The issuer's keys are unavailable. The request may be retried later."
+
+MAX_FRAME_LENGTH = 65536
+"Frames with a body longer than this many bytes are rejected."
+
+DEFAULT_MAX_PIPELINE = 64
+"Default maximum number of requests per connection which may be awaiting a response."
+
+_LENGTH = struct.Struct(">I")
+
+
+def _status_for_exception(e: Exception) -> int:
+    if isinstance(e, UnknownPolicyError):
+        return STATUS_UNKNOWN_POLICY
+    if isinstance(e, InvalidClaimsError):
+        return STATUS_INVALID_CLAIMS
+    if isinstance(e, (StaleKeySetError, TransportError)):
+        return STATUS_UNAVAILABLE
+    return STATUS_INVALID_TOKEN
+
+
+class SidecarServer:
+    """
+    Verification server implementing the sidecar protocol.
+
+    Verification is performed in an executor so that connections are served concurrently.
+    Issuers are shared between all connections and policies. If a
+    [ReloadingConfig][federatedidentity.ReloadingConfig] is used, each request is verified
+    against the configuration which is current when its verification starts.
+
+    Args:
+        config: Verification configuration whose policies are served.
+        executor: Executor used for verification. Defaults to the event loop's default executor.
+        max_pipeline: Maximum number of requests per connection which may be awaiting a
+            response. Once reached, no more requests are read from the connection until a
+            response has been sent.
+    """
+
+    def __init__(
+        self,
+        config: Union[VerificationConfig, ReloadingConfig],
+        *,
+        executor: Optional[Executor] = None,
+        max_pipeline: int = DEFAULT_MAX_PIPELINE,
+    ):
+        self.config = config
+        self.executor = executor
+        self.max_pipeline = max_pipeline
+
+    async def start(self, path: str) -> asyncio.Server:
+        "Start serving on a UNIX domain socket at `path` returning the server."
+        return await asyncio.start_unix_server(self._handle_connection, path=path)
+
+    def verify(self, body: bytes) -> tuple[int, bytes]:
+        "Verify a request frame body returning the response status and payload."
+        if len(body) < 1 or len(body) < 1 + body[0]:
+            return STATUS_MALFORMED_REQUEST, b"Request is truncated."
+        try:
+            policy_name = body[1 : 1 + body[0]].decode("utf-8") or DEFAULT_POLICY
+        except UnicodeDecodeError:
+            return STATUS_MALFORMED_REQUEST, b"Policy name is not valid UTF-8."
+        result = self.config.try_verify(memoryview(body)[1 + body[0] :], policy_name)
+        if result.error is not None:
+            return _status_for_exception(result.error), str(result.error).encode("utf-8")
+        return STATUS_OK, json.dumps(result.claims, separators=(",", ":")).encode("utf-8")
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        # Responses are queued in request order. The bounded queue provides back-pressure.
+        responses: asyncio.Queue[Optional[asyncio.Future[tuple[int, bytes]]]] = asyncio.Queue(
+            self.max_pipeline
+        )
+        writer_task = asyncio.create_task(self._write_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    if length > MAX_FRAME_LENGTH:
+                        rejected = loop.create_future()
+                        rejected.set_result((STATUS_MALFORMED_REQUEST, b"Frame is too long."))
+                        await responses.put(rejected)
+                        break
+                    body = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                await responses.put(loop.run_in_executor(self.executor, self.verify, body))
+        finally:
+            await responses.put(None)
+            await writer_task
+            writer.close()
+
+    async def _write_responses(
+        self,
+        responses: "asyncio.Queue[Optional[asyncio.Future[tuple[int, bytes]]]]",
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        while (response := await responses.get()) is not None:
+            try:
+                status, payload = await response
+            except Exception:
+                status, payload = STATUS_UNAVAILABLE, b"Internal error."
+            try:
+                writer.write(_LENGTH.pack(1 + len(payload)) + bytes([status]) + payload)
+                await writer.drain()
+            except ConnectionError:
+                # Drain the remaining responses so that the reading side is not blocked.
+                while await responses.get() is not None:
+                    pass
+                return
+
+
+class SidecarError(FederatedIdentityError):
+    "The sidecar rejected a request for a reason other than the token being invalid."
+
+    status: int
+    "Status code returned by the sidecar."
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+
+
+class SidecarClient:
+    """
+    Blocking client for the sidecar protocol. A client holds a single connection and is not
+    safe for concurrent use.
+
+    ```py
+    from federatedidentity.sidecar import SidecarClient
+
+    with SidecarClient("/run/federatedidentity.sock") as client:
+        claims = client.verify(token, policy="deploy")
+    ```
+
+    Args:
+        path: Path to the sidecar's UNIX domain socket.
+        max_pipeline: Maximum number of requests sent before waiting for a response. This must
+            not exceed the sidecar's `max_pipeline` or the client and sidecar may both block
+            waiting for the other to read.
+    """
+
+    def __init__(self, path: str, *, max_pipeline: int = DEFAULT_MAX_PIPELINE):
+        if max_pipeline < 1:
+            raise ValueError("Maximum pipeline depth must be positive.")
+        self.max_pipeline = max_pipeline
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rb")
+
+    def __enter__(self) -> "SidecarClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        "Close the connection to the sidecar."
+        self._file.close()
+        self._socket.close()
+
+    def verify(self, token: Union[str, bytes], policy: str = "") -> dict[str, Any]:
+        """
+        Verify a token using a named policy.
+
+        Returns:
+            the token's claims
+
+        Raises:
+            federatedidentity.exceptions.InvalidTokenError: The token was invalid.
+            federatedidentity.exceptions.InvalidClaimsError: The claims did not match the policy.
+            federatedidentity.sidecar.SidecarError: The request could not be served.
+        """
+        (result,) = self.verify_many([token], policy)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def verify_many(
+        self, tokens: Iterable[Union[str, bytes]], policy: str = ""
+    ) -> list[Union[dict[str, Any], FederatedIdentityError]]:
+        """
+        Verify several tokens using a named policy. The requests are pipelined over the
+        connection with at most `max_pipeline` awaiting a response.
+
+        Returns:
+            for each token, either its claims or the exception describing why it was rejected
+        """
+        policy_name = policy.encode("utf-8")
+        if len(policy_name) > 255:
+            raise ValueError("Policy name is too long.")
+        frames = []
+        for token in tokens:
+            body = (
+                bytes([len(policy_name)])
+                + policy_name
+                + (token.encode("ascii") if isinstance(token, str) else token)
+            )
+            frames.append(_LENGTH.pack(len(body)) + body)
+        results: list[Union[dict[str, Any], FederatedIdentityError]] = []
+        sent = 0
+        while sent < len(frames):
+            # Only send as many requests as the sidecar will accept without a response being read.
+            window = frames[sent : len(results) + self.max_pipeline]
+            self._socket.sendall(b"".join(window))
+            sent += len(window)
+            results.append(self._read_response())
+        results.extend(self._read_response() for _ in range(len(frames) - len(results)))
+        return results
+
+    def _read_response(self) -> Union[dict[str, Any], FederatedIdentityError]:
+        header = self._file.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            raise SidecarError(STATUS_UNAVAILABLE, "Connection closed by sidecar.")
+        (length,) = _LENGTH.unpack(header)
+        body = self._file.read(length)
+        if len(body) < length:
+            raise SidecarError(STATUS_UNAVAILABLE, "Connection closed by sidecar.")
+        if len(body) < 1:
+            raise SidecarError(STATUS_UNAVAILABLE, "Response from sidecar has no status.")
+        status, payload = body[0], body[1:]
+        if status == STATUS_OK:
+            return json.loads(payload)
+        reason = payload.decode("utf-8", errors="replace")
+        if status == STATUS_INVALID_TOKEN:
+            return InvalidTokenError(reason)
+        if status == STATUS_INVALID_CLAIMS:
+            return InvalidClaimsError(reason)
+        return SidecarError(status, reason)
@@ -0,0 +1,279 @@
+"""
+Sources of issuer key sets which may be combined so that a slow or failing source does not stall
+discovery or refresh.
+
+A [RefreshingIssuer][federatedidentity.RefreshingIssuer] created with
+[from_sources][federatedidentity.RefreshingIssuer.from_sources] tries an ordered list of sources.
+The first source is requested immediately. If it fails, the next source is requested
+immediately. If it has not responded after a hedging delay, the next source is requested as well
+and the first valid response from any source is used:
+
+```py
+from federatedidentity import RefreshingIssuer
+from federatedidentity.sources import DiscoverySource, FileSource, JWKSUrlSource
+
+issuer = RefreshingIssuer.from_sources(
+    "https://gitlab.com",
+    [
+        DiscoverySource("https://gitlab.com"),
+        JWKSUrlSource("https://keys-mirror.example.com/gitlab.json"),
+        FileSource("/etc/federatedidentity/gitlab-keys.json"),
+    ],
+    hedge_delay=0.5,
+)
+```
+"""
+
+import asyncio
+import concurrent.futures
+import time
+from abc import ABCMeta, abstractmethod
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+from jwcrypto.common import JWException
+from jwcrypto.jwk import JWKSet
+
+from . import _oidc
+from .exceptions import DeadlineExceededError, TransportError
+from .transport import AsyncRequestBase, RequestBase
+from .transport import requests as requests_transport
+
+DEFAULT_HEDGE_DELAY = 1.0
+"Default time in seconds to wait for a source before also requesting the next one."
+
+
+class KeySource(metaclass=ABCMeta):
+    """
+    Abstract base class for sources of an issuer's key set.
+    """
+
+    @abstractmethod
+    def fetch(self, deadline: Optional[float] = None) -> tuple[JWKSet, Mapping[str, str]]:
+        """
+        Fetch the key set.
+
+        Args:
+            deadline: Optional deadline on the [time.monotonic][] clock.
+
+        Returns:
+            The key set and the headers of the HTTP response it was fetched from, if any.
+
+        Raises:
+            federatedidentity.exceptions.FederatedIdentityError: The key set could not be
+                fetched.
+        """
+
+    async def async_fetch(
+        self, deadline: Optional[float] = None
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        """
+        Fetch the key set asynchronously. The default implementation runs
+        [fetch][federatedidentity.sources.KeySource.fetch] in a separate thread.
+        """
+        return await asyncio.to_thread(self.fetch, deadline)
+
+
+class DiscoverySource(KeySource):
+    """
+    Key set fetched from the `jwks_uri` in an issuer's OIDC discovery document.
+
+    Args:
+        issuer: Name of the issuer.
+        request: An optional HTTP request callable. If omitted a default implementation based
+            on the [requests][] module is used.
+        async_request: An optional asynchronous HTTP request callable. If omitted a default
+            implementation based on the [requests][] module is used.
+    """
+
+    def __init__(
+        self,
+        issuer: str,
+        request: Optional[RequestBase] = None,
+        async_request: Optional[AsyncRequestBase] = None,
+    ):
+        self.issuer = issuer
+        self._request = request if request is not None else requests_transport.request
+        self._async_request = (
+            async_request if async_request is not None else requests_transport.async_request
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.issuer!r})"
+
+    def fetch(self, deadline: Optional[float] = None) -> tuple[JWKSet, Mapping[str, str]]:
+        return _oidc.fetch_jwks_and_headers(self.issuer, self._request, deadline)
+
+    async def async_fetch(
+        self, deadline: Optional[float] = None
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        return await _oidc.async_fetch_jwks_and_headers(self.issuer, self._async_request, deadline)
+
+
+class JWKSUrlSource(KeySource):
+    """
+    Key set fetched from a known URL such as the issuer's `jwks_uri` or a mirror of it.
+
+    Args:
+        url: URL of the key set.
+        request: An optional HTTP request callable. If omitted a default implementation based
+            on the [requests][] module is used.
+        async_request: An optional asynchronous HTTP request callable. If omitted a default
+            implementation based on the [requests][] module is used.
+
+    Raises:
+        federatedidentity.exceptions.InvalidJWKSUrlError: The URL is not correctly formed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        request: Optional[RequestBase] = None,
+        async_request: Optional[AsyncRequestBase] = None,
+    ):
+        self.url = _oidc.validate_jwks_uri(url)
+        self._request = request if request is not None else requests_transport.request
+        self._async_request = (
+            async_request if async_request is not None else requests_transport.async_request
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.url!r})"
+
+    def fetch(self, deadline: Optional[float] = None) -> tuple[JWKSet, Mapping[str, str]]:
+        return _oidc.fetch_jwks_from_uri(self.url, self._request, deadline)
+
+    async def async_fetch(
+        self, deadline: Optional[float] = None
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        return await _oidc.async_fetch_jwks_from_uri(self.url, self._async_request, deadline)
+
+
+class FileSource(KeySource):
+    """
+    Key set read from a local JSON file, for example a bundle shipped with the application to
+    be used if the issuer cannot be reached. The file is read on each fetch. As there are no
+    response headers, the key set's freshness lifetime is the refresh policy's default.
+
+    Args:
+        path: Path to a JSON Web Key Set file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def fetch(self, deadline: Optional[float] = None) -> tuple[JWKSet, Mapping[str, str]]:
+        try:
+            with open(self.path, "rb") as f:
+                return _oidc.key_set_from_json(f.read()), {}
+        except (OSError, JWException) as e:
+            raise TransportError(f"Could not read key set from {self.path!r}: {e}")
+
+
+def fetch_first(
+    sources: Sequence[KeySource],
+    *,
+    hedge_delay: float = DEFAULT_HEDGE_DELAY,
+    deadline: Optional[float] = None,
+) -> tuple[JWKSet, Mapping[str, str]]:
+    """
+    Fetch a key set from the first source to respond successfully. Sources are requested in
+    order. The next source is requested as soon as the previous one fails or after it has not
+    responded within `hedge_delay` seconds. Requests are made in separate threads and those still
+    in progress once a key set has been fetched are abandoned.
+
+    Args:
+        sources: Ordered sources of the key set.
+        hedge_delay: Time in seconds to wait for a source before also requesting the next one.
+        deadline: Optional deadline on the [time.monotonic][] clock passed to each source.
+
+    Returns:
+        The key set and the headers of the HTTP response it was fetched from, if any.
+
+    Raises:
+        federatedidentity.exceptions.DeadlineExceededError: No source responded before the
+            deadline.
+        Exception: The first error raised by a source if all sources failed.
+    """
+    if len(sources) == 0:
+        raise ValueError("At least one key source must be provided.")
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(sources), thread_name_prefix="federatedidentity-fetch"
+    )
+    try:
+        errors: list[BaseException] = []
+        pending: set[concurrent.futures.Future] = set()
+        next_source = 0
+        while True:
+            if next_source < len(sources):
+                pending.add(executor.submit(sources[next_source].fetch, deadline))
+                next_source += 1
+            timeout = _wait_timeout(
+                hedge_delay if next_source < len(sources) else None, deadline, sources
+            )
+            done, pending = concurrent.futures.wait(
+                pending, timeout, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                errors.append(error)
+            if len(pending) == 0 and next_source == len(sources):
+                raise errors[0]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_fetch_first(
+    sources: Sequence[KeySource],
+    *,
+    hedge_delay: float = DEFAULT_HEDGE_DELAY,
+    deadline: Optional[float] = None,
+) -> tuple[JWKSet, Mapping[str, str]]:
+    """
+    Fetch a key set from the first source to respond successfully using asynchronous fetches.
+    Requests still in progress once a key set has been fetched are cancelled. See
+    [fetch_first][federatedidentity.sources.fetch_first].
+    """
+    if len(sources) == 0:
+        raise ValueError("At least one key source must be provided.")
+    errors: list[BaseException] = []
+    pending: set[asyncio.Task] = set()
+    next_source = 0
+    try:
+        while True:
+            if next_source < len(sources):
+                pending.add(asyncio.ensure_future(sources[next_source].async_fetch(deadline)))
+                next_source += 1
+            timeout = _wait_timeout(
+                hedge_delay if next_source < len(sources) else None, deadline, sources
+            )
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    return task.result()
+                errors.append(error)
+            if len(pending) == 0 and next_source == len(sources):
+                raise errors[0]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _wait_timeout(
+    hedge_delay: Optional[float], deadline: Optional[float], sources: Sequence[KeySource]
+) -> Optional[float]:
+    "Time to wait for a response before hedging. Raises DeadlineExceededError if none remains."
+    if deadline is None:
+        return hedge_delay
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError(f"Deadline exceeded fetching key set from {list(sources)!r}.")
+    return min(hedge_delay, remaining) if hedge_delay is not None else remaining
@@ -0,0 +1,420 @@
+"""
+Utilities for testing and load-testing code which verifies OIDC id tokens without touching real
+identity providers.
+
+[TokenMinter][federatedidentity.testing.TokenMinter] signs tokens quickly using pre-generated keys
+and [MockOIDCProvider][federatedidentity.testing.MockOIDCProvider] serves an OIDC discovery
+document and key set for those keys over HTTPS on the local host:
+
+```py
+from federatedidentity import Issuer, verify_id_token
+from federatedidentity.testing import MockOIDCProvider
+
+with MockOIDCProvider() as provider:
+    issuer = Issuer.from_discovery(provider.issuer, provider.request)
+    token = provider.minter.mint(audience="my-audience")
+    claims = verify_id_token(token, [issuer], ["my-audience"])
+```
+"""
+
+import base64
+import datetime
+import ipaddress
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ssl import PROTOCOL_TLS_SERVER, SSLContext
+from typing import Any, Optional
+
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.x509.oid import NameOID
+from jwcrypto.jwk import JWK, JWKSet
+
+from .transport.requests import AsyncRequestsSession, RequestsSession
+
+_SUPPORTED_ALGS = ("ES256", "RS256")
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _generate_jwk(alg: str, kid: str) -> JWK:
+    if alg == "ES256":
+        return JWK.generate(kty="EC", crv="P-256", kid=kid, alg=alg, use="sig")
+    return JWK.generate(kty="RSA", size=2048, kid=kid, alg=alg, use="sig")
+
+
+class _SigningKey:
+    "A key along with a pre-encoded token header for that key."
+
+    def __init__(self, jwk: JWK, alg: str):
+        self.jwk = jwk
+        self.alg = alg
+        self.private_key = jwk.get_op_key("sign")
+        self.encoded_header = _b64encode(
+            json.dumps(
+                {"alg": alg, "kid": jwk["kid"], "typ": "JWT"}, separators=(",", ":")
+            ).encode("ascii")
+        )
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if self.alg == "ES256":
+            r, s = decode_dss_signature(
+                self.private_key.sign(signing_input, ec.ECDSA(hashes.SHA256()))
+            )
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return self.private_key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+
+
+class TokenMinter:
+    """
+    Mint signed OIDC id tokens using pre-generated keys.
+
+    Tokens are signed directly with the private key and a pre-encoded header which is
+    substantially faster than constructing a [jwcrypto.jwt.JWT][] for each token.
+
+    Args:
+        issuer: Value of the `iss` claim in minted tokens.
+        alg: Signing algorithm. One of "ES256" or "RS256".
+        retained_keys: Number of previous keys which remain in the public key set after a
+            rotation.
+    """
+
+    issuer: str
+    "Value of the `iss` claim in minted tokens."
+    alg: str
+    "Signing algorithm used for minted tokens."
+    retained_keys: int
+    "Number of previous keys which remain in the public key set after a rotation."
+
+    def __init__(self, issuer: str, *, alg: str = "ES256", retained_keys: int = 1):
+        if alg not in _SUPPORTED_ALGS:
+            raise ValueError(f"Unsupported signing algorithm: {alg!r}")
+        self.issuer = issuer
+        self.alg = alg
+        self.retained_keys = retained_keys
+        self._lock = threading.Lock()
+        self._key_counter = 0
+        self._keys: list[_SigningKey] = []
+        self.rotate_keys()
+
+    @property
+    def signing_key(self) -> JWK:
+        "The key currently used to sign tokens."
+        return self._keys[-1].jwk
+
+    @property
+    def key_set(self) -> JWKSet:
+        "Public key set containing the current signing key and any retained previous keys."
+        key_set = JWKSet()
+        for key in self._keys:
+            key_set.add(JWK(**key.jwk.export_public(as_dict=True)))
+        return key_set
+
+    def rotate_keys(self) -> JWK:
+        """
+        Generate a new signing key. Previous keys are kept in the public key set up to
+        `retained_keys`.
+
+        Returns:
+            The new signing key.
+        """
+        with self._lock:
+            self._key_counter += 1
+            key = _SigningKey(_generate_jwk(self.alg, f"key-{self._key_counter}"), self.alg)
+            self._keys = (self._keys + [key])[-(self.retained_keys + 1) :]
+        return key.jwk
+
+    def mint(
+        self,
+        claims: Optional[Mapping[str, Any]] = None,
+        *,
+        subject: str = "test-subject",
+        audience: str = "test-audience",
+        lifetime: float = 3600.0,
+        now: Optional[float] = None,
+    ) -> str:
+        """
+        Mint a signed token.
+
+        Args:
+            claims: Additional claims for the token. These override the default claims.
+            subject: Value of the `sub` claim.
+            audience: Value of the `aud` claim.
+            lifetime: Number of seconds from `now` until the token expires.
+            now: Issue time of the token as a UNIX timestamp. Defaults to the current time.
+
+        Returns:
+            The compact serialisation of the signed token.
+        """
+        now = now if now is not None else time.time()
+        payload = {
+            "iss": self.issuer,
+            "sub": subject,
+            "aud": audience,
+            "iat": int(now),
+            "exp": int(now + lifetime),
+        }
+        if claims is not None:
+            payload.update(claims)
+        return self.sign_payload(json.dumps(payload, separators=(",", ":")).encode("utf8"))
+
+    def sign_payload(self, payload: bytes) -> str:
+        """
+        Sign a raw payload. No claims are added to the payload.
+
+        Returns:
+            The compact serialisation of the signed token.
+        """
+        key = self._keys[-1]
+        signing_input = b".".join([key.encoded_header, _b64encode(payload)])
+        return b".".join([signing_input, _b64encode(key.sign(signing_input))]).decode("ascii")
+
+
+def _self_signed_certificate(directory: str) -> tuple[str, str]:
+    "Create a self-signed certificate for 127.0.0.1 returning paths to the certificate and key."
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+        .add_extension(
+            x509.AuthorityKeyIdentifier.from_issuer_public_key(key.public_key()), critical=False
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    return cert_path, key_path
+
+
+class MockOIDCProvider:
+    """
+    A local OIDC provider which serves a discovery document and key set over HTTPS on
+    127.0.0.1 using a self-signed certificate.
+
+    The `latency`, `error_rate`, `error_status` and `cache_control` attributes may be changed while
+    the provider is running. The provider may be used as a context manager which starts and stops
+    it.
+
+    Args:
+        minter: Token minter whose public keys are served. If omitted, a minter using `alg` is
+            created once the issuer URL is known.
+        alg: Signing algorithm used if `minter` is omitted.
+        latency: Number of seconds to wait before responding to each request.
+        error_rate: Probability in the range [0, 1] that a request fails with `error_status`.
+        error_status: HTTP status code used for failed requests.
+        cache_control: Value of the `Cache-Control` header for responses. If `None`, the header is
+            omitted.
+        port: Port to listen on. Defaults to an ephemeral port.
+    """
+
+    latency: float
+    "Number of seconds to wait before responding to each request."
+    error_rate: float
+    "Probability in the range [0, 1] that a request fails with `error_status`."
+    error_status: int
+    "HTTP status code used for failed requests."
+    cache_control: Optional[str]
+    "Value of the `Cache-Control` header for responses."
+    request_counts: Counter
+    "Count of requests received keyed by path."
+
+    def __init__(
+        self,
+        minter: Optional[TokenMinter] = None,
+        *,
+        alg: str = "ES256",
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        cache_control: Optional[str] = "public, max-age=300",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.cache_control = cache_control
+        self.request_counts = Counter()
+        self._minter = minter
+        self._alg = alg
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tempdir: Optional[tempfile.TemporaryDirectory] = None
+        self._cert_path: Optional[str] = None
+        self._request: Optional[RequestsSession] = None
+        self._async_request: Optional[AsyncRequestsSession] = None
+        self._discovery_body = b""
+        self._jwks_body = b""
+
+    def __enter__(self) -> "MockOIDCProvider":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def issuer(self) -> str:
+        "Issuer URL of the provider."
+        if self._server is None:
+            raise RuntimeError("Provider is not running.")
+        return f"https://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def jwks_uri(self) -> str:
+        "URL of the provider's key set."
+        return f"{self.issuer}/jwks.json"
+
+    @property
+    def minter(self) -> TokenMinter:
+        "Token minter whose public keys are served by the provider."
+        if self._minter is None:
+            self._minter = TokenMinter(self.issuer, alg=self._alg)
+        return self._minter
+
+    @property
+    def ca_bundle(self) -> str:
+        "Path to the provider's self-signed certificate."
+        if self._cert_path is None:
+            raise RuntimeError("Provider is not running.")
+        return self._cert_path
+
+    @property
+    def request(self) -> RequestsSession:
+        "HTTP transport which trusts the provider's self-signed certificate."
+        if self._request is None:
+            self._request = RequestsSession(self._make_session())
+        return self._request
+
+    @property
+    def async_request(self) -> AsyncRequestsSession:
+        "Asynchronous HTTP transport which trusts the provider's self-signed certificate."
+        if self._async_request is None:
+            self._async_request = AsyncRequestsSession(self._make_session())
+        return self._async_request
+
+    def _make_session(self) -> requests.Session:
+        session = requests.Session()
+        session.verify = self.ca_bundle
+        # Environment settings such as REQUESTS_CA_BUNDLE or proxies would otherwise take
+        # precedence over the session's settings.
+        session.trust_env = False
+        return session
+
+    def rotate_keys(self) -> JWK:
+        """
+        Rotate the signing key of the provider's minter.
+
+        Returns:
+            The new signing key.
+        """
+        key = self.minter.rotate_keys()
+        self._jwks_body = self.minter.key_set.export(private_keys=False).encode("utf8")
+        return key
+
+    def start(self) -> None:
+        "Start serving requests in a background thread."
+        if self._server is not None:
+            raise RuntimeError("Provider is already running.")
+        self._tempdir = tempfile.TemporaryDirectory()
+        self._cert_path, key_path = _self_signed_certificate(self._tempdir.name)
+        context = SSLContext(PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self._cert_path, key_path)
+
+        server = ThreadingHTTPServer(("127.0.0.1", self._port), _make_handler(self))
+        server.daemon_threads = True
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        self._server = server
+
+        self._discovery_body = json.dumps(
+            {"issuer": self.issuer, "jwks_uri": self.jwks_uri}
+        ).encode("utf8")
+        self._jwks_body = self.minter.key_set.export(private_keys=False).encode("utf8")
+
+        self._thread = threading.Thread(
+            target=server.serve_forever, name="federatedidentity-mock-provider", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        "Stop serving requests and release resources."
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+            self._tempdir = None
+            self._cert_path = None
+        self._request = None
+        self._async_request = None
+
+    def _respond(self, path: str) -> tuple[int, bytes]:
+        self.request_counts[path] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            return self.error_status, b"{}"
+        if path == "/.well-known/openid-configuration":
+            return 200, self._discovery_body
+        if path == "/jwks.json":
+            return 200, self._jwks_body
+        return 404, b"{}"
+
+
+def _make_handler(provider: MockOIDCProvider) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, body = provider._respond(self.path)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if provider.cache_control is not None and status == 200:
+                self.send_header("Cache-Control", provider.cache_control)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
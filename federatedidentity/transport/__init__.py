@@ -27,6 +27,7 @@ class RequestBase(metaclass=ABCMeta):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
         """
         Perform a HTTP request.
@@ -36,11 +37,15 @@ class RequestBase(metaclass=ABCMeta):
             body: Body of request. Defaults to an empty body.
             method: HTTP method for request. Defaults to 'GET'.
             headers: Map of headers to set on the request. Defaults to an empty mapping.
+            timeout: Maximum number of seconds to wait for the response. Defaults to no timeout.
+                This argument is only passed when the caller has a deadline and so
+                implementations which do not support timeouts may omit it.
 
         Returns:
             The response from the resource server.
 
         Raises:
+            federatedidentity.exceptions.DeadlineExceededError: the timeout expired.
             federatedidentity.exceptions.TransportError: on any transport error such as DNS
                 resolution failure. Note that error status codes from the server do not raise.
         """
@@ -58,6 +63,7 @@ class AsyncRequestBase(metaclass=ABCMeta):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
         """
         Perform a HTTP request.
@@ -67,11 +73,15 @@ class AsyncRequestBase(metaclass=ABCMeta):
             body: Body of request. Defaults to an empty body.
             method: HTTP method for request. Defaults to 'GET'.
             headers: Map of headers to set on the request. Defaults to an empty mapping.
+            timeout: Maximum number of seconds to wait for the response. Defaults to no timeout.
+                This argument is only passed when the caller has a deadline and so
+                implementations which do not support timeouts may omit it.
 
         Returns:
             The response from the resource server.
 
         Raises:
+            federatedidentity.exceptions.DeadlineExceededError: the timeout expired.
             federatedidentity.exceptions.TransportError: on any transport error such as DNS
                 resolution failure. Note that error status codes from the server do not raise.
         """
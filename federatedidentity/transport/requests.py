@@ -3,27 +3,46 @@ HTTP transport based on [requests][].
 """
 
 import asyncio
+import threading
+import time
 from typing import Mapping, Optional
 
 import requests
-from requests.exceptions import RequestException
+from requests.exceptions import RequestException, Timeout
 
-from ..exceptions import TransportError
+from ..exceptions import DeadlineExceededError, TransportError
 from . import AsyncRequestBase, RequestBase, Response
 
+# Size of the chunks in which response bodies are read.
+_CHUNK_SIZE = 8192
+
 
 class RequestsSession(RequestBase):
     """
     HTTP transport based on a requests.Session object.
 
+    A [requests.Session][] is not guaranteed to be safe for concurrent use. If `session` is
+    omitted, each thread using the transport is given its own session so that the transport may
+    be used from many threads at once without locking.
+
     Args:
-        session: requests.Session to use for HTTP requests. If omitted a new session is created.
+        session: requests.Session to use for HTTP requests. If omitted a new session is created
+            for each thread.
     """
 
-    session: requests.Session
-
     def __init__(self, session: Optional[requests.Session] = None):
-        self.session = session if session is not None else requests.Session()
+        self._session = session
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        "The session used for HTTP requests made from the current thread."
+        if self._session is not None:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
 
     def __call__(
         self,
@@ -31,17 +50,35 @@ class RequestsSession(RequestBase):
         body: Optional[bytes] = None,
         method: Optional[str] = None,
         headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
+        # Note that requests applies the timeout to connecting and to each read from the socket
+        # rather than to the request as a whole. The body is streamed so that the clock can be
+        # checked between chunks and a server which sends its response slowly cannot hold the
+        # request open indefinitely.
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        chunks: list[bytes] = []
         try:
-            r = self.session.get(url, headers={"Accept": "application/json"})
+            with self.session.get(
+                url, headers={"Accept": "application/json"}, timeout=timeout, stream=True
+            ) as r:
+                for chunk in r.iter_content(_CHUNK_SIZE):
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise DeadlineExceededError(f"Timed out reading response from {url!r}.")
+                    chunks.append(chunk)
+        except Timeout as e:
+            raise DeadlineExceededError(f"Timed out requesting URL {url!r}: {e}")
         except RequestException as e:
             raise TransportError(f"Error requesting URL {url!r}: {e}")
-        return Response(content=r.content, status_code=r.status_code, headers=r.headers)
+        return Response(content=b"".join(chunks), status_code=r.status_code, headers=r.headers)
 
 
 class AsyncRequestsSession(AsyncRequestBase):
     """
-    An asyncio wrapper around RequestsSession.
+    An asyncio wrapper around RequestsSession which runs each request in a worker thread.
+
+    A thread cannot be interrupted and so cancelling a request, for example when a deadline
+    passes, leaves its worker thread running until the request completes or its timeout expires.
     """
 
     _sync_request: RequestsSession
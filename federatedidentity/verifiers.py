@@ -4,11 +4,12 @@ Utility functions for constructing claims verifiers suitable for passing to
 
 """
 
-from collections.abc import Container, Iterable
-from typing import Any
+import time
+from collections.abc import Container, Iterable, Mapping
+from typing import Any, Optional
 
-from ._verify import ClaimVerifier, _verify_claims
-from .exceptions import InvalidClaimsError
+from ._verify import ClaimVerifier, _claims_error, _verify_claims
+from .exceptions import ErrorCode, InvalidClaimsError
 
 
 def all_claims_present(claim_names: Iterable[str]) -> ClaimVerifier:
@@ -26,8 +27,9 @@ def all_claims_present(claim_names: Iterable[str]) -> ClaimVerifier:
         missing_claims = set(claim_names) - set(claims.keys())
         if len(missing_claims) > 0:
             raise InvalidClaimsError(
-                "Required claims "
-                f"{', '.join(repr(c) for c in missing_claims)} not present in token"
+                "Required claims %s not present in token",
+                ", ".join(repr(c) for c in missing_claims),
+                code=ErrorCode.MISSING_CLAIM,
             )
 
     return verify
@@ -37,7 +39,8 @@ def only_for_issuers(
     issuers: Container[str], required_claims: Iterable[ClaimVerifier]
 ) -> ClaimVerifier:
     """
-    Apply claim verifiers only for a particular set of issuers.
+    Apply claim verifiers only for a particular set of issuers. To apply different verifiers for
+    each of many issuers, prefer [by_issuer][federatedidentity.verifiers.by_issuer].
 
     Arguments:
         issuers: Issuer names which should have the claims verifiers in `required_claims` applied.
@@ -54,3 +57,158 @@ def only_for_issuers(
         _verify_claims(claims, required_claims)
 
     return verify
+
+
+def by_issuer(
+    issuer_required_claims: Mapping[str, Iterable[ClaimVerifier]],
+    default_required_claims: Iterable[ClaimVerifier] = (),
+) -> ClaimVerifier:
+    """
+    Apply claim verifiers chosen by the token's issuer. The verifiers are found with a single
+    lookup of the "iss" claim and so the cost of verification does not grow with the number of
+    issuers.
+
+    ```py
+    verifier = by_issuer(
+        {
+            "https://gitlab.com": [{"project_path": "my-group/my-project"}],
+            "https://token.actions.githubusercontent.com": [{"repository": "my-org/my-repo"}],
+        },
+    )
+    ```
+
+    Arguments:
+        issuer_required_claims: Mapping from issuer name to the claim verifiers to run if the
+            token was issued by that issuer.
+        default_required_claims: Claim verifiers to run if the token's issuer is not in
+            `issuer_required_claims`.
+
+    Returns:
+        A claims verifier.
+    """
+    dispatch = {
+        issuer: tuple(required_claims)
+        for issuer, required_claims in issuer_required_claims.items()
+    }
+    default = tuple(default_required_claims)
+
+    def verify(claims: dict[str, Any]):
+        _verify_claims(claims, dispatch.get(claims["iss"], default))
+
+    return verify
+
+
+def adaptive(
+    required_claims: Iterable[ClaimVerifier],
+    *,
+    sample_interval: int = 16,
+    reorder_interval: int = 1024,
+) -> ClaimVerifier:
+    """
+    Apply claim verifiers in an order learned at runtime so that cheap checks which reject many
+    tokens run first. A token is accepted if and only if every verifier accepts it and so the
+    order does not change which tokens are accepted. If several verifiers would reject a token,
+    which of their errors is raised may change as the order does.
+
+    The verifiers must be independent of each other and free of side effects. A verifier which
+    raises an exception other than
+    [InvalidClaimsError][federatedidentity.exceptions.InvalidClaimsError] may be skipped for a
+    token which another verifier rejects.
+
+    Every `sample_interval`-th token is timed and whether each verifier rejected it is recorded.
+    Every `reorder_interval`-th token, the verifiers are sorted by their mean time divided by
+    the fraction of tokens they reject, which minimises the expected time to reach a decision.
+
+    ```py
+    verifier = adaptive(
+        [
+            check_repository_allow_list,  # slow
+            {"ref_protected": "true"},  # fast and often fails
+        ]
+    )
+    ```
+
+    Arguments:
+        required_claims: Claim verifiers, initially applied in the order given.
+        sample_interval: Number of tokens per timed token.
+        reorder_interval: Number of tokens between reorderings.
+
+    Returns:
+        A claims verifier.
+    """
+    if sample_interval < 1 or reorder_interval < 1:
+        raise ValueError("Intervals must be positive.")
+    return _AdaptiveVerifier(tuple(required_claims), sample_interval, reorder_interval)
+
+
+class _AdaptiveVerifier:
+    # Statistics are updated without a lock. Lost updates from concurrent verifications only
+    # make them slightly less accurate.
+
+    def __init__(
+        self,
+        required_claims: tuple[ClaimVerifier, ...],
+        sample_interval: int,
+        reorder_interval: int,
+    ):
+        self.sample_interval = sample_interval
+        self.reorder_interval = reorder_interval
+        self.required_claims = required_claims
+        # Indices into required_claims in the order in which they are applied.
+        self.order = tuple(range(len(required_claims)))
+        self.runs = [0] * len(required_claims)
+        self.rejections = [0] * len(required_claims)
+        self.elapsed = [0.0] * len(required_claims)
+        self.calls = 0
+
+    def __call__(self, claims: dict[str, Any]) -> None:
+        self.calls += 1
+        calls = self.calls
+        if calls % self.reorder_interval == 0:
+            self._reorder()
+        if calls % self.sample_interval != 0:
+            for index in self.order:
+                _check(self.required_claims[index], claims)
+            return
+        for index in self.order:
+            start = time.perf_counter()
+            try:
+                _check(self.required_claims[index], claims)
+            except InvalidClaimsError:
+                self._record(index, time.perf_counter() - start, rejected=True)
+                raise
+            self._record(index, time.perf_counter() - start, rejected=False)
+
+    def _record(self, index: int, elapsed: float, rejected: bool) -> None:
+        self.runs[index] += 1
+        self.elapsed[index] += elapsed
+        if rejected:
+            self.rejections[index] += 1
+
+    def _reorder(self) -> None:
+        measured = [
+            self.elapsed[index] / self.runs[index] for index in self.order if self.runs[index] > 0
+        ]
+        # Verifiers which have not run, for example because an earlier verifier always rejects,
+        # are assumed to take the mean time of those which have rather than no time at all.
+        prior_time = sum(measured) / len(measured) if measured else 0.0
+
+        def expected_cost(index: int) -> float:
+            runs = self.runs[index]
+            mean_time = self.elapsed[index] / runs if runs > 0 else prior_time
+            # Smoothed towards one half so that verifiers which have rarely run are neither
+            # favoured nor ignored.
+            rejection_rate = (self.rejections[index] + 1) / (runs + 2)
+            return mean_time / rejection_rate
+
+        self.order = tuple(sorted(self.order, key=expected_cost))
+
+
+def _check(verifier: ClaimVerifier, claims: dict[str, Any]) -> None:
+    "Apply a single claim verifier, raising InvalidClaimsError if the claims are rejected."
+    if callable(verifier):
+        verifier(claims)
+        return
+    error: Optional[InvalidClaimsError] = _claims_error(claims, (verifier,))
+    if error is not None:
+        raise error
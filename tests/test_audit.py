@@ -0,0 +1,180 @@
+import json
+import socket
+import time
+
+import pytest
+
+from federatedidentity import Issuer, try_verify_id_token, verify_id_token
+from federatedidentity.audit import AuditSink
+from federatedidentity.exceptions import ErrorCode, InvalidClaimsError, StaleKeySetError
+from federatedidentity.middleware import WSGIMiddleware
+
+from .test_middleware import call_wsgi, wsgi_app
+
+
+class ListWriter:
+    "Collects written records."
+
+    def __init__(self):
+        self.records: list[dict] = []
+        self.batches = 0
+
+    def __call__(self, data: bytes) -> None:
+        self.batches += 1
+        self.records.extend(json.loads(line) for line in data.splitlines())
+
+
+@pytest.fixture
+def writer():
+    return ListWriter()
+
+
+@pytest.fixture
+def audit(writer: ListWriter):
+    sink = AuditSink(writer, flush_interval=60)
+    yield sink
+    sink.close()
+
+
+def test_verified_and_rejected(
+    audit: AuditSink,
+    writer: ListWriter,
+    oidc_token: str,
+    oidc_issuer: Issuer,
+    oidc_audience: str,
+    oidc_claims: dict,
+):
+    verify_id_token(oidc_token, [oidc_issuer], [oidc_audience], audit=audit)
+    assert not try_verify_id_token(oidc_token, [oidc_issuer], ["other"], audit=audit)
+    assert not try_verify_id_token("not-a-token", [oidc_issuer], [oidc_audience], audit=audit)
+    assert not try_verify_id_token(b"\xff", [oidc_issuer], [oidc_audience], audit=audit)
+    audit.flush()
+
+    verified, mismatch, malformed, non_ascii = writer.records
+    assert verified["result"] == "verified"
+    assert verified["reason"] is None
+    for key in ("iss", "sub", "aud"):
+        assert verified[key] == oidc_claims[key]
+    assert mismatch["result"] == "rejected"
+    assert mismatch["reason"] == "audience_mismatch"
+    assert mismatch["sub"] == oidc_claims["sub"]
+    assert malformed["reason"] == non_ascii["reason"] == "malformed_token"
+    assert malformed["iss"] is None
+
+
+def test_raising_verification_is_recorded(
+    audit: AuditSink, writer: ListWriter, oidc_token: str, oidc_issuer: Issuer
+):
+    with pytest.raises(InvalidClaimsError):
+        verify_id_token(oidc_token, [oidc_issuer], ["other"], audit=audit)
+    audit.close()
+    assert [record["reason"] for record in writer.records] == ["audience_mismatch"]
+
+
+def test_verifier_error_is_recorded(
+    audit: AuditSink, writer: ListWriter, oidc_token: str, oidc_issuer: Issuer, oidc_audience: str
+):
+    def unavailable(claims):
+        raise StaleKeySetError("Allow list unavailable", code=ErrorCode.STALE_KEY_SET)
+
+    result = try_verify_id_token(
+        oidc_token, [oidc_issuer], [oidc_audience], required_claims=[unavailable], audit=audit
+    )
+    assert result.code == ErrorCode.STALE_KEY_SET
+    audit.close()
+    assert [record["reason"] for record in writer.records] == ["stale_key_set"]
+
+
+def test_overflow_drops_oldest(writer: ListWriter):
+    sink = AuditSink(writer, capacity=3, flush_interval=60)
+    sink._write_lock.acquire()  # Stall the writer.
+    try:
+        for index in range(5):
+            sink.record({"jti": str(index)})
+    finally:
+        sink._write_lock.release()
+    sink.close()
+    assert sink.dropped == 2
+    assert [record["jti"] for record in writer.records] == ["2", "3", "4"]
+
+
+def test_batches(writer: ListWriter):
+    sink = AuditSink(writer, batch_size=2, flush_interval=60)
+    sink._write_lock.acquire()
+    for index in range(5):
+        sink.record({"jti": str(index)})
+    sink._write_lock.release()
+    sink.close()
+    assert writer.batches == 3
+    assert sink.written == 5
+
+
+def test_failed_write_is_counted():
+    def write(data: bytes) -> None:
+        raise OSError("disk full")
+
+    sink = AuditSink(write, flush_interval=60)
+    sink.record(None)
+    sink.close()
+    assert sink.dropped == 1
+    assert isinstance(sink.last_error, OSError)
+
+
+def test_background_flush(writer: ListWriter):
+    sink = AuditSink(writer, flush_interval=0.01)
+    try:
+        sink.record({"sub": "someone"})
+        deadline = time.monotonic() + 5
+        while not writer.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.records[0]["sub"] == "someone"
+    finally:
+        sink.close()
+
+
+def test_records_after_close_are_discarded(audit: AuditSink, writer: ListWriter):
+    audit.close()
+    audit.record({"sub": "someone"})
+    audit.flush()
+    assert writer.records == []
+
+
+def test_to_file(tmp_path):
+    path = tmp_path / "audit.ndjson"
+    sink = AuditSink.to_file(str(path))
+    sink.record({"iss": "https://issuer.example.com", "aud": ["a", "b"]})
+    sink.close()
+    (record,) = [json.loads(line) for line in path.read_text().splitlines()]
+    assert record["aud"] == ["a", "b"]
+
+
+def test_to_socket(tmp_path):
+    path = str(tmp_path / "audit.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    try:
+        sink = AuditSink.to_socket(path)
+        sink.record({"sub": "someone"})
+        sink.close()
+        connection, _ = server.accept()
+        with connection:
+            assert json.loads(connection.makefile("rb").readline())["sub"] == "someone"
+    finally:
+        server.close()
+
+
+def test_to_socket_unavailable(tmp_path):
+    sink = AuditSink.to_socket(str(tmp_path / "missing.sock"))
+    sink.record(None)
+    sink.close()
+    assert sink.dropped == 1
+
+
+def test_middleware(writer: ListWriter, oidc_issuer: Issuer, oidc_audience: str):
+    sink = AuditSink(writer, flush_interval=60)
+    app = WSGIMiddleware(wsgi_app, [oidc_issuer], [oidc_audience], audit=sink)
+    status, _ = call_wsgi(app, "Bearer not-a-jwt")
+    assert status.startswith("401")
+    sink.close()
+    assert writer.records[0]["reason"] == "malformed_token"
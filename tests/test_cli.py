@@ -0,0 +1,94 @@
+import json
+from typing import Any
+
+import pytest
+
+from federatedidentity._cli import main
+
+
+@pytest.fixture
+def config_path(tmp_path, jwt_issuer: str, oidc_audience: str) -> str:
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"issuers": [jwt_issuer], "audiences": [oidc_audience]}))
+    return str(path)
+
+
+def read_results(capsys) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_verify(jobs: str, tmp_path, capsys, config_path: str, oidc_token: str, oidc_subject: str):
+    tokens_path = tmp_path / "tokens"
+    tokens_path.write_text("\n".join([oidc_token, "not-a-token", "", oidc_token]) + "\n")
+    assert (
+        main(["verify", "-c", config_path, "-j", jobs, "--chunk-size", "1", str(tokens_path)]) == 0
+    )
+    results = read_results(capsys)
+    assert [r["line"] for r in results] == [1, 2, 4]
+    assert [r["valid"] for r in results] == [True, False, True]
+    assert results[0]["claims"]["sub"] == oidc_subject
+    assert results[1]["error"] == "InvalidTokenError"
+    assert results[1]["code"] == "malformed_token"
+
+
+def test_verify_required_claims(
+    tmp_path, capsys, jwt_issuer: str, oidc_audience: str, oidc_token: str
+):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "issuers": [jwt_issuer],
+                "audiences": [oidc_audience],
+                "issuer_required_claims": {jwt_issuer: [{"sub": "someone-else"}]},
+            }
+        )
+    )
+    tokens_path = tmp_path / "tokens"
+    tokens_path.write_text(oidc_token)
+    assert main(["verify", "-c", str(config_path), "-j", "1", str(tokens_path)]) == 0
+    (result,) = read_results(capsys)
+    assert not result["valid"]
+    assert result["error"] == "InvalidClaimsError"
+    assert result["code"] == "claim_mismatch"
+
+
+def test_verify_toml_config(tmp_path, capsys, jwt_issuer: str, oidc_token: str):
+    pytest.importorskip("tomllib")
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(f'issuers = ["{jwt_issuer}"]\nany_audience = true\n')
+    tokens_path = tmp_path / "tokens"
+    tokens_path.write_text(oidc_token)
+    assert main(["verify", "-c", str(config_path), "-j", "1", str(tokens_path)]) == 0
+    (result,) = read_results(capsys)
+    assert result["valid"]
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {},
+        {"issuers": ["https://issuer.example.com"]},
+        {"issuers": "https://issuer.example.com", "any_audience": True},
+        {"issuers": ["https://issuer.example.com"], "audiences": ["a"], "required_claims": [1]},
+    ],
+)
+def test_invalid_config(tmp_path, capsys, config):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+    assert main(["verify", "-c", str(config_path)]) == 2
+    assert "Invalid configuration" in capsys.readouterr().err
+
+
+def test_discovery_failure(tmp_path, capsys):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"issuers": ["not a url"], "any_audience": True}))
+    assert main(["verify", "-c", str(config_path)]) == 1
+
+
+def test_serve_invalid_config(tmp_path, capsys):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"issuers": [], "any_audience": True}))
+    assert main(["serve", "-c", str(config_path), "-s", str(tmp_path / "sock")]) == 2
+    assert "Invalid configuration" in capsys.readouterr().err
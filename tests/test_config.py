@@ -0,0 +1,218 @@
+import json
+import time
+from typing import Any
+
+import pytest
+from faker import Faker
+from responses import RequestsMock
+
+from federatedidentity import (
+    DEFAULT_POLICY,
+    ReloadingConfig,
+    TimePolicy,
+    VerificationConfig,
+    VerificationPolicy,
+)
+from federatedidentity._config import policy_configs
+from federatedidentity.exceptions import (
+    ErrorCode,
+    InvalidClaimsError,
+    InvalidConfigError,
+    UnknownPolicyError,
+)
+
+
+@pytest.fixture
+def document(jwt_issuer: str, oidc_audience: str) -> dict[str, Any]:
+    return {
+        "issuers": [jwt_issuer],
+        "audiences": [oidc_audience],
+        "policies": {"strict": {"required_claims": [{"sub": "someone-else"}]}},
+    }
+
+
+@pytest.fixture
+def config_path(tmp_path, document: dict[str, Any]) -> str:
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(document))
+    return str(path)
+
+
+def discovery_count(mocked_responses: RequestsMock) -> int:
+    return sum(
+        1
+        for call in mocked_responses.calls
+        if str(call.request.url).endswith("/.well-known/openid-configuration")
+    )
+
+
+def test_policy_configs(document: dict[str, Any]):
+    configs = policy_configs(document)
+    assert set(configs.keys()) == {DEFAULT_POLICY, "strict"}
+    assert configs["strict"]["issuers"] == document["issuers"]
+    assert configs["strict"]["required_claims"] == [{"sub": "someone-else"}]
+    assert "required_claims" not in configs[DEFAULT_POLICY]
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        {"issuers": ["https://issuer.example.com"], "any_audience": True, "policies": []},
+        {"issuers": ["https://issuer.example.com"], "any_audience": True, "policies": {"p": 1}},
+        {"any_audience": True, "policies": {"p": {"issuers": ["https://issuer.example.com"]}}},
+        {"issuers": ["https://issuer.example.com"], "policies": {"p": {"any_audience": True}}},
+    ],
+)
+def test_invalid_policy_configs(document: dict[str, Any]):
+    with pytest.raises(InvalidConfigError):
+        policy_configs(document)
+
+
+def test_verification_config(document: dict[str, Any], oidc_token: str, oidc_subject: str):
+    config = VerificationConfig.from_document(document)
+    assert config.verify(oidc_token)["sub"] == oidc_subject
+    assert config.verify(oidc_token, read_only_claims=True).sub == oidc_subject
+    with pytest.raises(InvalidClaimsError):
+        config.verify(oidc_token, "strict")
+    with pytest.raises(UnknownPolicyError):
+        config.verify(oidc_token, "unknown")
+    assert isinstance(config.policy(), VerificationPolicy)
+    assert config.policy().issuers == config.policy("strict").issuers
+
+
+def test_verification_config_is_immutable(document: dict[str, Any]):
+    config = VerificationConfig.from_document(document)
+    with pytest.raises(TypeError):
+        config.policies["new"] = config.policy()  # type: ignore[index]
+
+
+def test_known_issuers_not_discovered(document: dict[str, Any], mocked_responses: RequestsMock):
+    config = VerificationConfig.from_document(document)
+    assert discovery_count(mocked_responses) == 1
+    VerificationConfig.from_document(document, issuers=config.issuers)
+    assert discovery_count(mocked_responses) == 1
+
+
+def test_reload(
+    config_path: str,
+    document: dict[str, Any],
+    faker: Faker,
+    oidc_token: str,
+    mocked_responses: RequestsMock,
+):
+    config = ReloadingConfig(config_path)
+    old = config.current
+    config.verify(oidc_token)
+
+    with open(config_path, "w") as f:
+        json.dump({**document, "audiences": [faker.url()]}, f)
+    new = config.reload()
+    assert config.current is new
+    assert config.last_error is None
+
+    # Issuers are re-used rather than being discovered again.
+    assert discovery_count(mocked_responses) == 1
+    assert new.issuers == old.issuers
+
+    # The new configuration is used but the old snapshot continues to work.
+    with pytest.raises(InvalidClaimsError):
+        config.verify(oidc_token)
+    old.verify(oidc_token)
+
+
+def test_failed_reload_keeps_config(config_path: str, oidc_token: str):
+    config = ReloadingConfig(config_path)
+    old = config.current
+    with open(config_path, "w") as f:
+        f.write("not json")
+    with pytest.raises(InvalidConfigError):
+        config.reload()
+    assert config.current is old
+    assert isinstance(config.last_error, InvalidConfigError)
+
+    config.reload_in_background().join()
+    assert config.current is old
+    config.verify(oidc_token)
+
+
+def test_watch(config_path: str, document: dict[str, Any], faker: Faker):
+    config = ReloadingConfig(config_path)
+    old = config.current
+    config.watch(interval=0.01)
+    try:
+        with open(config_path, "w") as f:
+            json.dump({**document, "audiences": [faker.url(), faker.url()]}, f)
+        deadline = time.monotonic() + 5
+        while config.current is old and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert config.current is not old
+    finally:
+        config.close()
+
+
+def test_invalid_initial_config(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"issuers": []}))
+    with pytest.raises(InvalidConfigError):
+        ReloadingConfig(str(path))
+
+
+def test_try_verify(document: dict[str, Any], oidc_token: str, oidc_subject: str):
+    config = VerificationConfig.from_document(document)
+    result = config.try_verify(oidc_token)
+    assert result.claims is not None and result.claims["sub"] == oidc_subject
+    assert config.try_verify(oidc_token, "strict").code == ErrorCode.CLAIM_MISMATCH
+    result = config.try_verify(oidc_token, "unknown")
+    assert isinstance(result.error, UnknownPolicyError)
+    assert result.code == ErrorCode.UNKNOWN_POLICY
+
+
+def test_configured_jwks_uris_not_discovered(
+    document: dict[str, Any], jwks_uri: str, oidc_token: str, mocked_responses: RequestsMock
+):
+    config = VerificationConfig.from_document(
+        {**document, "jwks_uris": {document["issuers"][0]: jwks_uri}}
+    )
+    config.verify(oidc_token)
+    assert discovery_count(mocked_responses) == 0
+
+
+def test_invalid_jwks_uris(document: dict[str, Any]):
+    with pytest.raises(InvalidConfigError):
+        VerificationConfig.from_document({**document, "jwks_uris": ["https://example.com"]})
+
+
+@pytest.mark.asyncio
+async def test_status(config_path: str, jwt_issuer: str):
+    config = ReloadingConfig(config_path)
+    assert config.status()[jwt_issuer].usable
+    assert await config.wait_until_ready(timeout=5)
+
+
+def test_time_policy(document: dict[str, Any]):
+    config = VerificationConfig.from_document(
+        {**document, "leeway": 10, "policies": {"fresh": {"max_token_age": 300}}}
+    )
+    assert config.policy().time_policy == TimePolicy(leeway=10)
+    assert config.policy("fresh").time_policy == TimePolicy(leeway=10, max_age=300)
+
+
+@pytest.mark.parametrize("value", [-1, "10", True])
+def test_invalid_time_policy(document: dict[str, Any], value: Any):
+    with pytest.raises(InvalidConfigError):
+        policy_configs({**document, "leeway": value})
+
+
+def test_adaptive_claim_order(document: dict[str, Any], oidc_token: str):
+    config = VerificationConfig.from_document(
+        {
+            **document,
+            "adaptive_claim_order": True,
+            "required_claims": [{"sub": "someone-else"}],
+            "required_claims_present": ["sub"],
+        }
+    )
+    assert len(config.policy().required_claims) == 1
+    assert config.try_verify(oidc_token).code == ErrorCode.CLAIM_MISMATCH
+    with pytest.raises(InvalidConfigError):
+        policy_configs({**document, "adaptive_claim_order": "yes"})
@@ -2,7 +2,7 @@ import json
 
 import pytest
 from faker import Faker
-from jwcrypto.jwk import JWKSet
+from jwcrypto.jwk import JWK, InvalidJWKValue, JWKSet
 
 from federatedidentity import _oidc, exceptions
 from federatedidentity.transport.requests import async_request, request
@@ -101,3 +101,29 @@ def test_jwks_uri_not_https(faker: Faker, jwt_issuer: str, mocked_responses):
     with pytest.raises(exceptions.InvalidJWKSUrlError) as e:
         _oidc.fetch_jwks(jwt_issuer, request)
     assert str(e.value) == "JWKS URL does not have a https scheme."
+
+
+def test_unchanged_keys_are_reused(jwk_set: JWKSet):
+    first = _oidc.key_set_from_json(jwk_set.export(private_keys=False))
+    new_key = JWK.generate(kty="EC", crv="P-256", kid="new")
+    document = json.loads(jwk_set.export(private_keys=False))
+    document["keys"].append(new_key.export_public(as_dict=True))
+    second = _oidc.key_set_from_json(json.dumps(document))
+
+    assert first == jwk_set
+    assert len(second["keys"]) == len(first["keys"]) + 1
+    first_ids = {id(key) for key in first["keys"]}
+    assert first_ids < {id(key) for key in second["keys"]}
+    assert second.get_key("new") == new_key
+
+
+def test_key_set_from_json_skips_unsupported_keys():
+    key_set = _oidc.key_set_from_json('{"keys": [{"kty": "unknown"}], "extra": 1}')
+    assert len(key_set["keys"]) == 0
+    assert key_set["extra"] == 1
+
+
+@pytest.mark.parametrize("content", ["not json", "{}", '{"keys": [{"kty": "EC"}]}'])
+def test_malformed_key_set(content: str):
+    with pytest.raises(InvalidJWKValue):
+        _oidc.key_set_from_json(content)
@@ -0,0 +1,183 @@
+import json
+
+import pytest
+from faker import Faker
+from jwcrypto.jwk import JWKSet
+from responses import RequestsMock
+
+from federatedidentity import KeyStore, verify_id_token
+from federatedidentity.transport.requests import request
+
+
+@pytest.fixture
+def tenant_issuers(faker: Faker, jwks_uri: str, mocked_responses: RequestsMock) -> list[str]:
+    "Issuers which all share the same jwks_uri."
+    issuers = []
+    for _ in range(5):
+        issuer_url = faker.url(schemes=["https"]).rstrip("/") + f"/{faker.uuid4()}/v2.0"
+        mocked_responses.get(
+            f"{issuer_url}/.well-known/openid-configuration",
+            body=json.dumps({"jwks_uri": jwks_uri, "issuer": issuer_url}),
+            content_type="application/json",
+        )
+        issuers.append(issuer_url)
+    return issuers
+
+
+def jwks_fetch_count(mocked_responses: RequestsMock, jwks_uri: str) -> int:
+    return sum(1 for call in mocked_responses.calls if call.request.url == jwks_uri)
+
+
+def test_shared_jwks_uri_fetched_once(
+    tenant_issuers: list[str], jwks_uri: str, jwk_set: JWKSet, mocked_responses: RequestsMock
+):
+    store = KeyStore()
+    issuers = [store.from_discovery(name) for name in tenant_issuers]
+    assert jwks_fetch_count(mocked_responses, jwks_uri) == 1
+    assert len(store) == 1
+    assert all(issuer.key_set is issuers[0].key_set for issuer in issuers)
+    assert issuers[0].key_set == jwk_set
+
+
+@pytest.mark.asyncio
+async def test_shared_jwks_uri_fetched_once_async(
+    tenant_issuers: list[str], jwks_uri: str, mocked_responses: RequestsMock
+):
+    store = KeyStore()
+    issuers = [await store.async_from_discovery(name) for name in tenant_issuers]
+    assert jwks_fetch_count(mocked_responses, jwks_uri) == 1
+    assert all(issuer.key_set is issuers[0].key_set for issuer in issuers)
+
+
+def test_identical_content_deduplicated(
+    faker: Faker, jwks_uri: str, jwk_set: JWKSet, mocked_responses: RequestsMock
+):
+    mirror_uri = faker.url(schemes=["https"]) + "mirror/jwks.json"
+    mocked_responses.get(
+        mirror_uri, body=jwk_set.export(private_keys=False), content_type="application/json"
+    )
+    store = KeyStore()
+    first, second = store.key_cache(jwks_uri), store.key_cache(mirror_uri)
+    first.refresh()
+    second.refresh()
+    assert first is not second
+    assert first.get() is second.get()
+
+
+def test_verification(
+    jwt_issuer: str, oidc_token: str, oidc_audience: str, mocked_responses: RequestsMock
+):
+    issuer = KeyStore().from_discovery(jwt_issuer)
+    verify_id_token(oidc_token, [issuer], [oidc_audience])
+
+
+def test_timeout_applies_to_each_request(tenant_issuers: list[str]):
+    timeouts = []
+
+    def recording_request(url, body=None, method=None, headers=None, timeout=None):
+        timeouts.append(timeout)
+        return request(url, body, method, headers)
+
+    store = KeyStore(recording_request, timeout=5)  # type: ignore[arg-type]
+    issuer = store.from_discovery(tenant_issuers[0])
+    issuer.key_cache.refresh()
+    assert len(timeouts) == 3
+    assert all(0 < timeout <= 5 for timeout in timeouts)
+
+
+def test_from_jwks_uri_shares_cache(
+    tenant_issuers: list[str], jwks_uri: str, faker: Faker, mocked_responses: RequestsMock
+):
+    store = KeyStore()
+    discovered = store.from_discovery(tenant_issuers[0])
+    configured = store.from_jwks_uri(faker.url(schemes=["https"]), jwks_uri)
+    assert configured.key_cache is discovered.key_cache
+    assert jwks_fetch_count(mocked_responses, jwks_uri) == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def tenant_jwks_uris(faker: Faker, jwk_set: JWKSet, mocked_responses: RequestsMock) -> list[str]:
+    "Distinct JWKS URLs each serving the same key set."
+    uris = []
+    for _ in range(3):
+        uri = faker.url(schemes=["https"]).rstrip("/") + f"/{faker.uuid4()}/keys"
+        mocked_responses.get(
+            uri, body=jwk_set.export(private_keys=False), content_type="application/json"
+        )
+        uris.append(uri)
+    return uris
+
+
+def test_usage(tenant_jwks_uris: list[str]):
+    store = KeyStore()
+    for uri in tenant_jwks_uris:
+        store.from_jwks_uri("https://issuer.example.com", uri)
+    usage = store.usage()
+    assert usage.jwks_uris == usage.key_sets == 3
+    assert usage.size == 3 * store.key_cache(tenant_jwks_uris[0]).size > 0
+    assert usage.max_size is None
+    assert usage.evictions == 0
+
+
+def test_least_recently_used_evicted_over_budget(tenant_jwks_uris: list[str]):
+    clock = FakeClock()
+    probe = KeyStore()
+    probe.from_jwks_uri("https://issuer.example.com", tenant_jwks_uris[0])
+    size = probe.usage().size
+
+    store = KeyStore(max_size=2 * size, clock=clock)
+    first, second = [
+        store.from_jwks_uri("https://issuer.example.com", uri) for uri in tenant_jwks_uris[:2]
+    ]
+    clock.now += 1
+    first.key_set  # Now the second key set is least recently used.
+    clock.now += 1
+    store.from_jwks_uri("https://issuer.example.com", tenant_jwks_uris[2])
+
+    assert first.key_cache.has_key_set
+    assert not second.key_cache.has_key_set
+    usage = store.usage()
+    assert usage.key_sets == 2
+    assert usage.size <= 2 * size
+    assert usage.evictions == 1
+
+    # The evicted key set is fetched again when used.
+    assert len(second.key_set["keys"]) > 0
+
+
+def test_idle_key_sets_evicted(tenant_jwks_uris: list[str]):
+    clock = FakeClock()
+    store = KeyStore(idle_ttl=60, clock=clock)
+    idle = store.from_jwks_uri("https://issuer.example.com", tenant_jwks_uris[0])
+    clock.now += 30
+    active = store.from_jwks_uri("https://issuer.example.com", tenant_jwks_uris[1])
+    store.trim()
+    assert store.usage().key_sets == 2
+
+    clock.now += 30
+    store.trim()
+    assert not idle.key_cache.has_key_set
+    assert active.key_cache.has_key_set
+
+
+def test_evicted_caches_removed(tenant_jwks_uris: list[str]):
+    clock = FakeClock()
+    store = KeyStore(idle_ttl=60, clock=clock)
+    issuers = [store.from_jwks_uri("https://issuer.example.com", uri) for uri in tenant_jwks_uris]
+    clock.now += 60
+    store.trim()
+    assert len(store) == 0
+    assert store.usage().jwks_uris == 0
+
+    # An issuer holding an evicted cache still works and returns the cache to the store.
+    assert len(issuers[0].key_set["keys"]) > 0
+    assert len(store) == 1
+    assert store.key_cache(tenant_jwks_uris[0]) is issuers[0].key_cache
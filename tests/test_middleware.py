@@ -0,0 +1,151 @@
+from typing import Any, Optional
+from unittest import mock
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from federatedidentity import Issuer
+from federatedidentity.middleware import (
+    CLAIMS_KEY,
+    ASGIMiddleware,
+    WSGIMiddleware,
+    verified_claims,
+)
+
+
+class ASGIApp:
+    def __init__(self):
+        self.scope: Optional[dict[str, Any]] = None
+
+    async def __call__(self, scope, receive, send):
+        self.scope = scope
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"OK"})
+
+
+async def call_asgi(app, authorization: Optional[bytes] = None, scope_type: str = "http"):
+    headers = [(b"authorization", authorization)] if authorization is not None else []
+    messages: list[dict[str, Any]] = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": scope_type, "headers": headers}, receive, send)
+    return messages
+
+
+def call_wsgi(app, authorization: Optional[str] = None):
+    environ: dict[str, Any] = {}
+    setup_testing_defaults(environ)
+    if authorization is not None:
+        environ["HTTP_AUTHORIZATION"] = authorization
+    start_response = mock.Mock()
+    body = b"".join(app(environ, start_response))
+    return start_response.call_args[0][0], body
+
+
+def wsgi_app(environ, start_response):
+    start_response("200 OK", [])
+    return [verified_claims(environ)["sub"].encode("utf8")]
+
+
+@pytest.mark.asyncio
+async def test_asgi_valid_token(oidc_token: str, oidc_issuer: Issuer, oidc_audience: str):
+    inner = ASGIApp()
+    app = ASGIMiddleware(inner, [oidc_issuer], [oidc_audience])
+    messages = await call_asgi(app, f"Bearer {oidc_token}".encode("ascii"))
+    assert messages[0]["status"] == 200
+    assert inner.scope is not None
+    claims = verified_claims(inner.scope)
+    assert claims is not None
+    assert claims["aud"] == oidc_audience
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "authorization,www_authenticate",
+    [
+        (None, b"Bearer"),
+        (b"Basic dXNlcjpwYXNz", b"Bearer"),
+        (b"Bearer not-a-token", b'Bearer error="invalid_token"'),
+        (b"Bearer a.b.c", b'Bearer error="invalid_token"'),
+    ],
+)
+async def test_asgi_rejected(
+    authorization, www_authenticate, oidc_issuer: Issuer, oidc_audience: str
+):
+    inner = ASGIApp()
+    app = ASGIMiddleware(inner, [oidc_issuer], [oidc_audience])
+    messages = await call_asgi(app, authorization)
+    assert messages[0]["status"] == 401
+    assert (b"www-authenticate", www_authenticate) in messages[0]["headers"]
+    assert inner.scope is None
+
+
+@pytest.mark.asyncio
+async def test_asgi_malformed_token_not_verified(oidc_issuer: Issuer, oidc_audience: str):
+    app = ASGIMiddleware(ASGIApp(), [oidc_issuer], [oidc_audience])
+    with mock.patch.object(app._verifier, "verify") as verify:
+        messages = await call_asgi(app, b"Bearer not/a.valid.token")
+    assert messages[0]["status"] == 401
+    verify.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_asgi_anonymous(oidc_issuer: Issuer, oidc_audience: str):
+    inner = ASGIApp()
+    app = ASGIMiddleware(inner, [oidc_issuer], [oidc_audience], allow_anonymous=True)
+    messages = await call_asgi(app)
+    assert messages[0]["status"] == 200
+    assert inner.scope is not None
+    assert verified_claims(inner.scope) is None
+
+
+@pytest.mark.asyncio
+async def test_asgi_websocket_rejected(oidc_issuer: Issuer, oidc_audience: str):
+    app = ASGIMiddleware(ASGIApp(), [oidc_issuer], [oidc_audience])
+    messages = await call_asgi(app, scope_type="websocket")
+    assert messages == [{"type": "websocket.close", "code": 1008}]
+
+
+@pytest.mark.asyncio
+async def test_asgi_verifies_once(oidc_token: str, oidc_issuer: Issuer, oidc_audience: str):
+    inner = ASGIMiddleware(ASGIApp(), [oidc_issuer], [oidc_audience])
+    outer = ASGIMiddleware(inner, [oidc_issuer], [oidc_audience])
+    with mock.patch.object(inner._verifier, "verify") as verify:
+        messages = await call_asgi(outer, f"Bearer {oidc_token}".encode("ascii"))
+    assert messages[0]["status"] == 200
+    verify.assert_not_called()
+
+
+def test_wsgi_valid_token(
+    oidc_token: str, oidc_issuer: Issuer, oidc_audience: str, oidc_subject: str
+):
+    app = WSGIMiddleware(wsgi_app, [oidc_issuer], [oidc_audience])
+    status, body = call_wsgi(app, f"Bearer {oidc_token}")
+    assert status == "200 OK"
+    assert body == oidc_subject.encode("utf8")
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer not-a-token"])
+def test_wsgi_rejected(authorization, oidc_issuer: Issuer, oidc_audience: str):
+    app = WSGIMiddleware(wsgi_app, [oidc_issuer], [oidc_audience])
+    status, _ = call_wsgi(app, authorization)
+    assert status == "401 Unauthorized"
+
+
+def test_wsgi_invalid_signature(oidc_token: str, oidc_issuer: Issuer, oidc_audience: str):
+    header, payload, signature = oidc_token.split(".")
+    app = WSGIMiddleware(wsgi_app, [oidc_issuer], [oidc_audience])
+    status, _ = call_wsgi(app, f"Bearer {header}.{payload}.{signature[::-1]}")
+    assert status == "401 Unauthorized"
+
+
+def test_wsgi_verifies_once(oidc_issuer: Issuer, oidc_audience: str):
+    app = WSGIMiddleware(wsgi_app, [oidc_issuer], [oidc_audience])
+    environ: dict[str, Any] = {CLAIMS_KEY: {"sub": "someone"}}
+    setup_testing_defaults(environ)
+    assert b"".join(app(environ, mock.Mock())) == b"someone"
@@ -1,9 +1,11 @@
+import pickle
+
 import pytest
 import requests
 from jwcrypto.jwk import JWKSet
 from jwcrypto.jwt import JWT
 
-from federatedidentity import Issuer, _oidc, exceptions
+from federatedidentity import Issuer, _oidc, exceptions, verify_id_token
 
 
 def test_jwt_issuer(jwt_issuer: str, jwks_uri: str):
@@ -37,3 +39,39 @@ def test_malformed_token():
 def test_missing_claim(faker, oidc_token: str):
     with pytest.raises(exceptions.InvalidTokenError):
         assert _oidc.unvalidated_claim_from_token(oidc_token, faker.slug())
+
+
+def test_issuer_serialization(oidc_issuer: Issuer, oidc_token: str, oidc_audience: str):
+    # Use the issuer first so that its keys have been imported.
+    verify_id_token(oidc_token, [oidc_issuer], [oidc_audience])
+    for copy in [
+        Issuer.from_bytes(oidc_issuer.to_bytes()),
+        pickle.loads(pickle.dumps(oidc_issuer)),
+    ]:
+        assert copy.name == oidc_issuer.name
+        assert copy.key_set == oidc_issuer.key_set
+        verify_id_token(oidc_token, [copy], [oidc_audience])
+
+
+class IssuerSubclass(Issuer):
+    pass
+
+
+def test_issuer_subclass_pickling(oidc_issuer: Issuer):
+    issuer = IssuerSubclass(name=oidc_issuer.name, key_set=oidc_issuer.key_set)
+    copy = pickle.loads(pickle.dumps(issuer))
+    assert type(copy) is IssuerSubclass
+    assert copy.key_set == issuer.key_set
+
+
+def test_issuer_serialization_has_no_private_keys(oidc_issuer: Issuer):
+    for key in Issuer.from_bytes(oidc_issuer.to_bytes()).key_set["keys"]:
+        assert not key.has_private
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"\x00{}", b"\x01not json", b"\x01{}", b'\x01{"iss":"a","keys":[{}]}']
+)
+def test_issuer_deserialization_errors(data: bytes):
+    with pytest.raises(ValueError):
+        Issuer.from_bytes(data)
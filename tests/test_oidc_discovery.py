@@ -1,10 +1,15 @@
+import asyncio
 import json
+import time
+from typing import Optional, cast
 
 import pytest
 from faker import Faker
 from jwcrypto.jwk import JWKSet
 
 from federatedidentity import Issuer, _oidc, exceptions
+from federatedidentity.testing import MockOIDCProvider
+from federatedidentity.transport import AsyncRequestBase, RequestBase
 from federatedidentity.transport.requests import async_request, request
 
 
@@ -99,3 +104,91 @@ def test_jwks_uri_not_https(faker: Faker, jwt_issuer: str, mocked_responses):
     with pytest.raises(exceptions.InvalidJWKSUrlError) as e:
         Issuer.from_discovery(jwt_issuer)
     assert str(e.value) == "JWKS URL does not have a https scheme."
+
+
+def test_from_jwks_uri(jwks_uri: str, jwk_set: JWKSet, faker: Faker, mocked_responses):
+    issuer = Issuer.from_jwks_uri(faker.url(schemes=["https"]), jwks_uri)
+    assert issuer.key_set == jwk_set
+    assert [call.request.url for call in mocked_responses.calls] == [jwks_uri]
+
+
+@pytest.mark.asyncio
+async def test_from_jwks_uri_async(jwks_uri: str, jwk_set: JWKSet, faker: Faker):
+    issuer = await Issuer.async_from_jwks_uri(faker.url(schemes=["https"]), jwks_uri)
+    assert issuer.key_set == jwk_set
+
+
+def test_from_jwks_uri_not_https(faker: Faker):
+    with pytest.raises(exceptions.InvalidJWKSUrlError):
+        Issuer.from_jwks_uri(faker.url(schemes=["https"]), faker.url(schemes=["http"]))
+
+
+class RecordingRequest(RequestBase):
+    "Transport which records the timeout of each request and optionally delays it."
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.timeouts: list[Optional[float]] = []
+
+    def __call__(self, url, body=None, method=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        return request(url, body, method, headers)
+
+
+class SlowAsyncRequest(AsyncRequestBase):
+    async def __call__(self, url, body=None, method=None, headers=None, timeout=None):
+        await asyncio.sleep(60)
+        raise AssertionError("request was not cancelled")  # pragma: no cover
+
+
+def test_timeout_passed_to_transport(jwt_issuer: str):
+    transport = RecordingRequest()
+    Issuer.from_discovery(jwt_issuer, transport, timeout=10)
+    assert len(transport.timeouts) == 2
+    first, second = cast(list[float], transport.timeouts)
+    assert 0 < second <= first <= 10
+
+
+def test_no_timeout_not_passed_to_transport(jwt_issuer: str, jwk_set: JWKSet):
+    class LegacyRequest(RequestBase):
+        def __call__(self, url, body=None, method=None, headers=None):  # type: ignore[override]
+            return request(url, body, method, headers)
+
+    assert Issuer.from_discovery(jwt_issuer, LegacyRequest()).key_set == jwk_set
+
+
+def test_timeout_budget_shared_between_requests(jwt_issuer: str):
+    transport = RecordingRequest(delay=0.2)
+    with pytest.raises(exceptions.DeadlineExceededError):
+        Issuer.from_discovery(jwt_issuer, transport, timeout=0.1)
+    # The key set is never requested since the budget was used up by the discovery document.
+    assert len(transport.timeouts) == 1
+
+
+def test_late_response_exceeds_deadline(jwt_issuer: str):
+    # The transport ignores its timeout and so the deadline has passed when it returns.
+    url = _oidc.oidc_discovery_document_url(_oidc.validate_issuer(jwt_issuer))
+    with pytest.raises(exceptions.DeadlineExceededError):
+        _oidc._request_json(url, RecordingRequest(delay=0.2), _oidc.deadline_after(0.1))
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_async_request(jwt_issuer: str):
+    start = time.monotonic()
+    with pytest.raises(exceptions.DeadlineExceededError):
+        await Issuer.async_from_discovery(jwt_issuer, SlowAsyncRequest(), timeout=0.05)
+    assert time.monotonic() - start < 5
+
+
+def test_timeout_with_requests_transport(mocked_responses):
+    with MockOIDCProvider(latency=2) as provider:
+        mocked_responses.add_passthru(provider.issuer)
+        start = time.monotonic()
+        with pytest.raises(exceptions.DeadlineExceededError):
+            Issuer.from_discovery(provider.issuer, provider.request, timeout=0.2)
+        assert time.monotonic() - start < 1.5
+
+
+def test_deadline_exceeded_is_transport_error():
+    assert issubclass(exceptions.DeadlineExceededError, exceptions.TransportError)
@@ -0,0 +1,130 @@
+import json
+import socket
+import time
+
+import pytest
+from faker import Faker
+from jwcrypto.jwk import JWK, JWKSet
+
+from federatedidentity import Issuer, RefreshingIssuer, ReloadingConfig, verify_id_token
+from federatedidentity.exceptions import InvalidTokenError
+from federatedidentity.push import KeyUpdateListener
+
+from .oidcfixtures import make_jwt
+
+
+@pytest.fixture
+def issuer(jwt_issuer: str) -> RefreshingIssuer:
+    return RefreshingIssuer.from_discovery(jwt_issuer)
+
+
+@pytest.fixture
+def new_key(faker: Faker) -> JWK:
+    return JWK.generate(kty="EC", crv="P-256", kid=faker.slug())
+
+
+@pytest.fixture
+def new_token(new_key: JWK, oidc_claims: dict) -> str:
+    return make_jwt(oidc_claims, new_key, "ES256")
+
+
+def update_for(issuer: RefreshingIssuer, key: JWK) -> dict:
+    return {"iss": issuer.name, "keys": [key.export_public(as_dict=True)]}
+
+
+def test_apply(issuer: RefreshingIssuer, new_key: JWK, new_token: str, oidc_audience: str):
+    with pytest.raises(InvalidTokenError):
+        verify_id_token(new_token, [issuer], [oidc_audience])
+    listener = KeyUpdateListener([issuer])
+    listener.apply(update_for(issuer, new_key))
+    verify_id_token(new_token, [issuer], [oidc_audience])
+
+
+def test_invalidate(issuer: RefreshingIssuer, new_key: JWK, jwk_set: JWKSet):
+    listener = KeyUpdateListener([issuer])
+    listener.apply(update_for(issuer, new_key))
+    listener.apply({"iss": issuer.name, "invalidate": True})
+    assert not issuer.key_cache.has_key_set
+    assert issuer.key_set == jwk_set
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        {"iss": "https://unknown.example.com", "invalidate": True},
+        {"iss": None, "invalidate": True},
+        {"keys": "not-a-list"},
+        {"keys": [{"kty": "unknown"}]},
+        {"keys": [], "max_age": "forever"},
+    ],
+)
+def test_malformed_updates(issuer: RefreshingIssuer, update: dict):
+    listener = KeyUpdateListener([issuer])
+    with pytest.raises(ValueError):
+        listener.apply({"iss": issuer.name, **update})
+
+
+def test_static_issuers_cannot_be_updated(jwt_issuer: str, jwk_set: JWKSet):
+    listener = KeyUpdateListener([Issuer(name=jwt_issuer, key_set=jwk_set)])
+    with pytest.raises(ValueError):
+        listener.apply({"iss": jwt_issuer, "invalidate": True})
+
+
+def test_reloading_config(
+    tmp_path, jwt_issuer: str, jwks_uri: str, oidc_audience: str, new_key: JWK
+):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"issuers": [jwt_issuer], "audiences": [oidc_audience]}))
+    config = ReloadingConfig(str(path))
+    listener = KeyUpdateListener(config)
+
+    # Replace the issuer with one added by the reload.
+    added = "https://added.example.com"
+    path.write_text(
+        json.dumps(
+            {"issuers": [added], "jwks_uris": {added: jwks_uri}, "audiences": [oidc_audience]}
+        )
+    )
+    config.reload()
+    listener.apply({"iss": added, "keys": [new_key.export_public(as_dict=True)]})
+    assert config.current.issuers[added].key_set.get_key(new_key["kid"]) is not None
+    with pytest.raises(ValueError):
+        listener.apply({"iss": jwt_issuer, "invalidate": True})
+
+
+def test_serve(
+    tmp_path, issuer: RefreshingIssuer, new_key: JWK, new_token: str, oidc_audience: str
+):
+    path = str(tmp_path / "keys.sock")
+    listener = KeyUpdateListener([issuer])
+    listener.serve(path)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(path)
+            f = s.makefile("rwb")
+            f.write(json.dumps(update_for(issuer, new_key)).encode("utf-8") + b"\n")
+            f.write(b"not json\n")
+            f.flush()
+            assert f.readline() == b"ok\n"
+            assert f.readline().startswith(b"error: ")
+        verify_id_token(new_token, [issuer], [oidc_audience])
+    finally:
+        listener.close()
+
+
+def test_watch(
+    tmp_path, issuer: RefreshingIssuer, new_key: JWK, new_token: str, oidc_audience: str
+):
+    path = tmp_path / "keys.ndjson"
+    path.write_text("")
+    listener = KeyUpdateListener([issuer])
+    listener.watch(str(path), interval=0.01)
+    try:
+        path.write_text(json.dumps(update_for(issuer, new_key)) + "\n")
+        deadline = time.monotonic() + 5
+        while issuer.key_set.get_key(new_key["kid"]) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        verify_id_token(new_token, [issuer], [oidc_audience])
+        assert listener.last_error is None
+    finally:
+        listener.close()
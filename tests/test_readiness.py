@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from faker import Faker
+from jwcrypto.jwk import JWKSet
+from responses import RequestsMock
+
+from federatedidentity import (
+    Issuer,
+    KeySetCache,
+    KeyStore,
+    RefreshingIssuer,
+    issuer_status,
+    wait_until_ready,
+)
+from federatedidentity.exceptions import TransportError
+
+
+def test_static_issuer_status(jwt_issuer: str, jwk_set: JWKSet):
+    status = issuer_status(Issuer(name=jwt_issuer, key_set=jwk_set))
+    assert status.usable and status.fresh
+    assert status.key_count == len(jwk_set["keys"])
+
+
+@pytest.mark.asyncio
+async def test_wait_until_ready(faker: Faker, jwks_uri: str, mocked_responses: RequestsMock):
+    store = KeyStore()
+    cache = store.key_cache(jwks_uri)
+    issuers = [RefreshingIssuer(name=faker.url(), key_cache=cache) for _ in range(3)]
+    assert not any(issuer_status(issuer).usable for issuer in issuers)
+
+    assert await wait_until_ready(issuers, timeout=5)
+    assert all(issuer_status(issuer).usable for issuer in issuers)
+    # Issuers sharing a cache are fetched once.
+    assert sum(1 for call in mocked_responses.calls if call.request.url == jwks_uri) == 1
+
+    # Issuers which are already ready are not fetched again.
+    assert await wait_until_ready(issuers)
+    assert len(mocked_responses.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_until_ready_failure(faker: Faker):
+    def fail():
+        raise TransportError("provider is down")
+
+    issuer = RefreshingIssuer(name=faker.url(), key_cache=KeySetCache(fail))
+    assert not await wait_until_ready([issuer])
+    assert isinstance(issuer_status(issuer).last_error, TransportError)
+
+
+@pytest.mark.asyncio
+async def test_wait_until_ready_timeout(faker: Faker, jwk_set: JWKSet):
+    async def slow_fetch():
+        await asyncio.sleep(60)
+        return jwk_set, {}  # pragma: no cover
+
+    issuer = RefreshingIssuer(name=faker.url(), key_cache=KeySetCache(async_fetch=slow_fetch))
+    assert not await wait_until_ready([issuer], timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_wait_until_ready_reports_refreshing(faker: Faker, jwk_set: JWKSet):
+    fetching = asyncio.Event()
+    release = asyncio.Event()
+
+    async def gated_fetch():
+        fetching.set()
+        await release.wait()
+        return jwk_set, {}
+
+    issuer = RefreshingIssuer(name=faker.url(), key_cache=KeySetCache(async_fetch=gated_fetch))
+    ready = asyncio.create_task(wait_until_ready([issuer], timeout=5))
+    await fetching.wait()
+    assert issuer_status(issuer).refreshing
+    release.set()
+    assert await ready
+    assert not issuer_status(issuer).refreshing
@@ -0,0 +1,389 @@
+import concurrent.futures
+import time
+from typing import Optional
+
+import pytest
+from faker import Faker
+from jwcrypto.jwk import JWK, JWKSet
+from responses import RequestsMock
+
+from federatedidentity import (
+    Issuer,
+    KeySetCache,
+    RefreshingIssuer,
+    RefreshPolicy,
+    verify_id_token,
+)
+from federatedidentity._refresh import max_age_from_headers
+from federatedidentity.exceptions import (
+    InvalidTokenError,
+    StaleKeySetError,
+    TransportError,
+)
+
+from .oidcfixtures import make_jwt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeFetcher:
+    def __init__(self, key_set: JWKSet, headers=None):
+        self.key_set = key_set
+        self.headers = headers if headers is not None else {}
+        self.error: Optional[Exception] = None
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.key_set, self.headers
+
+
+def discovery_count(mocked_responses: RequestsMock) -> int:
+    return sum(
+        1
+        for call in mocked_responses.calls
+        if str(call.request.url).endswith("/.well-known/openid-configuration")
+    )
+
+
+def wait_for_refresh(cache: KeySetCache):
+    deadline = time.monotonic() + 5
+    while cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not cache._refreshing
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({}, None),
+        ({"Cache-Control": "public, max-age=3600"}, 3600.0),
+        ({"cache-control": "max-age=3600", "age": "600"}, 3000.0),
+        ({"Cache-Control": "max-age=10", "Age": "600"}, 0.0),
+        ({"Cache-Control": "no-cache"}, 0.0),
+        ({"Cache-Control": "max-age=invalid"}, None),
+        ({"Cache-Control": "public"}, None),
+    ],
+)
+def test_max_age_from_headers(headers, expected):
+    assert max_age_from_headers(headers) == expected
+
+
+def test_fresh_key_set_does_not_refetch(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set, {"Cache-Control": "max-age=600"})
+    cache = KeySetCache(fetch, clock=clock)
+    cache.refresh()
+    clock.now += 500
+    assert cache.get() is jwk_set
+    assert fetch.calls == 1
+
+
+def test_stale_key_set_served_while_revalidating(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set, {"Cache-Control": "max-age=600"})
+    cache = KeySetCache(fetch, clock=clock)
+    cache.refresh()
+
+    new_jwk_set = JWKSet()
+    fetch.key_set = new_jwk_set
+    clock.now += 700
+    assert cache.get() is jwk_set
+    wait_for_refresh(cache)
+    assert fetch.calls == 2
+    assert cache.get() is new_jwk_set
+
+
+def test_stale_key_set_served_on_error(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    cache = KeySetCache(fetch, policy=RefreshPolicy(default_max_age=600), clock=clock)
+    cache.refresh()
+
+    fetch.error = TransportError("provider is down")
+    clock.now += 700
+    assert cache.get() is jwk_set
+    wait_for_refresh(cache)
+    assert isinstance(cache.last_error, TransportError)
+
+    # Retries are not attempted until the minimum interval has passed.
+    assert cache.get() is jwk_set
+    wait_for_refresh(cache)
+    assert fetch.calls == 2
+
+
+def test_key_set_beyond_max_stale(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    policy = RefreshPolicy(default_max_age=600, max_stale=3600)
+    cache = KeySetCache(fetch, policy=policy, clock=clock)
+    cache.refresh()
+
+    fetch.error = TransportError("provider is down")
+    clock.now += 600 + 3600
+    with pytest.raises(StaleKeySetError):
+        cache.get()
+
+    # Once the provider recovers, keys are fetched synchronously.
+    fetch.error = None
+    clock.now += policy.min_max_age
+    assert cache.get() is jwk_set
+
+
+def test_max_age_is_clamped(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set, {"Cache-Control": "no-store"})
+    cache = KeySetCache(fetch, policy=RefreshPolicy(min_max_age=30), clock=clock)
+    cache.refresh()
+    clock.now += 20
+    cache.get()
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_background_refresh(jwk_set: JWKSet):
+    clock = FakeClock()
+    calls = []
+
+    async def async_fetch():
+        calls.append(None)
+        return jwk_set, {}
+
+    cache = KeySetCache(
+        async_fetch=async_fetch, policy=RefreshPolicy(default_max_age=600), clock=clock
+    )
+    await cache.async_refresh()
+    clock.now += 700
+    assert cache.get() is jwk_set
+    assert cache._background_task is not None
+    await cache._background_task
+    assert len(calls) == 2
+
+
+def test_async_only_cache_with_no_key_set():
+    async def async_fetch():
+        raise TransportError("provider is down")
+
+    cache = KeySetCache(async_fetch=async_fetch)
+    with pytest.raises(StaleKeySetError):
+        cache.get()
+    wait_for_refresh(cache)
+    assert isinstance(cache.last_error, TransportError)
+
+
+def test_cache_requires_fetcher():
+    with pytest.raises(ValueError):
+        KeySetCache()
+
+
+def test_refreshing_issuer(jwt_issuer: str, jwk_set: JWKSet, oidc_token: str, oidc_audience: str):
+    issuer = RefreshingIssuer.from_discovery(jwt_issuer)
+    assert issuer.key_set == jwk_set
+    verify_id_token(oidc_token, [issuer], [oidc_audience])
+
+
+@pytest.mark.asyncio
+async def test_refreshing_issuer_async(jwt_issuer: str, jwk_set: JWKSet):
+    issuer = await RefreshingIssuer.async_from_discovery(jwt_issuer)
+    assert issuer.key_set == jwk_set
+
+
+def test_concurrent_get_refreshes_once(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    cache = KeySetCache(fetch, policy=RefreshPolicy(default_max_age=600), clock=clock)
+    cache.refresh()
+    clock.now += 700
+
+    with concurrent.futures.ThreadPoolExecutor(16) as executor:
+        results = list(executor.map(lambda _: cache.get(), range(256)))
+    wait_for_refresh(cache)
+    assert all(result is jwk_set for result in results)
+    assert fetch.calls == 2
+
+
+def test_request_refresh_is_rate_limited(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    cache = KeySetCache(fetch, policy=RefreshPolicy(default_max_age=600), clock=clock)
+    cache.refresh()
+
+    cache.request_refresh()
+    wait_for_refresh(cache)
+    assert fetch.calls == 1
+
+    clock.now += cache.policy.min_max_age
+    cache.request_refresh()
+    wait_for_refresh(cache)
+    assert fetch.calls == 2
+
+
+def test_refreshing_issuer_from_jwks_uri(
+    jwt_issuer: str,
+    jwks_uri: str,
+    jwk_set: JWKSet,
+    oidc_token: str,
+    oidc_audience: str,
+    mocked_responses: RequestsMock,
+):
+    issuer = RefreshingIssuer.from_jwks_uri(jwt_issuer, jwks_uri)
+    assert issuer.key_set == jwk_set
+    verify_id_token(oidc_token, [issuer], [oidc_audience])
+    assert discovery_count(mocked_responses) == 0
+
+
+@pytest.mark.asyncio
+async def test_refreshing_issuer_from_jwks_uri_async(jwt_issuer: str, jwks_uri: str):
+    issuer = await RefreshingIssuer.async_from_jwks_uri(jwt_issuer, jwks_uri)
+    assert issuer.key_cache.has_key_set
+
+
+def test_key_miss_rediscovers(
+    faker: Faker,
+    jwt_issuer: str,
+    jwks_uri: str,
+    oidc_claims: dict,
+    oidc_audience: str,
+    mocked_responses: RequestsMock,
+):
+    # The configured JWKS URL has been superseded by the one in the discovery document.
+    old_jwks_uri = faker.url(schemes=["https"])
+    mocked_responses.get(old_jwks_uri, json={"keys": []})
+    issuer = RefreshingIssuer.from_jwks_uri(
+        jwt_issuer, old_jwks_uri, policy=RefreshPolicy(min_max_age=0), rediscover_interval=3600
+    )
+    assert discovery_count(mocked_responses) == 0
+
+    new_key = JWK.generate(kty="EC", crv="P-256", kid=faker.slug())
+    token = make_jwt(oidc_claims, new_key, "ES256")
+    mocked_responses.replace("GET", jwks_uri, json={"keys": [new_key.export_public(as_dict=True)]})
+    with pytest.raises(InvalidTokenError):
+        verify_id_token(token, [issuer], [oidc_audience])
+    wait_for_refresh(issuer.key_cache)
+    assert discovery_count(mocked_responses) == 1
+    verify_id_token(token, [issuer], [oidc_audience])
+
+
+def test_key_miss_with_plain_issuer(
+    jwt_issuer: str, jwk_set: JWKSet, oidc_token: str, oidc_audience: str
+):
+    # A plain Issuer has no cache to refresh and key misses are simply rejected.
+    issuer = Issuer(name=jwt_issuer, key_set=JWKSet())
+    with pytest.raises(InvalidTokenError):
+        verify_id_token(oidc_token, [issuer], [oidc_audience])
+
+
+def test_status(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    policy = RefreshPolicy(default_max_age=600, max_stale=3600)
+    cache = KeySetCache(fetch, policy=policy, clock=clock)
+    status = cache.status()
+    assert (status.key_count, status.usable, status.fresh, status.age) == (0, False, False, None)
+
+    cache.refresh()
+    clock.now += 100
+    status = cache.status()
+    assert status.key_count == len(jwk_set["keys"])
+    assert status.usable and status.fresh
+    assert (status.age, status.max_age) == (100, 600)
+    assert not status.refreshing and status.last_error is None
+
+    fetch.error = TransportError("provider is down")
+    with pytest.raises(TransportError):
+        cache.refresh()
+    clock.now += 600
+    status = cache.status()
+    assert status.usable and not status.fresh
+    assert isinstance(status.last_error, TransportError)
+
+    clock.now += 3600
+    assert not cache.status().usable
+
+
+def test_set_key_set(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(JWKSet())
+    cache = KeySetCache(fetch, policy=RefreshPolicy(default_max_age=600), clock=clock)
+    cache.refresh()
+    cache.set_key_set(jwk_set, max_age=3600)
+    clock.now += 1000
+    assert cache.get() is jwk_set
+    assert fetch.calls == 1
+
+
+def test_invalidate(jwk_set: JWKSet):
+    clock = FakeClock()
+    fetch = FakeFetcher(jwk_set)
+    cache = KeySetCache(fetch, clock=clock)
+    cache.refresh()
+    cache.invalidate()
+    assert not cache.has_key_set
+    assert cache.get() is jwk_set
+    assert fetch.calls == 2
+
+
+def test_superseded_refresh_is_discarded(jwk_set: JWKSet):
+    clock = FakeClock()
+    injected = JWKSet()
+
+    def fetch():
+        # The key set is pushed while the fetch is in flight.
+        clock.now += 1
+        cache.set_key_set(injected)
+        return jwk_set, {}
+
+    cache = KeySetCache(fetch, clock=clock)
+    clock.now += 1
+    cache.refresh()
+    assert cache.get() is injected
+
+
+def test_removed_keys_are_retired(jwk_set: JWKSet):
+    clock = FakeClock()
+    old_key = JWK.generate(kty="EC", crv="P-256", kid="old")
+    initial = JWKSet()
+    initial.add(old_key)
+    for key in jwk_set["keys"]:
+        initial.add(key)
+    fetcher = FakeFetcher(initial, {"Cache-Control": "max-age=3600"})
+    cache = KeySetCache(fetcher, policy=RefreshPolicy(retire_after=600), clock=clock)
+    cache.refresh()
+
+    # The old key is still accepted after being removed and a refresh is due when it expires.
+    fetcher.key_set = jwk_set
+    cache.refresh()
+    assert cache.get().get_key("old") is old_key
+    assert cache.status().key_count == len(jwk_set["keys"]) + 1
+    assert cache.status().max_age == 600
+    assert fetcher.key_set.get_key("old") is None
+
+    # A refresh within the grace period keeps the key until its original expiry.
+    clock.now += 300
+    cache.refresh()
+    assert cache.get().get_key("old") is old_key
+    assert cache.status().max_age == 300
+
+    clock.now += 300
+    cache.refresh()
+    assert cache.get().get_key("old") is None
+    assert cache.status().max_age == 3600
+
+
+def test_removed_keys_are_dropped_by_default(jwk_set: JWKSet):
+    initial = JWKSet()
+    initial.add(JWK.generate(kty="EC", crv="P-256", kid="old"))
+    fetcher = FakeFetcher(initial)
+    cache = KeySetCache(fetcher)
+    cache.refresh()
+    fetcher.key_set = jwk_set
+    cache.refresh()
+    assert cache.get() is jwk_set
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import struct
+
+import pytest
+import pytest_asyncio
+
+from federatedidentity import (
+    ANY_AUDIENCE,
+    Issuer,
+    VerificationConfig,
+    VerificationPolicy,
+)
+from federatedidentity.exceptions import InvalidClaimsError, InvalidTokenError
+from federatedidentity.sidecar import (
+    MAX_FRAME_LENGTH,
+    STATUS_INVALID_CLAIMS,
+    STATUS_INVALID_TOKEN,
+    STATUS_MALFORMED_REQUEST,
+    STATUS_OK,
+    STATUS_UNAVAILABLE,
+    STATUS_UNKNOWN_POLICY,
+    SidecarClient,
+    SidecarError,
+    SidecarServer,
+)
+
+
+@pytest.fixture
+def config(jwt_issuer: str, oidc_audience: str) -> dict:
+    return {
+        "issuers": [jwt_issuer],
+        "audiences": [oidc_audience],
+        "policies": {"strict": {"required_claims": [{"sub": "someone-else"}]}},
+    }
+
+
+@pytest_asyncio.fixture
+async def socket_path(tmp_path, config):
+    path = str(tmp_path / "sidecar.sock")
+    server = SidecarServer(VerificationConfig.from_document(config))
+    async with await server.start(path):
+        yield path
+
+
+def frame(token: str, policy: str = "") -> bytes:
+    body = bytes([len(policy)]) + policy.encode("utf-8") + token.encode("ascii")
+    return struct.pack(">I", len(body)) + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    (length,) = struct.unpack(">I", await reader.readexactly(4))
+    body = await reader.readexactly(length)
+    return body[0], body[1:]
+
+
+@pytest.mark.asyncio
+async def test_pipelined_requests(socket_path: str, oidc_token: str, oidc_subject: str):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(
+        frame(oidc_token)
+        + frame("not-a-token")
+        + frame(oidc_token, "strict")
+        + frame(oidc_token, "unknown")
+        + frame(oidc_token, "default")
+    )
+    await writer.drain()
+    statuses = []
+    for _ in range(5):
+        status, payload = await read_response(reader)
+        statuses.append(status)
+        if status == STATUS_OK:
+            assert json.loads(payload)["sub"] == oidc_subject
+    assert statuses == [
+        STATUS_OK,
+        STATUS_INVALID_TOKEN,
+        STATUS_INVALID_CLAIMS,
+        STATUS_UNKNOWN_POLICY,
+        STATUS_OK,
+    ]
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_malformed_requests(socket_path: str, oidc_token: str):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(struct.pack(">I", 2) + b"\x05a" + frame(oidc_token))
+    status, _ = await read_response(reader)
+    assert status == STATUS_MALFORMED_REQUEST
+    status, _ = await read_response(reader)
+    assert status == STATUS_OK
+
+    # Frames which are too long are rejected and the connection closed.
+    writer.write(struct.pack(">I", MAX_FRAME_LENGTH + 1))
+    status, _ = await read_response(reader)
+    assert status == STATUS_MALFORMED_REQUEST
+    assert await reader.read() == b""
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_client(socket_path: str, oidc_token: str, oidc_subject: str):
+    def use_client():
+        with SidecarClient(socket_path) as client:
+            assert client.verify(oidc_token)["sub"] == oidc_subject
+            with pytest.raises(InvalidClaimsError):
+                client.verify(oidc_token, policy="strict")
+            with pytest.raises(SidecarError) as exc_info:
+                client.verify(oidc_token, policy="unknown")
+            assert exc_info.value.status == STATUS_UNKNOWN_POLICY
+            results = client.verify_many([oidc_token, b"not-a-token"])
+            assert isinstance(results[0], dict)
+            assert isinstance(results[1], InvalidTokenError)
+
+    await asyncio.to_thread(use_client)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "response", [struct.pack(">I", 0), struct.pack(">I", 10) + bytes([STATUS_OK])]
+)
+async def test_client_malformed_response(tmp_path, response: bytes):
+    async def reply(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.read(4)
+        writer.write(response)
+        await writer.drain()
+        writer.close()
+
+    path = str(tmp_path / "sidecar.sock")
+
+    def use_client():
+        with SidecarClient(path) as client:
+            with pytest.raises(SidecarError) as exc_info:
+                client.verify("token")
+            assert exc_info.value.status == STATUS_UNAVAILABLE
+
+    async with await asyncio.start_unix_server(reply, path=path):
+        await asyncio.to_thread(use_client)
+
+
+@pytest.mark.asyncio
+async def test_client_large_batch(tmp_path, config: dict, oidc_token: str):
+    # Far more requests than fit in the sidecar's pipeline or the socket's buffers.
+    server = SidecarServer(VerificationConfig.from_document(config), max_pipeline=4)
+    path = str(tmp_path / "sidecar.sock")
+
+    def use_client():
+        with SidecarClient(path, max_pipeline=4) as client:
+            return client.verify_many([oidc_token] * 2000)
+
+    async with await server.start(path):
+        results = await asyncio.to_thread(use_client)
+    assert len(results) == 2000
+    assert all(isinstance(result, dict) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_shared_issuers(tmp_path, jwt_issuer: str, oidc_audience: str, oidc_token: str):
+    issuer = Issuer.from_discovery(jwt_issuer)
+    config = VerificationConfig(
+        policies={
+            "a": VerificationPolicy(issuers=(issuer,), audiences=(oidc_audience,)),
+            "b": VerificationPolicy(issuers=(issuer,), audiences=(ANY_AUDIENCE,)),
+        },
+        issuers={jwt_issuer: issuer},
+    )
+    server = SidecarServer(config)
+    path = str(tmp_path / "sidecar.sock")
+    async with await server.start(path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(frame(oidc_token, "a") + frame(oidc_token, "b"))
+        assert (await read_response(reader))[0] == STATUS_OK
+        assert (await read_response(reader))[0] == STATUS_OK
+        writer.close()
+        await writer.wait_closed()
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from collections.abc import Mapping
+from typing import Optional
+
+import pytest
+from jwcrypto.jwk import JWKSet
+
+from federatedidentity import RefreshingIssuer, verify_id_token
+from federatedidentity.exceptions import DeadlineExceededError, TransportError
+from federatedidentity.sources import (
+    DiscoverySource,
+    FileSource,
+    JWKSUrlSource,
+    KeySource,
+    async_fetch_first,
+    fetch_first,
+)
+
+
+class FakeSource(KeySource):
+    "Key source which responds after a delay or fails."
+
+    def __init__(self, key_set: JWKSet, delay: float = 0, error: Optional[Exception] = None):
+        self.key_set = key_set
+        self.delay = delay
+        self.error = error
+        self.started = threading.Event()
+
+    def fetch(self, deadline: Optional[float] = None) -> tuple[JWKSet, Mapping[str, str]]:
+        self.started.set()
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.key_set, {}
+
+    async def async_fetch(
+        self, deadline: Optional[float] = None
+    ) -> tuple[JWKSet, Mapping[str, str]]:
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.key_set, {}
+
+
+@pytest.fixture
+def jwks_path(tmp_path, jwk_set: JWKSet) -> str:
+    path = tmp_path / "jwks.json"
+    path.write_text(jwk_set.export(private_keys=False))
+    return str(path)
+
+
+def test_first_source_used(jwk_set: JWKSet):
+    first, second = FakeSource(jwk_set), FakeSource(JWKSet())
+    assert fetch_first([first, second], hedge_delay=5)[0] is jwk_set
+    assert not second.started.is_set()
+
+
+def test_failed_source_falls_back(jwk_set: JWKSet):
+    first = FakeSource(JWKSet(), error=TransportError("down"))
+    second = FakeSource(jwk_set)
+    assert fetch_first([first, second], hedge_delay=5)[0] is jwk_set
+
+
+def test_slow_source_is_hedged(jwk_set: JWKSet):
+    # Sources still in progress are abandoned rather than waited for.
+    first, second = FakeSource(JWKSet(), delay=1), FakeSource(jwk_set)
+    start = time.monotonic()
+    assert fetch_first([first, second], hedge_delay=0.05)[0] is jwk_set
+    assert time.monotonic() - start < 0.5
+
+
+def test_all_sources_fail():
+    error = TransportError("first")
+    sources = [FakeSource(JWKSet(), error=error), FakeSource(JWKSet(), error=TransportError())]
+    with pytest.raises(TransportError) as exc_info:
+        fetch_first(sources)
+    assert exc_info.value is error
+
+
+def test_deadline_exceeded():
+    with pytest.raises(DeadlineExceededError):
+        fetch_first([FakeSource(JWKSet(), delay=1)], deadline=time.monotonic() + 0.05)
+
+
+def test_no_sources():
+    with pytest.raises(ValueError):
+        fetch_first([])
+
+
+@pytest.mark.asyncio
+async def test_async_slow_source_is_hedged(jwk_set: JWKSet):
+    first, second = FakeSource(JWKSet(), delay=5), FakeSource(jwk_set)
+    assert (await async_fetch_first([first, second], hedge_delay=0.05))[0] is jwk_set
+
+
+@pytest.mark.asyncio
+async def test_async_failed_source_falls_back(jwk_set: JWKSet):
+    first = FakeSource(JWKSet(), error=TransportError("down"))
+    second = FakeSource(jwk_set)
+    assert (await async_fetch_first([first, second], hedge_delay=5))[0] is jwk_set
+
+
+@pytest.mark.asyncio
+async def test_async_deadline_exceeded():
+    with pytest.raises(DeadlineExceededError):
+        await async_fetch_first([FakeSource(JWKSet(), delay=5)], deadline=time.monotonic() + 0.05)
+
+
+def test_sources(jwt_issuer: str, jwks_uri: str, jwks_path: str, jwk_set: JWKSet):
+    for source in [DiscoverySource(jwt_issuer), JWKSUrlSource(jwks_uri), FileSource(jwks_path)]:
+        assert source.fetch()[0] == jwk_set
+
+
+@pytest.mark.asyncio
+async def test_sources_async(jwt_issuer: str, jwks_uri: str, jwks_path: str, jwk_set: JWKSet):
+    for source in [DiscoverySource(jwt_issuer), JWKSUrlSource(jwks_uri), FileSource(jwks_path)]:
+        assert (await source.async_fetch())[0] == jwk_set
+
+
+def test_missing_file_source(tmp_path):
+    with pytest.raises(TransportError):
+        FileSource(str(tmp_path / "missing.json")).fetch()
+
+
+def test_refreshing_issuer_from_sources(
+    jwt_issuer: str, jwks_path: str, oidc_token: str, oidc_audience: str
+):
+    unreachable = FakeSource(JWKSet(), error=TransportError("down"))
+    issuer = RefreshingIssuer.from_sources(jwt_issuer, [unreachable, FileSource(jwks_path)])
+    verify_id_token(oidc_token, [issuer], [oidc_audience])
+
+
+@pytest.mark.asyncio
+async def test_refreshing_issuer_from_sources_async(
+    jwt_issuer: str, jwks_uri: str, jwk_set: JWKSet
+):
+    issuer = await RefreshingIssuer.async_from_sources(
+        jwt_issuer, [DiscoverySource(jwt_issuer), JWKSUrlSource(jwks_uri)]
+    )
+    assert issuer.key_set == jwk_set
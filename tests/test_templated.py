@@ -0,0 +1,150 @@
+import json
+from typing import Any
+
+import pytest
+from faker import Faker
+from jwcrypto.jwk import JWK, JWKSet
+from responses import RequestsMock
+
+from federatedidentity import TemplatedIssuer, exceptions, verify_id_token
+
+from .oidcfixtures import make_jwt
+
+
+@pytest.fixture
+def issuer_base(faker: Faker) -> str:
+    return faker.url(schemes=["https"]).rstrip("/")
+
+
+@pytest.fixture
+def issuer_template(issuer_base: str) -> str:
+    return f"{issuer_base}/{{tenantid}}/v2.0"
+
+
+@pytest.fixture
+def discovery_issuer(
+    issuer_base: str, issuer_template: str, jwks_uri: str, mocked_responses: RequestsMock
+) -> str:
+    discovery_issuer = f"{issuer_base}/common/v2.0"
+    mocked_responses.get(
+        f"{discovery_issuer}/.well-known/openid-configuration",
+        body=json.dumps({"issuer": issuer_template, "jwks_uri": jwks_uri}),
+        content_type="application/json",
+    )
+    return discovery_issuer
+
+
+@pytest.fixture
+def tenant_id(faker: Faker) -> str:
+    return faker.uuid4()
+
+
+@pytest.fixture
+def tenant_claims(
+    oidc_claims: dict[str, Any], issuer_template: str, tenant_id: str
+) -> dict[str, Any]:
+    return {
+        **oidc_claims,
+        "iss": issuer_template.replace("{tenantid}", tenant_id),
+        "tid": tenant_id,
+    }
+
+
+@pytest.fixture
+def templated_issuer(discovery_issuer: str) -> TemplatedIssuer:
+    return TemplatedIssuer.from_discovery(discovery_issuer)
+
+
+def test_discovery(templated_issuer: TemplatedIssuer, issuer_template: str, jwk_set: JWKSet):
+    assert templated_issuer.name == issuer_template
+    assert templated_issuer.key_set == jwk_set
+
+
+@pytest.mark.asyncio
+async def test_discovery_async(discovery_issuer: str, issuer_template: str, jwk_set: JWKSet):
+    issuer = await TemplatedIssuer.async_from_discovery(discovery_issuer)
+    assert issuer.name == issuer_template
+    assert issuer.key_set == jwk_set
+
+
+@pytest.mark.parametrize("alg", ["ES256", "RS256"])
+def test_verification(
+    alg: str,
+    templated_issuer: TemplatedIssuer,
+    tenant_claims: dict[str, Any],
+    oidc_audience: str,
+    jwks: dict[str, JWK],
+):
+    token = make_jwt(tenant_claims, jwks[alg], alg)
+    assert verify_id_token(token, [templated_issuer], [oidc_audience]) == tenant_claims
+
+
+@pytest.mark.parametrize(
+    "claims_update",
+    [
+        {"tid": "other-tenant"},
+        {"tid": "../other"},
+        {"tid": 1234},
+        {"tid": None},
+    ],
+)
+def test_mismatched_tenant(
+    claims_update: dict[str, Any],
+    templated_issuer: TemplatedIssuer,
+    tenant_claims: dict[str, Any],
+    oidc_audience: str,
+    ec_jwk: JWK,
+):
+    token = make_jwt({**tenant_claims, **claims_update}, ec_jwk, "ES256")
+    with pytest.raises(exceptions.InvalidClaimsError):
+        verify_id_token(token, [templated_issuer], [oidc_audience])
+
+
+def test_tenant_allow_list(
+    discovery_issuer: str,
+    tenant_claims: dict[str, Any],
+    tenant_id: str,
+    oidc_audience: str,
+    ec_jwk: JWK,
+):
+    token = make_jwt(tenant_claims, ec_jwk, "ES256")
+    issuer = TemplatedIssuer.from_discovery(discovery_issuer, tenant_ids=[tenant_id])
+    verify_id_token(token, [issuer], [oidc_audience])
+    issuer = TemplatedIssuer.from_discovery(discovery_issuer, tenant_ids=["other-tenant"])
+    with pytest.raises(exceptions.InvalidClaimsError):
+        verify_id_token(token, [issuer], [oidc_audience])
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{base}/common/v2.0",
+        "{base}/{{tenantid}}/{{tenantid}}",
+        "https://attacker.example.com/{{tenantid}}/v2.0",
+        "http://{host}/{{tenantid}}/v2.0",
+        1234,
+    ],
+)
+def test_invalid_template(
+    template: Any,
+    issuer_base: str,
+    discovery_issuer: str,
+    jwks_uri: str,
+    mocked_responses: RequestsMock,
+):
+    if isinstance(template, str):
+        template = template.format(base=issuer_base, host=issuer_base.split("//")[1])
+    doc_url = f"{discovery_issuer}/.well-known/openid-configuration"
+    mocked_responses.remove("GET", doc_url)
+    mocked_responses.get(
+        doc_url,
+        body=json.dumps({"issuer": template, "jwks_uri": jwks_uri}),
+        content_type="application/json",
+    )
+    with pytest.raises(exceptions.InvalidOIDCDiscoveryDocumentError):
+        TemplatedIssuer.from_discovery(discovery_issuer)
+
+
+def test_template_requires_placeholder(templated_issuer: TemplatedIssuer):
+    with pytest.raises(ValueError):
+        TemplatedIssuer("https://issuer.example.com/", templated_issuer.key_cache)
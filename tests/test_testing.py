@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from responses import RequestsMock
+
+from federatedidentity import Issuer, RefreshingIssuer, verify_id_token
+from federatedidentity.exceptions import InvalidTokenError, TransportError
+from federatedidentity.testing import MockOIDCProvider, TokenMinter
+
+
+@pytest.fixture
+def provider(mocked_responses: RequestsMock):
+    with MockOIDCProvider() as provider:
+        mocked_responses.add_passthru(provider.issuer)
+        yield provider
+
+
+@pytest.mark.parametrize("alg", ["ES256", "RS256"])
+def test_minted_token_verifies(alg: str):
+    minter = TokenMinter("https://issuer.example.com", alg=alg)
+    issuer = Issuer(name=minter.issuer, key_set=minter.key_set)
+    token = minter.mint({"custom": "value"}, subject="someone", audience="aud")
+    claims = verify_id_token(token, [issuer], ["aud"])
+    assert claims["sub"] == "someone"
+    assert claims["custom"] == "value"
+
+
+def test_minter_rejects_unknown_alg():
+    with pytest.raises(ValueError):
+        TokenMinter("https://issuer.example.com", alg="HS256")
+
+
+def test_minter_rotation_retains_keys():
+    minter = TokenMinter("https://issuer.example.com", retained_keys=1)
+    first_key = minter.signing_key
+    minter.rotate_keys()
+    assert minter.key_set.get_key(first_key["kid"]) is not None
+    minter.rotate_keys()
+    assert minter.key_set.get_key(first_key["kid"]) is None
+    assert len(minter.key_set["keys"]) == 2
+
+
+def test_discovery(provider: MockOIDCProvider):
+    issuer = Issuer.from_discovery(provider.issuer, provider.request)
+    token = provider.minter.mint()
+    verify_id_token(token, [issuer], ["test-audience"])
+    assert provider.request_counts["/.well-known/openid-configuration"] == 1
+    assert provider.request_counts["/jwks.json"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_discovery(provider: MockOIDCProvider):
+    issuer = await Issuer.async_from_discovery(provider.issuer, provider.async_request)
+    verify_id_token(provider.minter.mint(), [issuer], ["test-audience"])
+
+
+def test_key_rotation(provider: MockOIDCProvider):
+    issuer = Issuer.from_discovery(provider.issuer, provider.request)
+    provider.rotate_keys()
+    with pytest.raises(InvalidTokenError):
+        verify_id_token(provider.minter.mint(), [issuer], ["test-audience"])
+    issuer = Issuer.from_discovery(provider.issuer, provider.request)
+    verify_id_token(provider.minter.mint(), [issuer], ["test-audience"])
+
+
+def test_errors(provider: MockOIDCProvider):
+    provider.error_rate = 1.0
+    with pytest.raises(TransportError):
+        Issuer.from_discovery(provider.issuer, provider.request)
+
+
+def test_latency(provider: MockOIDCProvider):
+    provider.latency = 0.1
+    start = time.monotonic()
+    Issuer.from_discovery(provider.issuer, provider.request)
+    assert time.monotonic() - start >= 0.2
+
+
+def test_cache_headers(provider: MockOIDCProvider):
+    provider.cache_control = "max-age=1234"
+    issuer = RefreshingIssuer.from_discovery(provider.issuer, provider.request)
+    assert issuer.key_cache._entry is not None
+    assert issuer.key_cache._entry.max_age == 1234
+
+
+def test_not_running():
+    provider = MockOIDCProvider()
+    with pytest.raises(RuntimeError):
+        provider.issuer
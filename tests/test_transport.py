@@ -0,0 +1,67 @@
+import concurrent.futures
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+from federatedidentity.exceptions import DeadlineExceededError
+from federatedidentity.transport.requests import RequestsSession
+
+
+class DripHandler(http.server.BaseHTTPRequestHandler):
+    "Send a large body slowly enough that no single socket read times out."
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(100 * 1024))
+        self.end_headers()
+        try:
+            for _ in range(100):
+                self.wfile.write(b" " * 1024)
+                self.wfile.flush()
+                time.sleep(0.05)
+        except ConnectionError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def drip_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DripHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_session_per_thread():
+    transport = RequestsSession()
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        sessions = list(executor.map(lambda _: transport.session, range(4)))
+    assert transport.session is transport.session
+    assert all(session is not transport.session for session in sessions)
+
+
+def test_explicit_session_shared():
+    session = requests.Session()
+    transport = RequestsSession(session)
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        sessions = list(executor.map(lambda _: transport.session, range(4)))
+    assert all(s is session for s in sessions)
+
+
+def test_timeout_bounds_whole_response(drip_url: str, mocked_responses):
+    mocked_responses.add_passthru(drip_url)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        RequestsSession()(drip_url, timeout=0.5)
+    # The whole body would take five seconds to arrive.
+    assert time.monotonic() - start < 2.5
@@ -1,16 +1,20 @@
 import datetime
+import json
+import pickle
 from typing import Any
 from unittest import mock
 
 import pytest
 from faker import Faker
+from jwcrypto.common import base64url_encode
+from jwcrypto.jwa import JWA
 from jwcrypto.jwk import JWK
 from jwcrypto.jws import JWS
 from jwcrypto.jwt import JWT
 
-from federatedidentity import ANY_AUDIENCE, Issuer
+from federatedidentity import ANY_AUDIENCE, Claims, Issuer, TimePolicy
 from federatedidentity import exceptions as exc
-from federatedidentity import verify_id_token
+from federatedidentity import try_verify_id_token, verify_id_token
 
 from .oidcfixtures import make_jwt
 
@@ -144,8 +148,41 @@ def test_exp_claim_in_past(
 ):
     oidc_claims["exp"] = datetime.datetime.now(datetime.UTC).timestamp() - 100000
     token = make_jwt(oidc_claims, jwks[alg], alg)
-    with pytest.raises(exc.InvalidTokenError, match="Expired"):
+    with pytest.raises(exc.InvalidTokenError, match="Expired") as exc_info:
         verify_id_token(token, [oidc_issuer], [oidc_audience])
+    assert exc_info.value.code == exc.ErrorCode.EXPIRED
+
+
+def test_expired_token_rejected_before_signature(
+    oidc_claims: dict[str, Any], oidc_audience: str, oidc_issuer: Issuer, jwks: dict[str, JWK]
+):
+    oidc_claims["exp"] = datetime.datetime.now(datetime.UTC).timestamp() - 100000
+    token = make_jwt(oidc_claims, jwks["ES256"], "ES256")
+    with mock.patch("federatedidentity._oidc.JWA.signing_alg") as signing_alg:
+        result = try_verify_id_token(token, [oidc_issuer], [oidc_audience])
+    assert result.code == exc.ErrorCode.EXPIRED
+    signing_alg.assert_not_called()
+
+
+def test_time_policy(
+    oidc_claims: dict[str, Any], oidc_audience: str, oidc_issuer: Issuer, jwks: dict[str, JWK]
+):
+    now = datetime.datetime.now(datetime.UTC).timestamp()
+    oidc_claims["iat"] = now - 3600
+    oidc_claims["exp"] = now - 30
+    token = make_jwt(oidc_claims, jwks["ES256"], "ES256")
+
+    def verify(policy: TimePolicy):
+        return try_verify_id_token(token, [oidc_issuer], [oidc_audience], time_policy=policy)
+
+    # Within the default leeway.
+    assert verify(TimePolicy())
+    assert verify(TimePolicy(leeway=0)).code == exc.ErrorCode.EXPIRED
+    assert verify(TimePolicy(clock=lambda: now - 60, max_age=3660))
+    result = verify(TimePolicy(clock=lambda: now - 60, max_age=600))
+    assert result.code == exc.ErrorCode.EXPIRED
+    assert "Issued at" in str(result.error)
+    assert verify(TimePolicy(leeway=0, clock=lambda: now - 60))
 
 
 @pytest.mark.parametrize("alg", ["RS256", "ES256"])
@@ -158,10 +195,210 @@ def test_nbf_claim_in_future(
 ):
     oidc_claims["nbf"] = datetime.datetime.now(datetime.UTC).timestamp() + 100000
     token = make_jwt(oidc_claims, jwks[alg], alg)
-    with pytest.raises(exc.InvalidTokenError, match="Valid from"):
+    with pytest.raises(exc.InvalidTokenError, match="Valid from") as exc_info:
         verify_id_token(token, [oidc_issuer], [oidc_audience])
+    assert exc_info.value.code == exc.ErrorCode.NOT_YET_VALID
 
 
 def test_any_audience(oidc_token: str, oidc_issuer: Issuer):
     "The special ANY_AUDIENCE value matches any audience claim"
     verify_id_token(oidc_token, [oidc_issuer], [ANY_AUDIENCE])
+
+
+def test_read_only_claims(
+    oidc_token: str, oidc_audience: str, oidc_issuer: Issuer, oidc_claims: dict[str, Any]
+):
+    claims = verify_id_token(oidc_token, [oidc_issuer], [oidc_audience], read_only_claims=True)
+    assert isinstance(claims, Claims)
+    assert claims == oidc_claims
+    assert dict(claims) == oidc_claims
+    assert claims.sub == oidc_claims["sub"]
+    assert claims.aud == oidc_audience
+    assert claims.nbf is None
+    assert claims["jti"] == oidc_claims["jti"]
+    assert "jti" in claims
+    assert len(claims) == len(oidc_claims)
+    with pytest.raises(TypeError):
+        claims["sub"] = "other"  # type: ignore[index]
+    with pytest.raises(AttributeError):
+        claims.sub = "other"  # type: ignore[misc]
+
+
+def test_read_only_claims_passed_to_verifiers_as_dict(
+    oidc_token: str, oidc_audience: str, oidc_issuer: Issuer, oidc_claims: dict[str, Any]
+):
+    validator = mock.Mock()
+    verify_id_token(
+        oidc_token,
+        [oidc_issuer],
+        [oidc_audience],
+        required_claims=[validator],
+        read_only_claims=True,
+    )
+    validator.assert_called_once_with(oidc_claims)
+    assert type(validator.call_args[0][0]) is dict
+
+
+@pytest.mark.parametrize("wrap", [bytearray, memoryview, lambda b: memoryview(b"xx" + b)[2:]])
+def test_bytes_like_tokens(
+    wrap, oidc_token: str, oidc_audience: str, oidc_issuer: Issuer, oidc_subject: str
+):
+    token = wrap(oidc_token.encode("ascii"))
+    assert verify_id_token(token, [oidc_issuer], [oidc_audience])["sub"] == oidc_subject
+
+
+def test_non_ascii_memoryview_token(oidc_audience: str, oidc_issuer: Issuer):
+    with pytest.raises(UnicodeDecodeError):
+        verify_id_token(memoryview("\N{SNOWMAN}".encode("utf8")), [oidc_issuer], [oidc_audience])
+
+
+def test_tampered_signature(oidc_token: str, oidc_audience: str, oidc_issuer: Issuer):
+    header, payload, signature = oidc_token.split(".")
+    signature = ("A" if signature[0] != "A" else "B") + signature[1:]
+    with pytest.raises(exc.InvalidTokenError):
+        verify_id_token(".".join([header, payload, signature]), [oidc_issuer], [oidc_audience])
+
+
+@pytest.mark.parametrize("alg", ["RS256", "ES256"])
+def test_token_without_kid(
+    alg: str,
+    oidc_claims: dict[str, Any],
+    oidc_audience: str,
+    oidc_issuer: Issuer,
+    jwks: dict[str, JWK],
+):
+    jwt = JWT(header={"alg": alg}, claims=oidc_claims)
+    jwt.make_signed_token(jwks[alg])
+    verify_id_token(jwt.serialize(), [oidc_issuer], [oidc_audience])
+
+
+@pytest.mark.parametrize(
+    "header,code",
+    [
+        ({"alg": "HS256"}, exc.ErrorCode.DISALLOWED_ALGORITHM),
+        ({"alg": "none"}, exc.ErrorCode.DISALLOWED_ALGORITHM),
+        ({"alg": ["ES256"]}, exc.ErrorCode.DISALLOWED_ALGORITHM),
+        ({"alg": {"name": "ES256"}}, exc.ErrorCode.DISALLOWED_ALGORITHM),
+        ({"alg": "ES256", "kid": "unknown-kid"}, exc.ErrorCode.UNKNOWN_KEY),
+        ({"alg": "ES256", "crit": ["exp"], "exp": 1}, exc.ErrorCode.UNSUPPORTED_HEADER),
+    ],
+)
+def test_rejected_headers(
+    header: dict[str, Any],
+    code: exc.ErrorCode,
+    oidc_claims: dict[str, Any],
+    oidc_audience: str,
+    oidc_issuer: Issuer,
+    ec_jwk: JWK,
+):
+    # Sign with the issuer's key so that only the header causes the token to be rejected.
+    signing_input = ".".join(
+        base64url_encode(json.dumps(part))
+        for part in [{"kid": ec_jwk["kid"], **header}, oidc_claims]
+    )
+    signature = JWA.signing_alg("ES256").sign(ec_jwk, signing_input.encode("ascii"))
+    token = f"{signing_input}.{base64url_encode(signature)}"
+    with pytest.raises(exc.InvalidTokenError) as exc_info:
+        verify_id_token(token, [oidc_issuer], [oidc_audience])
+    assert exc_info.value.code == code
+
+
+@pytest.mark.parametrize("claim,value", [("exp", "tomorrow"), ("iat", True), ("sub", 1)])
+def test_malformed_registered_claims(
+    claim: str,
+    value: Any,
+    oidc_claims: dict[str, Any],
+    oidc_audience: str,
+    oidc_issuer: Issuer,
+    ec_jwk: JWK,
+):
+    token = make_jwt({**oidc_claims, claim: value}, ec_jwk, "ES256")
+    with pytest.raises(exc.InvalidTokenError):
+        verify_id_token(token, [oidc_issuer], [oidc_audience])
+
+
+@pytest.mark.parametrize("claim", ["exp", "nbf", "iat"])
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", "1e400"])
+def test_non_finite_time_claims(
+    claim: str,
+    value: str,
+    oidc_claims: dict[str, Any],
+    oidc_audience: str,
+    oidc_issuer: Issuer,
+    ec_jwk: JWK,
+):
+    # The value is spliced into the payload as a JSON literal.
+    claims = {name: v for name, v in oidc_claims.items() if name != claim}
+    payload = json.dumps(claims)[:-1] + f', "{claim}": {value}}}'
+    signing_input = ".".join(
+        [
+            base64url_encode(json.dumps({"alg": "ES256", "kid": ec_jwk["kid"]})),
+            base64url_encode(payload),
+        ]
+    )
+    signature = JWA.signing_alg("ES256").sign(ec_jwk, signing_input.encode("ascii"))
+    token = f"{signing_input}.{base64url_encode(signature)}"
+    with pytest.raises(exc.InvalidTokenError) as exc_info:
+        verify_id_token(token, [oidc_issuer], [oidc_audience])
+    assert exc_info.value.code == exc.ErrorCode.MALFORMED_CLAIM
+
+
+def test_try_verify_id_token(
+    faker: Faker, oidc_token: str, oidc_audience: str, oidc_issuer: Issuer, oidc_subject: str
+):
+    result = try_verify_id_token(oidc_token, [oidc_issuer], [oidc_audience])
+    assert result
+    assert result.claims is not None and result.claims["sub"] == oidc_subject
+    assert result.error is None and result.code is None
+
+    result = try_verify_id_token(oidc_token, [oidc_issuer], [faker.url()])
+    assert not result
+    assert result.claims is None
+    assert isinstance(result.error, exc.InvalidClaimsError)
+    assert result.code == exc.ErrorCode.AUDIENCE_MISMATCH
+
+    result = try_verify_id_token(
+        oidc_token, [oidc_issuer], [oidc_audience], required_claims=[{"sub": faker.slug()}]
+    )
+    assert result.code == exc.ErrorCode.CLAIM_MISMATCH
+
+    result = try_verify_id_token(b"not-a-token", [oidc_issuer], [oidc_audience])
+    assert result.code == exc.ErrorCode.MALFORMED_TOKEN
+
+
+def test_try_verify_id_token_verifier_errors(
+    oidc_token: str, oidc_audience: str, oidc_issuer: Issuer
+):
+    error = exc.StaleKeySetError("Allow list unavailable", code=exc.ErrorCode.STALE_KEY_SET)
+
+    def unavailable(claims):
+        raise error
+
+    result = try_verify_id_token(
+        oidc_token, [oidc_issuer], [oidc_audience], required_claims=[unavailable]
+    )
+    assert result.error is error
+    assert result.code == exc.ErrorCode.STALE_KEY_SET
+
+    def broken(claims):
+        raise KeyError("project_path")
+
+    with pytest.raises(KeyError):
+        try_verify_id_token(oidc_token, [oidc_issuer], [oidc_audience], required_claims=[broken])
+
+
+def test_try_verify_id_token_non_ascii(oidc_audience: str, oidc_issuer: Issuer):
+    result = try_verify_id_token("\N{SNOWMAN}".encode("utf8"), [oidc_issuer], [oidc_audience])
+    assert isinstance(result.error, exc.InvalidTokenError)
+    assert result.code == exc.ErrorCode.MALFORMED_TOKEN
+
+
+def test_lazily_formatted_errors():
+    error = exc.InvalidClaimsError("Claim %r has value %r", "sub", 1, code=exc.ErrorCode.ERROR)
+    assert str(error) == "Claim 'sub' has value 1"
+    assert error.code == exc.ErrorCode.ERROR
+    assert exc.InvalidClaimsError().code == exc.ErrorCode.INVALID_CLAIMS
+    assert str(exc.InvalidTokenError("100% invalid")) == "100% invalid"
+    unpickled = pickle.loads(pickle.dumps(error))
+    assert str(unpickled) == str(error)
+    assert unpickled.code == error.code
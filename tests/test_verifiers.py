@@ -1,8 +1,10 @@
+import time
+
 import pytest
 from faker import Faker
 
-from federatedidentity import Issuer, verifiers, verify_id_token
-from federatedidentity.exceptions import InvalidClaimsError
+from federatedidentity import Issuer, try_verify_id_token, verifiers, verify_id_token
+from federatedidentity.exceptions import ErrorCode, InvalidClaimsError
 
 
 @pytest.mark.parametrize("claims", [["sub"], ["sub", "iat"]])
@@ -79,3 +81,91 @@ def test_only_for_issuers_matching_succeed(
             )
         ],
     )
+
+
+def test_by_issuer(faker: Faker, oidc_token: str, oidc_audience: str, oidc_issuer: Issuer):
+    def verify(issuer_required_claims, default_required_claims=()):
+        verify_id_token(
+            oidc_token,
+            [oidc_issuer],
+            [oidc_audience],
+            required_claims=[
+                verifiers.by_issuer(issuer_required_claims, default_required_claims),
+            ],
+        )
+
+    missing = [verifiers.all_claims_present(["not-expected-to-be-present"])]
+    verify({faker.url(): missing})
+    verify({oidc_issuer.name: [verifiers.all_claims_present(["sub"])]}, missing)
+    with pytest.raises(InvalidClaimsError):
+        verify({oidc_issuer.name: missing})
+    with pytest.raises(InvalidClaimsError):
+        verify({faker.url(): []}, missing)
+
+
+def test_adaptive_learns_order(oidc_token: str, oidc_audience: str, oidc_issuer: Issuer):
+    calls = []
+
+    def slow_accepting(claims):
+        calls.append("slow")
+        time.sleep(0.001)
+
+    verifier = verifiers.adaptive(
+        [slow_accepting, {"sub": "someone-else"}], sample_interval=1, reorder_interval=4
+    )
+    for _ in range(8):
+        with pytest.raises(InvalidClaimsError) as exc_info:
+            verify_id_token(oidc_token, [oidc_issuer], [oidc_audience], required_claims=[verifier])
+        assert exc_info.value.code == ErrorCode.CLAIM_MISMATCH
+
+    # Once reordered, the cheap and selective dictionary check runs first.
+    assert calls == ["slow"] * 3
+
+
+def test_adaptive_unmeasured_verifier_not_promoted():
+    calls = []
+
+    def rejecting(claims):
+        raise InvalidClaimsError("Rejected")
+
+    def never_reached(claims):
+        calls.append(claims)
+
+    verifier = verifiers.adaptive(
+        [rejecting, never_reached], sample_interval=1, reorder_interval=1
+    )
+    for _ in range(5):
+        with pytest.raises(InvalidClaimsError):
+            verifier({"sub": "someone"})
+
+    # A verifier which has never run is not assumed to be free and so is not moved first.
+    assert calls == []
+
+
+@pytest.mark.parametrize("sub_matches", [True, False])
+def test_adaptive_result_matches_in_order(
+    sub_matches: bool,
+    oidc_token: str,
+    oidc_audience: str,
+    oidc_issuer: Issuer,
+    oidc_subject: str,
+):
+    required_claims = [
+        verifiers.all_claims_present(["iat"]),
+        {"sub": oidc_subject if sub_matches else "someone-else"},
+        lambda claims: None,
+    ]
+    verifier = verifiers.adaptive(required_claims, sample_interval=1, reorder_interval=1)
+    for _ in range(5):
+        expected = try_verify_id_token(
+            oidc_token, [oidc_issuer], [oidc_audience], required_claims=required_claims
+        )
+        result = try_verify_id_token(
+            oidc_token, [oidc_issuer], [oidc_audience], required_claims=[verifier]
+        )
+        assert bool(result) == bool(expected) == sub_matches
+
+
+def test_adaptive_invalid_interval():
+    with pytest.raises(ValueError):
+        verifiers.adaptive([], sample_interval=0)